@@ -0,0 +1,396 @@
+from contextlib import asynccontextmanager
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar, Union
+
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from . import cache, crud, database, models, replicas, schemas, serialization
+
+# Either session type; the sync one is used when DB_ASYNC is disabled
+AnySession = Union[AsyncSession, Session]
+
+R = TypeVar("R")
+
+async def _run(db: AnySession, fn: Callable[..., R], **kwargs: Any) -> R:
+    """
+    Run a sync crud function without blocking the event loop.
+
+    With an AsyncSession the function runs via ``run_sync`` on the async
+    connection, so no worker thread is held while waiting on the database.
+    With a sync Session it falls back to the threadpool.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda session: fn(session, **kwargs))
+    return await run_in_threadpool(lambda: fn(db, **kwargs))
+
+async def create_product(db: AnySession, product: schemas.ProductCreate, user: str) -> models.Product:
+    """
+    Async version of crud.create_product.
+    """
+    return await _run(db, crud.create_product, product=product, user=user)
+
+async def get_product(db: AnySession, product_id: int) -> Optional[models.Product]:
+    """
+    Async version of crud.get_product.
+    """
+    return await _run(db, crud.get_product, product_id=product_id)
+
+async def get_products_by_ids(db: AnySession, product_ids: Sequence[int]) -> List[Row]:
+    """
+    Async version of crud.get_products_by_ids.
+    """
+    return await _run(db, crud.get_products_by_ids, product_ids=product_ids)
+
+async def get_products_by_names(db: AnySession, names: Sequence[str]) -> List[Row]:
+    """
+    Async version of crud.get_products_by_names.
+    """
+    return await _run(db, crud.get_products_by_names, names=names)
+
+async def get_products(
+    db: AnySession,
+    skip: int = 0,
+    limit: int = 100,
+    filters: Optional[schemas.ProductFilter] = None,
+    sort: schemas.ProductSort = schemas.ProductSort.id
+) -> List[Row]:
+    """
+    Async version of crud.get_products.
+    """
+    return await _run(db, crud.get_products, skip=skip, limit=limit, filters=filters, sort=sort)
+
+async def get_products_after(
+    db: AnySession,
+    after_id: Optional[int] = None,
+    limit: int = 100,
+    filters: Optional[schemas.ProductFilter] = None,
+    sort: schemas.ProductSort = schemas.ProductSort.id,
+    after_updated_at: Optional[datetime] = None
+) -> List[Row]:
+    """
+    Async version of crud.get_products_after.
+    """
+    return await _run(
+        db, crud.get_products_after, after_id=after_id, limit=limit,
+        filters=filters, sort=sort, after_updated_at=after_updated_at
+    )
+
+async def search_products(
+    db: AnySession,
+    query: str,
+    limit: int = 20,
+    after: Optional[Tuple[Decimal, int]] = None
+) -> List[Row]:
+    """
+    Async version of crud.search_products.
+    """
+    return await _run(db, crud.search_products, query=query, limit=limit, after=after)
+
+async def get_product_version(db: AnySession, product_id: int) -> Optional[Row]:
+    """
+    Async version of crud.get_product_version.
+    """
+    return await _run(db, crud.get_product_version, product_id=product_id)
+
+async def get_product_versions(
+    db: AnySession,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[int] = None,
+    filters: Optional[schemas.ProductFilter] = None,
+    sort: schemas.ProductSort = schemas.ProductSort.id,
+    after_updated_at: Optional[datetime] = None
+) -> List[Row]:
+    """
+    Async version of crud.get_product_versions.
+    """
+    return await _run(
+        db, crud.get_product_versions, skip=skip, limit=limit, after_id=after_id,
+        filters=filters, sort=sort, after_updated_at=after_updated_at
+    )
+
+async def get_product_changes(
+    db: AnySession,
+    since: Optional[Tuple[int, int]] = None,
+    limit: int = 100
+) -> List[Row]:
+    """
+    Async version of crud.get_product_changes.
+    """
+    return await _run(db, crud.get_product_changes, since=since, limit=limit)
+
+async def update_product(
+    db: AnySession,
+    product_id: int,
+    product_update: schemas.ProductUpdate,
+    user: str,
+    expected_versions: Optional[Sequence[int]] = None
+) -> Optional[models.Product]:
+    """
+    Async version of crud.update_product.
+    """
+    return await _run(
+        db, crud.update_product, product_id=product_id, product_update=product_update, user=user,
+        expected_versions=expected_versions
+    )
+
+async def delete_product(db: AnySession, product_id: int, user: str) -> bool:
+    """
+    Async version of crud.delete_product.
+    """
+    return await _run(db, crud.delete_product, product_id=product_id, user=user)
+
+async def bulk_create_products(db: AnySession, products: Sequence[schemas.ProductCreate], user: str) -> List[dict]:
+    """
+    Async version of crud.bulk_create_products.
+    """
+    return await _run(db, crud.bulk_create_products, products=products, user=user)
+
+async def bulk_update_products(db: AnySession, updates: Sequence[schemas.ProductBulkUpdateItem], user: str) -> List[dict]:
+    """
+    Async version of crud.bulk_update_products.
+    """
+    return await _run(db, crud.bulk_update_products, updates=updates, user=user)
+
+async def bulk_delete_products(db: AnySession, product_ids: Sequence[int], user: str) -> List[dict]:
+    """
+    Async version of crud.bulk_delete_products.
+    """
+    return await _run(db, crud.bulk_delete_products, product_ids=product_ids, user=user)
+
+async def create_import_staging(db: AnySession) -> None:
+    """
+    Async version of crud.create_import_staging.
+    """
+    return await _run(db, crud.create_import_staging)
+
+async def stage_import_rows(db: AnySession, rows: Sequence[Tuple[int, str, Optional[str]]]) -> None:
+    """
+    Async version of crud.stage_import_rows.
+    """
+    return await _run(db, crud.stage_import_rows, rows=rows)
+
+async def merge_import(db: AnySession, on_conflict: str, user: str, max_errors: int = 1000) -> dict:
+    """
+    Async version of crud.merge_import.
+    """
+    return await _run(db, crud.merge_import, on_conflict=on_conflict, user=user, max_errors=max_errors)
+
+async def stream_products(batch_size: int = 1000) -> AsyncIterator[Sequence[Row]]:
+    """
+    Stream every product in batches from a server-side cursor.
+
+    Opens its own session: a streaming response outlives request-scoped dependencies.
+    """
+    if database.USE_ASYNC_DB:
+        async with database.AsyncSessionLocal() as db:
+            result = await db.stream(crud.export_statement(batch_size))
+            async for partition in result.partitions():
+                yield partition
+        return
+    db = database.SessionLocal()
+    try:
+        async for partition in iterate_in_threadpool(crud.stream_products(db, batch_size=batch_size)):
+            yield partition
+    finally:
+        db.close()
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[AnySession]:
+    """
+    Open a session outside request dependencies, for responses that outlive them.
+    """
+    if database.USE_ASYNC_DB:
+        async with database.AsyncSessionLocal() as db:
+            yield db
+        return
+    db = database.SessionLocal()
+    try:
+        yield db
+    finally:
+        await run_in_threadpool(db.close)
+
+async def release_connection(db: AnySession) -> None:
+    """
+    End the session's current transaction so its connection returns to the pool.
+
+    Call before idling (long-poll, streaming) between queries; objects loaded
+    so far are expired.
+    """
+    if isinstance(db, AsyncSession):
+        await db.rollback()
+    else:
+        await run_in_threadpool(db.rollback)
+
+# --- Cached reads ---
+
+async def _cache_call(fn: Callable[..., R], *args: Any) -> R:
+    # Remote cache backends do network I/O; keep them off the event loop
+    if cache.product_cache.backend.blocking:
+        return await run_in_threadpool(fn, *args)
+    return fn(*args)
+
+async def _read_through(
+    db: AnySession,
+    lookup: Callable[..., Any],
+    params: tuple,
+    load: Callable[[], Any],
+    serialize: Callable[[Any], Any]
+) -> Any:
+    product_cache = cache.product_cache
+    if not product_cache.enabled:
+        loaded = await load()
+        return None if loaded is None else serialize(loaded)
+    key, value = await _cache_call(lookup, *params)
+    if value is not None:
+        return value
+    loaded = await load()
+    if loaded is None:
+        return None
+    value = serialize(loaded)
+    # A lagging replica may return rows older than the current version token;
+    # caching them would serve stale data to every client until the TTL expires
+    if not replicas.is_replica(db):
+        await _cache_call(product_cache.store, key, value)
+    return value
+
+async def get_product_cached(db: AnySession, product_id: int) -> Optional[dict]:
+    """
+    Read-through cached version of get_product, returning a serialized schemas.Product.
+    """
+    return await _read_through(
+        db,
+        cache.product_cache.get_product,
+        (product_id,),
+        lambda: get_product(db, product_id=product_id),
+        serialization.product_to_dict
+    )
+
+async def get_products_by_ids_cached(db: AnySession, product_ids: Sequence[int]) -> Dict[int, dict]:
+    """
+    Read-through cached version of get_products_by_ids, returning serialized
+    schemas.Product items by ID; IDs not found are absent.
+
+    Cached products are looked up in one backend round trip and the rest are
+    loaded in one query.
+    """
+    product_cache = cache.product_cache
+    keys: Dict[int, str] = {}
+    found: Dict[int, dict] = {}
+    if product_cache.enabled:
+        keys, found = await _cache_call(product_cache.get_products, product_ids)
+    pending = [product_id for product_id in product_ids if product_id not in found]
+    if not pending:
+        return found
+    loaded = {p["id"]: p for p in serialization.products_to_dicts(await get_products_by_ids(db, pending))}
+    # See _read_through: rows read from a replica are not cached
+    if product_cache.enabled and not replicas.is_replica(db):
+        await _cache_call(product_cache.store_many, {keys[product_id]: value for product_id, value in loaded.items()})
+    return {**found, **loaded}
+
+def list_params(filters: Optional[schemas.ProductFilter], sort: schemas.ProductSort) -> Tuple[Any, ...]:
+    """
+    Identify a listing's filters and sort order, for cache keys and ETags.
+    """
+    filters = filters or schemas.ProductFilter()
+    # Free-form created_by last, so separators inside it cannot shift other fields
+    return (
+        sort.value,
+        filters.updated_after.isoformat() if filters.updated_after else None,
+        filters.updated_before.isoformat() if filters.updated_before else None,
+        filters.created_by,
+    )
+
+async def get_products_cached(
+    db: AnySession,
+    skip: int = 0,
+    limit: int = 100,
+    filters: Optional[schemas.ProductFilter] = None,
+    sort: schemas.ProductSort = schemas.ProductSort.id
+) -> List[dict]:
+    """
+    Read-through cached version of get_products, returning serialized schemas.Product items.
+    """
+    return await _read_through(
+        db,
+        cache.product_cache.get_page,
+        ("offset", skip, limit, *list_params(filters, sort)),
+        lambda: get_products(db, skip=skip, limit=limit, filters=filters, sort=sort),
+        serialization.products_to_dicts
+    )
+
+async def get_products_after_cached(
+    db: AnySession,
+    after_id: Optional[int] = None,
+    limit: int = 100,
+    filters: Optional[schemas.ProductFilter] = None,
+    sort: schemas.ProductSort = schemas.ProductSort.id,
+    after_updated_at: Optional[datetime] = None
+) -> List[dict]:
+    """
+    Read-through cached version of get_products_after, returning serialized schemas.Product items.
+    """
+    position = after_updated_at.isoformat() if after_updated_at else None
+    return await _read_through(
+        db,
+        cache.product_cache.get_page,
+        ("after", after_id, position, limit, *list_params(filters, sort)),
+        lambda: get_products_after(
+            db, after_id=after_id, limit=limit, filters=filters, sort=sort, after_updated_at=after_updated_at
+        ),
+        serialization.products_to_dicts
+    )
+
+async def search_products_cached(
+    db: AnySession,
+    query: str,
+    limit: int = 20,
+    after: Optional[Tuple[Decimal, int]] = None
+) -> List[dict]:
+    """
+    Read-through cached version of search_products, returning serialized
+    schemas.ProductSearchResult items.
+    """
+    after_key = (None, None) if after is None else (str(after[0]), after[1])
+    return await _read_through(
+        db,
+        cache.product_cache.get_page,
+        # Free-form query last, so separators inside it cannot shift other fields
+        ("search", *after_key, limit, query),
+        lambda: search_products(db, query=query, limit=limit, after=after),
+        lambda rows: [{**serialization.product_to_dict(p), "rank": float(rank)} for p, rank in rows]
+    )
+
+# Exports:
+# - AnySession: sync or async session type accepted by these functions
+# - create_product
+# - get_product
+# - get_products_by_ids
+# - get_products_by_names
+# - get_products
+# - get_products_after
+# - search_products
+# - get_product_version
+# - get_product_versions
+# - get_product_changes
+# - update_product
+# - delete_product
+# - bulk_create_products
+# - bulk_update_products
+# - bulk_delete_products
+# - create_import_staging
+# - stage_import_rows
+# - merge_import
+# - stream_products
+# - session_scope
+# - release_connection
+# - get_product_cached
+# - get_products_by_ids_cached
+# - list_params
+# - get_products_cached
+# - get_products_after_cached
+# - search_products_cached
@@ -0,0 +1,378 @@
+import atexit
+import fcntl
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+from . import database, log, metrics, models
+
+logger = logging.getLogger("cloud-infra-api.audit")
+
+# Record create, update and delete events in the audit_events table
+ENABLED = os.getenv("AUDIT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Buffered events are written once this many are waiting, or every
+# AUDIT_FLUSH_INTERVAL_SECONDS, whichever comes first
+FLUSH_SIZE = int(os.getenv("AUDIT_FLUSH_SIZE", "500"))
+FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", "1"))
+
+# Events held in memory at most; beyond this (the database is down or too
+# slow) the buffer is appended to the spool file instead
+MAX_BUFFER = int(os.getenv("AUDIT_MAX_BUFFER", "10000"))
+
+# Directory of spool files: events that could not be written to the table,
+# replayed into it once writes succeed again (also by the next process)
+SPOOL_DIR = os.getenv("AUDIT_SPOOL_DIR", "audit-spool")
+
+# Rows per multi-row INSERT; 8 parameters per row stays under SQLite's and
+# PostgreSQL's bind parameter limits
+INSERT_CHUNK = 1000
+
+AUDIT_EVENTS = metrics.registry.register(metrics.Counter(
+    "audit_events_total",
+    "Audit events by outcome: written to the table, spooled to disk, replayed from the spool, or dropped.",
+    ("outcome",)
+))
+
+class AuditRecorder:
+    """
+    Write-behind recorder for the audit_events table.
+
+    ``record`` only appends to an in-memory buffer, so a mutating request
+    pays no extra statement. A background thread writes the buffer in
+    multi-row INSERTs when ``flush_size`` events are waiting or every
+    ``flush_interval`` seconds. Events that cannot be written (the buffer
+    is full, a flush fails, or the process stops before flushing) are
+    appended to a per-process NDJSON spool file in ``spool_dir`` with one
+    fsync per batch, and replayed into the table by the next successful
+    flush, in this process or the next one to start.
+
+    Each process holds an exclusive flock on its spool file for as long as
+    it may append to it, and replays only files it can lock: those whose
+    writer has exited. This holds for processes in several containers
+    sharing the spool volume, where process IDs are not unique.
+
+    Delivery is at least once: an event is only lost if the spool cannot
+    be written either, and a crash while replaying a spool file can write
+    its events twice.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        flush_size: int = FLUSH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_buffer: int = MAX_BUFFER,
+        spool_dir: str = SPOOL_DIR,
+        enabled: bool = ENABLED
+    ):
+        self.engine = engine
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.spool_dir = spool_dir
+        self.enabled = enabled
+        self._buffer: List[dict] = []
+        self._cond = threading.Condition()
+        self._spool_lock = threading.Lock()
+        # Open, flock-ed spool file of this process, and the pid that opened it
+        self._spool_file: Optional[BinaryIO] = None
+        self._spool_pid = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._exit_registered = False
+        # Spool files may exist (left by an earlier process); checked on the first flush
+        self._spooled = True
+
+    @property
+    def pending(self) -> int:
+        """
+        Events buffered in memory, not yet written.
+        """
+        return len(self._buffer)
+
+    def record(
+        self,
+        action: str,
+        product_id: int,
+        actor: Optional[str],
+        before: Optional[dict] = None,
+        after: Optional[dict] = None
+    ) -> None:
+        """
+        Buffer one event, tagged with the current request id.
+
+        Call it after the change commits, so rolled back changes are not
+        audited. Never blocks on the database.
+
+        Args:
+            action (str): schemas.ChangeOp value of the change.
+            product_id (int): Changed product.
+            actor (Optional[str]): Username making the change.
+            before (Optional[dict]): Product before the change (serialization.product_to_dict fields).
+            after (Optional[dict]): Product after the change.
+        """
+        self.record_many(action, actor, [(product_id, before, after)])
+
+    def record_many(
+        self,
+        action: str,
+        actor: Optional[str],
+        changes: Iterable[Tuple[int, Optional[dict], Optional[dict]]]
+    ) -> None:
+        """
+        Buffer one event per changed product, like ``record``, under one lock.
+
+        Args:
+            action (str): schemas.ChangeOp value of the changes.
+            actor (Optional[str]): Username making the changes.
+            changes (Iterable[Tuple[int, Optional[dict], Optional[dict]]]): (product_id, before, after) per product.
+        """
+        if not self.enabled:
+            return
+        context = log.current_request()
+        request_id = context.request_id if context is not None else None
+        now = datetime.utcnow()
+        events = [
+            {
+                "occurred_at": now,
+                "actor": actor,
+                "action": action,
+                "product_id": product_id,
+                "request_id": request_id,
+                "before": before,
+                "after": after,
+            }
+            for product_id, before, after in changes
+        ]
+        if not events:
+            return
+        with self._cond:
+            if len(self._buffer) + len(events) <= self.max_buffer:
+                self._buffer.extend(events)
+                if len(self._buffer) >= self.flush_size:
+                    self._cond.notify()
+                return
+            overflow, self._buffer = self._buffer, []
+        overflow.extend(events)
+        self._spool(overflow, "buffer full")
+
+    def _take(self) -> List[dict]:
+        with self._cond:
+            batch, self._buffer = self._buffer, []
+        return batch
+
+    def _insert(self, events: Iterator[dict]) -> int:
+        count = 0
+        with self.engine.begin() as connection:
+            chunk: List[dict] = []
+            for event in events:
+                chunk.append(event)
+                if len(chunk) == INSERT_CHUNK:
+                    connection.execute(insert(models.AuditEvent).values(chunk))
+                    count, chunk = count + len(chunk), []
+            if chunk:
+                connection.execute(insert(models.AuditEvent).values(chunk))
+                count += len(chunk)
+        return count
+
+    def flush(self) -> int:
+        """
+        Write buffered events now; spool them if the write fails.
+
+        After a successful write, spool files left by failed writes are replayed.
+
+        Returns:
+            int: Events written from the buffer.
+        """
+        batch = self._take()
+        if batch:
+            try:
+                self._insert(iter(batch))
+            except Exception as e:
+                logger.warning("Writing %d audit events failed: %s", len(batch), e)
+                self._spool(batch, "flush failed")
+                return 0
+            AUDIT_EVENTS.inc("written", amount=len(batch))
+        if self._spooled:
+            self.replay_spool()
+        return len(batch)
+
+    def _open_spool(self) -> BinaryIO:
+        # Called with _spool_lock held. A forked worker inherits the file (and
+        # the lock) of its parent, so it starts its own
+        if self._spool_file is not None and self._spool_pid == os.getpid():
+            return self._spool_file
+        if self._spool_file is not None:
+            self._spool_file.close()
+        os.makedirs(self.spool_dir, exist_ok=True)
+        path = os.path.join(self.spool_dir, f"audit-{os.getpid()}-{uuid.uuid4().hex}.ndjson")
+        # Locked before it gets a name replay_spool looks at, so it is never seen unlocked
+        spool = open(path + ".new", "ab")
+        fcntl.flock(spool.fileno(), fcntl.LOCK_EX)
+        os.rename(path + ".new", path)
+        self._spool_file, self._spool_pid = spool, os.getpid()
+        return spool
+
+    def _close_spool(self) -> None:
+        # Called with _spool_lock held; releases the file for replay
+        if self._spool_file is not None:
+            self._spool_file.close()
+            self._spool_file = None
+
+    def _spool(self, events: List[dict], reason: str) -> None:
+        lines = b"".join(orjson.dumps(event) + b"\n" for event in events)
+        try:
+            with self._spool_lock:
+                spool = self._open_spool()
+                spool.write(lines)
+                spool.flush()
+                os.fsync(spool.fileno())
+                self._spooled = True
+        except OSError:
+            logger.exception("Spooling %d audit events failed; they are lost", len(events))
+            AUDIT_EVENTS.inc("dropped", amount=len(events))
+            return
+        AUDIT_EVENTS.inc("spooled", amount=len(events))
+        logger.warning("Spooled %d audit events to %s (%s)", len(events), self.spool_dir, reason)
+
+    def _claim(self, name: str) -> Optional[BinaryIO]:
+        # A spool file is an orphan once its writer has exited and the kernel
+        # has released its lock; the lock is then held until the file is removed
+        if not (name.startswith("audit-") and name.endswith(".ndjson")):
+            return None
+        path = os.path.join(self.spool_dir, name)
+        try:
+            spool = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            fcntl.flock(spool.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            # Replayed and removed by another process between opening and locking
+            if os.fstat(spool.fileno()).st_ino != os.stat(path).st_ino:
+                raise FileNotFoundError(path)
+        except OSError:
+            spool.close()
+            return None
+        return spool
+
+    def _read_spool(self, spool: BinaryIO) -> Iterator[dict]:
+        for number, line in enumerate(spool, 1):
+            try:
+                event = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                # A torn last line from a crash mid-write
+                logger.warning("Skipping unreadable audit spool line %s:%d", spool.name, number)
+                continue
+            event["occurred_at"] = datetime.fromisoformat(event["occurred_at"])
+            yield event
+
+    def replay_spool(self) -> int:
+        """
+        Write spooled events into the table and delete their spool files.
+
+        Replays this process's own file, which it closes first so later
+        events go to a new one, and files left by exited processes; files
+        other live processes hold locked are left alone. A file stays
+        locked while it is replayed, so no two processes replay the same
+        one; a file that fails to replay is unlocked and retried on a
+        later flush.
+
+        Returns:
+            int: Events replayed.
+        """
+        with self._spool_lock:
+            self._spooled = False
+            self._close_spool()
+            try:
+                names = sorted(os.listdir(self.spool_dir))
+            except FileNotFoundError:
+                return 0
+            claimed = [spool for spool in map(self._claim, names) if spool is not None]
+        replayed = 0
+        for spool in claimed:
+            with spool:
+                try:
+                    count = self._insert(self._read_spool(spool))
+                except Exception as e:
+                    logger.warning("Replaying audit spool %s failed: %s", spool.name, e)
+                    self._spooled = True
+                    continue
+                os.remove(spool.name)
+            replayed += count
+            AUDIT_EVENTS.inc("replayed", amount=count)
+        if replayed:
+            logger.info("Replayed %d spooled audit events", replayed)
+        return replayed
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stopping or len(self._buffer) >= self.flush_size, self.flush_interval
+                )
+                stopping = self._stopping
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Audit flush failed")
+            if stopping:
+                return
+
+    def start(self) -> None:
+        """
+        Start the background flush thread, if not already running.
+        """
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="audit-recorder", daemon=True)
+        self._thread.start()
+        if not self._exit_registered:
+            atexit.register(self.stop)
+            self._exit_registered = True
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        Flush what is buffered and stop the background thread.
+
+        Events the final flush cannot write, including when it does not
+        finish within ``timeout`` seconds, are spooled, and the spool file
+        is released for the next process to replay.
+        """
+        thread, self._thread = self._thread, None
+        if thread is None:
+            self.flush()
+        else:
+            with self._cond:
+                self._stopping = True
+                self._cond.notify()
+            thread.join(timeout)
+            remaining = self._take()
+            if remaining:
+                self._spool(remaining, "shutdown")
+        with self._spool_lock:
+            self._close_spool()
+
+# Process-wide recorder fed by every product write in crud: single-row and
+# bulk creates, updates and deletes, and imports
+recorder = AuditRecorder(database.engine)
+
+metrics.registry.register(metrics.Gauge(
+    "audit_buffer_depth", "Audit events buffered in memory, waiting to be written.",
+    callback=lambda: recorder.pending
+))
+
+# Exports:
+# - ENABLED, FLUSH_SIZE, FLUSH_INTERVAL, MAX_BUFFER, SPOOL_DIR: recorder settings
+# - INSERT_CHUNK: rows per multi-row INSERT
+# - AUDIT_EVENTS: audit event counter by outcome
+# - AuditRecorder: buffered, batched audit writer with a disk spool fallback
+# - recorder: process-wide AuditRecorder
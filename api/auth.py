@@ -0,0 +1,320 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+import httpx
+import jwt
+
+from . import metrics
+
+logger = logging.getLogger("cloud-infra-api.auth")
+
+# JWKS endpoint of the identity provider; without it any non-empty bearer token is accepted (development only)
+JWKS_URL = os.getenv("AUTH_JWKS_URL", "")
+ISSUER = os.getenv("AUTH_ISSUER") or None
+AUDIENCE = os.getenv("AUTH_AUDIENCE") or None
+ALGORITHMS = tuple(a.strip() for a in os.getenv("AUTH_ALGORITHMS", "RS256").split(",") if a.strip())
+
+# Claim holding the username recorded in audit columns
+USERNAME_CLAIM = os.getenv("AUTH_USERNAME_CLAIM", "sub")
+
+# Seconds between background JWKS refreshes
+JWKS_REFRESH_INTERVAL = float(os.getenv("AUTH_JWKS_REFRESH_SECONDS", "300"))
+
+# Minimum seconds between on-demand refreshes triggered by unknown key ids
+JWKS_MIN_REFRESH_INTERVAL = float(os.getenv("AUTH_JWKS_MIN_REFRESH_SECONDS", "10"))
+
+# Verified tokens remembered per worker
+TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+
+# Clock skew tolerated when checking exp/nbf/iat
+LEEWAY_SECONDS = float(os.getenv("AUTH_LEEWAY_SECONDS", "30"))
+
+AUTH_TOKENS = metrics.registry.register(metrics.Counter(
+    "auth_tokens_total", "Bearer tokens by validation outcome (cached, verified, rejected).", ("result",)
+))
+JWKS_REFRESHES = metrics.registry.register(metrics.Counter(
+    "auth_jwks_refreshes_total", "JWKS fetches by outcome.", ("result",)
+))
+
+class InvalidTokenError(Exception):
+    """
+    Raised when a bearer token fails validation.
+    """
+
+class KeyUnavailableError(InvalidTokenError):
+    """
+    Raised when a token's signing key is not in the key set, even after a refresh.
+    """
+
+class TokenCache:
+    """
+    Bounded LRU of verified token claims, keyed by the token's SHA-256.
+
+    Entries expire at the token's ``exp``. Tokens themselves are never
+    stored, only their hashes.
+    """
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str, dict]]" = OrderedDict()
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, claims = entry
+        if expires_at <= (time.time() if now is None else now):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return claims
+
+    def set(self, key: str, claims: dict, kid: str) -> None:
+        self._entries[key] = (float(claims["exp"]), kid, claims)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard_keys(self, kids: Sequence[str]) -> None:
+        """
+        Drop tokens signed by keys that left the key set.
+        """
+        revoked = set(kids)
+        for key in [k for k, (_, kid, _) in self._entries.items() if kid in revoked]:
+            del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class JWKSCache:
+    """
+    Signing keys fetched from a JWKS endpoint and refreshed in the background.
+
+    The refresh task starts on first use in the running event loop. A token
+    signed with an unknown key id triggers one on-demand refresh (at most
+    every ``min_refresh_interval`` seconds) so key rotations are picked up
+    without waiting for the next scheduled refresh. A failed refresh keeps
+    the previous keys.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        refresh_interval: float = JWKS_REFRESH_INTERVAL,
+        min_refresh_interval: float = JWKS_MIN_REFRESH_INTERVAL,
+        timeout: float = 5.0
+    ):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.keys: Dict[str, jwt.PyJWK] = {}
+        self.on_removed = lambda kids: None
+        self._fetched_at = float("-inf")
+        self._fetch: Optional[asyncio.Task] = None
+        self._refresher: Optional[asyncio.Task] = None
+
+    async def _download(self) -> Dict[str, jwt.PyJWK]:
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.get(self.url)
+            response.raise_for_status()
+            data = response.json()
+        keys = {}
+        for jwk in data.get("keys", []):
+            if jwk.get("use", "sig") != "sig" or "kid" not in jwk:
+                continue
+            try:
+                keys[jwk["kid"]] = jwt.PyJWK(jwk)
+            except jwt.PyJWTError as e:
+                logger.warning("Skipping unusable JWKS key %s: %s", jwk.get("kid"), e)
+        return keys
+
+    async def refresh(self) -> None:
+        """
+        Fetch the key set; concurrent callers share one request.
+        """
+        loop = asyncio.get_running_loop()
+        if self._fetch is None or self._fetch.done() or self._fetch.get_loop() is not loop:
+            self._fetch = loop.create_task(self._refresh())
+        await asyncio.shield(self._fetch)
+
+    async def _refresh(self) -> None:
+        self._fetched_at = time.monotonic()
+        try:
+            keys = await self._download()
+        except (httpx.HTTPError, ValueError) as e:
+            JWKS_REFRESHES.inc("error")
+            logger.warning("JWKS refresh from %s failed: %s", self.url, e)
+            return
+        JWKS_REFRESHES.inc("ok")
+        removed = [kid for kid in self.keys if kid not in keys]
+        self.keys = keys
+        if removed:
+            self.on_removed(removed)
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    def start(self) -> None:
+        """
+        Start the background refresh task in the running loop, if not already running there.
+        """
+        loop = asyncio.get_running_loop()
+        if self._refresher is None or self._refresher.done() or self._refresher.get_loop() is not loop:
+            self._refresher = loop.create_task(self._refresh_periodically())
+
+    def stop(self) -> None:
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+
+    async def get_key(self, kid: str) -> jwt.PyJWK:
+        """
+        Return the signing key for ``kid``.
+
+        Raises:
+            KeyUnavailableError: If the key is unknown after a refresh.
+        """
+        self.start()
+        key = self.keys.get(kid)
+        fetching = self._fetch is not None and not self._fetch.done()
+        if key is None and (fetching or time.monotonic() - self._fetched_at >= self.min_refresh_interval):
+            await self.refresh()
+            key = self.keys.get(kid)
+        if key is None:
+            raise KeyUnavailableError(f"Unknown signing key: {kid}")
+        return key
+
+class TokenValidator:
+    """
+    Verify bearer JWTs against a JWKS, remembering verified tokens until they expire.
+
+    A repeated token costs a hash and a dictionary lookup; only new tokens
+    pay for the signature check.
+    """
+
+    def __init__(
+        self,
+        jwks: JWKSCache,
+        issuer: Optional[str] = ISSUER,
+        audience: Optional[str] = AUDIENCE,
+        algorithms: Sequence[str] = ALGORITHMS,
+        cache: Optional[TokenCache] = None,
+        leeway: float = LEEWAY_SECONDS
+    ):
+        self.jwks = jwks
+        self.issuer = issuer
+        self.audience = audience
+        self.algorithms = list(algorithms)
+        self.cache = cache if cache is not None else TokenCache()
+        self.leeway = leeway
+        jwks.on_removed = self.cache.discard_keys
+
+    async def validate(self, token: str) -> dict:
+        """
+        Return the claims of a valid token.
+
+        Raises:
+            InvalidTokenError: If the token is malformed, expired, signed by an
+                unknown key or fails signature, issuer or audience checks.
+        """
+        cache_key = TokenCache.key(token)
+        claims = self.cache.get(cache_key)
+        if claims is not None:
+            AUTH_TOKENS.inc("cached")
+            return claims
+        try:
+            header = jwt.get_unverified_header(token)
+            kid = header.get("kid", "")
+            key = await self.jwks.get_key(kid)
+            claims = jwt.decode(
+                token,
+                key.key,
+                algorithms=self.algorithms,
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.leeway,
+                options={"require": ["exp"], "verify_aud": self.audience is not None},
+            )
+        except (jwt.PyJWTError, InvalidTokenError) as e:
+            AUTH_TOKENS.inc("rejected")
+            raise InvalidTokenError(str(e)) from e
+        AUTH_TOKENS.inc("verified")
+        self.cache.set(cache_key, claims, kid)
+        return claims
+
+# Configured from AUTH_* settings; None runs without token verification
+validator: Optional[TokenValidator] = TokenValidator(JWKSCache(JWKS_URL)) if JWKS_URL else None
+
+def verified_token_key(token: str) -> Optional[str]:
+    """
+    Return the cache key of a token this worker has verified and that has not expired.
+
+    Only looks the token up, never verifies it, so code running before
+    authentication (rate limiting) cannot be made to check signatures.
+    Without AUTH_JWKS_URL no token is ever verified.
+
+    Returns:
+        Optional[str]: The token's SHA-256, or None if it is not a verified token.
+    """
+    if validator is None or not token:
+        return None
+    key = TokenCache.key(token)
+    return key if validator.cache.get(key) is not None else None
+
+async def authenticate(token: str) -> dict:
+    """
+    Resolve a bearer token to the current user.
+
+    Returns:
+        dict: ``username`` (from USERNAME_CLAIM) and the token ``claims``.
+
+    Raises:
+        InvalidTokenError: If the token is rejected or lacks the username claim.
+    """
+    if validator is None:
+        return {"username": "demo-user", "claims": {}}
+    claims = await validator.validate(token)
+    username = claims.get(USERNAME_CLAIM)
+    if not isinstance(username, str) or not username:
+        raise InvalidTokenError(f"Token has no {USERNAME_CLAIM} claim.")
+    return {"username": username, "claims": claims}
+
+async def startup() -> None:
+    """
+    Fetch signing keys and start their background refresh, so the first request does not wait on the JWKS.
+    """
+    if validator is not None:
+        validator.jwks.start()
+        await validator.jwks.refresh()
+
+def shutdown() -> None:
+    """
+    Stop the background JWKS refresh.
+    """
+    if validator is not None:
+        validator.jwks.stop()
+
+# Exports:
+# - JWKS_URL, ISSUER, AUDIENCE, ALGORITHMS, USERNAME_CLAIM: token validation settings
+# - JWKS_REFRESH_INTERVAL, JWKS_MIN_REFRESH_INTERVAL, TOKEN_CACHE_SIZE, LEEWAY_SECONDS: cache settings
+# - AUTH_TOKENS, JWKS_REFRESHES: authentication counters
+# - InvalidTokenError / KeyUnavailableError: token validation errors
+# - TokenCache: LRU of verified token claims
+# - JWKSCache: background-refreshed signing keys
+# - TokenValidator: JWT validation with caching
+# - validator: configured validator, or None without AUTH_JWKS_URL
+# - verified_token_key: identify a token already verified by this worker
+# - authenticate: resolve a bearer token to the current user
+# - startup / shutdown: start and stop background key refresh
@@ -0,0 +1,112 @@
+"""
+Response compression benchmark: CPU cost versus bytes saved per encoding.
+
+Compresses representative response bodies with every installed encoding
+at a few levels and reports the compressed size, the ratio and the CPU
+time per response:
+
+- page-100 / page-1000: a list_products JSON page of 100 / 1000 products
+- export-stream: a 10000-row NDJSON export, compressed incrementally in
+  1000-row chunks with a flush after each one, as CompressionMiddleware
+  does for streamed responses
+
+Products are synthetic, with names and descriptions shaped like the
+catalog's; no database is needed:
+
+    python -m api.benchmarks.compression
+"""
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+import orjson
+
+from api import compression, export
+from api.benchmarks.timing import measure
+
+# Levels compared per encoding; the first is the configured default
+LEVELS: Dict[str, Tuple[int, ...]] = {
+    "gzip": (compression.GZIP_LEVEL, 1, 9),
+    "br": (compression.BROTLI_QUALITY, 1, 6, 11),
+    "zstd": (compression.ZSTD_LEVEL, 1, 9, 19),
+}
+
+FACTORIES: Dict[str, Callable[[int], compression.Compressor]] = {
+    "gzip": compression.GzipCompressor,
+    "br": lambda level: compression.BrotliCompressor(quality=level),
+    "zstd": compression.ZstdCompressor,
+}
+
+WORDS = ("cloud", "automation", "suite", "kubernetes", "terraform", "monitoring", "pipeline", "secure", "edge", "data")
+
+def make_products(count: int, seed: int = 7) -> List[dict]:
+    rng = random.Random(seed)
+    start = datetime(2024, 6, 1, 12, 0, 0)
+    products = []
+    for i in range(count):
+        created = start + timedelta(seconds=rng.randrange(10_000_000))
+        products.append({
+            "name": f"{' '.join(rng.choice(WORDS).title() for _ in range(3))} {i}",
+            "description": " ".join(rng.choice(WORDS) for _ in range(rng.randrange(4, 20))),
+            "id": i + 1,
+            "created_at": created.isoformat(),
+            "updated_at": (created + timedelta(seconds=rng.randrange(1_000_000))).isoformat(),
+            "created_by": rng.choice(("admin", "ci-bot", "importer", "load-test")),
+            "updated_by": rng.choice(("admin", "ci-bot", None)),
+            "version": rng.randrange(1, 20),
+        })
+    return products
+
+def export_chunks(products: List[dict], chunk_rows: int = export.EXPORT_BATCH_SIZE) -> List[bytes]:
+    rows = [tuple(p[column] for column in export.EXPORT_COLUMNS) for p in products]
+
+    async def batches():
+        for start in range(0, len(rows), chunk_rows):
+            yield rows[start:start + chunk_rows]
+
+    async def collect():
+        return [chunk async for chunk in export.encode_export(batches(), export.ExportFormat.ndjson)]
+    return asyncio.run(collect())
+
+def compress_whole(encoding: str, level: int, body: bytes) -> bytes:
+    return FACTORIES[encoding](level).finish(body)
+
+def compress_stream(encoding: str, level: int, chunks: List[bytes]) -> bytes:
+    compressor = FACTORIES[encoding](level)
+    out = [compressor.compress(chunk) for chunk in chunks]
+    out.append(compressor.finish())
+    return b"".join(out)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20, help="timed runs per case")
+    args = parser.parse_args()
+
+    products = make_products(10000)
+    payloads: Dict[str, Tuple[int, Callable[[str, int], bytes]]] = {}
+    for size in (100, 1000):
+        body = orjson.dumps(products[:size])
+        payloads[f"page-{size}"] = (len(body), lambda encoding, level, body=body: compress_whole(encoding, level, body))
+    chunks = export_chunks(products)
+    payloads["export-stream"] = (
+        sum(len(c) for c in chunks), lambda encoding, level: compress_stream(encoding, level, chunks)
+    )
+
+    print(f"{'payload':<14} {'encoding':<8} {'level':>5} {'bytes':>10} {'ratio':>6} {'saved':>10} {'cpu ms':>8} {'MB/s':>8}")
+    for payload, (raw_size, run) in payloads.items():
+        print(f"{payload:<14} {'identity':<8} {'-':>5} {raw_size:>10} {1.0:>6.2f} {0:>10} {0:>8.3f} {'-':>8}")
+        for encoding in compression.ENCODERS:
+            for level in LEVELS[encoding]:
+                size = len(run(encoding, level))
+                # Few iterations at the slowest levels; they are here to show why they are not defaults
+                iterations = max(1, args.iterations // 10) if level >= 11 else args.iterations
+                cpu_ms = measure(lambda: run(encoding, level), iterations)["p50"]
+                print(
+                    f"{payload:<14} {encoding:<8} {level:>5} {size:>10} {raw_size / size:>6.2f} "
+                    f"{raw_size - size:>10} {cpu_ms:>8.3f} {raw_size / 1e6 / (cpu_ms / 1000):>8.1f}"
+                )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+"""
+API load test with baselines and regression thresholds.
+
+``run`` seeds N products, then drives every endpoint of api.main with
+concurrent clients and reports throughput and p50/p95/p99 latency per
+scenario. By default requests go to the app in-process (ASGI, no network);
+``--base-url`` targets a running server instead, seeding the database it
+shares through DATABASE_URL (a local SQLite file when unset):
+
+    python -m api.benchmarks.load run --rows 100000 --concurrency 16 --output results.json
+
+``compare`` checks results against a stored baseline and exits non-zero when
+a metric regresses past its threshold (a fraction of the baseline value):
+
+    python -m api.benchmarks.load compare results.json api/benchmarks/baselines/sqlite-10k.json \\
+        --threshold p95_ms=0.25 --threshold throughput_rps=0.2
+
+``run --baseline FILE`` does both in one step.
+"""
+import os
+
+# The app reads DATABASE_URL at import time
+os.environ.setdefault("DATABASE_URL", "sqlite:///./load_benchmark.db")
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import func, insert, select
+
+from api import database, migrations, models, pagination
+from api.benchmarks.timing import summarize
+
+SEED_BATCH_SIZE = 10000
+
+# Items per bulk request and rows per import request
+BATCH_ITEMS = 10
+
+# IDs per batch lookup, the size of a typical UI page
+LOOKUP_ITEMS = 100
+
+# Allowed fractional regression per metric; latencies may grow, throughput may drop
+DEFAULT_THRESHOLDS = {"p95_ms": 0.25, "p99_ms": 0.5, "throughput_rps": 0.25}
+
+# Metrics where a larger value is better
+HIGHER_IS_BETTER = {"throughput_rps"}
+
+@dataclass
+class Context:
+    """
+    State shared by scenarios during a run.
+    """
+    run_id: str
+    product_ids: List[int]
+    deletable: Deque[int]
+    changes_head: str = ""
+    etags: Dict[int, str] = field(default_factory=dict)
+    counter: int = 0
+    rng: random.Random = field(default_factory=lambda: random.Random(7))
+
+    def unique(self, prefix: str) -> str:
+        self.counter += 1
+        return f"{prefix}-{self.run_id}-{self.counter}"
+
+    def product_id(self) -> int:
+        return self.rng.choice(self.product_ids)
+
+Request = Tuple[str, str, Dict[str, Any]]
+
+@dataclass
+class Scenario:
+    """
+    One endpoint exercise: builds a request and lists acceptable status codes.
+    """
+    name: str
+    build: Callable[[Context], Request]
+    expect: Tuple[int, ...] = (200,)
+    # Caps requests for endpoints whose cost grows with the table (full export)
+    max_requests: Optional[int] = None
+    # Caps workers for endpoints that are batch jobs rather than interactive traffic
+    max_concurrency: Optional[int] = None
+
+def _import_body(ctx: Context) -> bytes:
+    lines = [
+        json.dumps({"name": f"load-import-{ctx.rng.randrange(1000)}", "description": "Imported by load test"})
+        for _ in range(BATCH_ITEMS)
+    ]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+def _conditional_get(ctx: Context) -> Request:
+    product_id = ctx.product_id()
+    headers = {"If-None-Match": ctx.etags[product_id]} if product_id in ctx.etags else {}
+    return "GET", f"/products/{product_id}", {"headers": headers}
+
+def _deletable(ctx: Context, count: int) -> List[int]:
+    return [ctx.deletable.popleft() for _ in range(min(count, len(ctx.deletable)))] or [0]
+
+SCENARIOS = [
+    Scenario("health", lambda ctx: ("GET", "/health", {})),
+    Scenario("metrics", lambda ctx: ("GET", "/metrics", {})),
+    Scenario("cache_stats", lambda ctx: ("GET", "/cache/stats", {})),
+    Scenario("create_product", lambda ctx: (
+        "POST", "/products/", {"json": {"name": ctx.unique("load-create"), "description": "Created by load test"}}
+    ), expect=(201,)),
+    Scenario("list_offset", lambda ctx: (
+        "GET", "/products/", {"params": {"skip": ctx.rng.randrange(len(ctx.product_ids)), "limit": 100}}
+    )),
+    Scenario("list_keyset", lambda ctx: (
+        "GET", "/products/", {"params": {"after": pagination.encode_cursor({"id": ctx.product_id()}), "limit": 100}}
+    )),
+    Scenario("list_filtered_sorted", lambda ctx: (
+        "GET", "/products/", {"params": {"created_by": "load-test", "sort": "-updated_at", "after": "", "limit": 100}}
+    )),
+    Scenario("search", lambda ctx: (
+        "GET", "/products/search", {"params": {"q": ctx.rng.choice(["load", "product", "seeded 1"]), "limit": 20}}
+    )),
+    Scenario("changes_feed", lambda ctx: ("GET", "/products/changes", {"params": {"since": ctx.changes_head}})),
+    Scenario("changes_stream", lambda ctx: (
+        "GET", "/products/changes/stream", {"params": {"since": ctx.changes_head, "duration": 0}}
+    ), max_requests=20),
+    Scenario("export_ndjson", lambda ctx: ("GET", "/products/export", {"params": {"format": "ndjson"}}), max_requests=3),
+    Scenario("import_ndjson", lambda ctx: (
+        "POST", "/products/import", {"params": {"format": "ndjson", "on_conflict": "upsert"}, "content": _import_body(ctx)}
+    ), max_concurrency=1),
+    Scenario("bulk_create", lambda ctx: (
+        "POST", "/products/bulk", {"json": [{"name": ctx.unique("load-bulk")} for _ in range(BATCH_ITEMS)]}
+    )),
+    Scenario("bulk_update", lambda ctx: (
+        "PATCH", "/products/bulk", {"json": [
+            {"id": ctx.product_id(), "description": f"Bulk updated {ctx.counter}"} for _ in range(BATCH_ITEMS)
+        ]}
+    )),
+    Scenario("bulk_delete", lambda ctx: (
+        "DELETE", "/products/bulk", {"json": {"ids": _deletable(ctx, BATCH_ITEMS)}}
+    )),
+    Scenario("get_product", lambda ctx: ("GET", f"/products/{ctx.product_id()}", {})),
+    Scenario("get_product_conditional", _conditional_get, expect=(200, 304)),
+    Scenario("batch_get", lambda ctx: (
+        "GET", "/products/batch", {"params": {"ids": ",".join(str(ctx.product_id()) for _ in range(LOOKUP_ITEMS))}}
+    )),
+    Scenario("batch_post", lambda ctx: (
+        "POST", "/products/batch", {"json": {"ids": [ctx.product_id() for _ in range(LOOKUP_ITEMS)]}}
+    )),
+    Scenario("update_product", lambda ctx: (
+        "PUT", f"/products/{ctx.product_id()}", {"json": {"description": ctx.unique("updated")}}
+    )),
+    Scenario("delete_product", lambda ctx: ("DELETE", f"/products/{_deletable(ctx, 1)[0]}", {}), expect=(200, 404)),
+]
+
+def seed(rows: int, deletable: int, run_id: str) -> Tuple[List[int], List[int]]:
+    """
+    Top the products table up to ``rows`` seeded products and add rows for delete scenarios.
+
+    Returns:
+        Tuple[List[int], List[int]]: IDs of seeded products, and of products created for deletion.
+    """
+    migrations.migrate(database.engine)
+    with database.SessionLocal() as db:
+        seeded = select(models.Product.id).where(models.Product.created_by == "load-test")
+        existing = db.scalar(select(func.count()).select_from(seeded.subquery()))
+        now = datetime.utcnow()
+        for start in range(existing, rows, SEED_BATCH_SIZE):
+            db.execute(insert(models.Product), [
+                {"name": f"load-seeded {i}", "description": f"Load test product {i}",
+                 "created_at": now, "updated_at": now, "created_by": "load-test", "updated_by": "load-test"}
+                for i in range(start, min(start + SEED_BATCH_SIZE, rows))
+            ])
+            db.commit()
+        doomed = db.scalars(insert(models.Product).returning(models.Product.id), [
+            {"name": f"load-delete-{run_id}-{i}", "created_at": now, "updated_at": now, "created_by": "load-delete"}
+            for i in range(deletable)
+        ]).all() if deletable else []
+        db.commit()
+        return db.scalars(seeded.order_by(models.Product.id).limit(rows)).all(), list(doomed)
+
+async def _prepare(client: httpx.AsyncClient, ctx: Context) -> None:
+    token = ""
+    while True:
+        feed = (await client.get("/products/changes", params={"since": token, "limit": 1000})).json()
+        token = feed["next"]
+        if not feed["has_more"]:
+            break
+    ctx.changes_head = token
+    for product_id in ctx.product_ids[:50]:
+        response = await client.get(f"/products/{product_id}")
+        if "ETag" in response.headers:
+            ctx.etags[product_id] = response.headers["ETag"]
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, ctx: Context, requests: int, concurrency: int) -> dict:
+    """
+    Issue ``requests`` requests for a scenario from ``concurrency`` concurrent workers.
+
+    Returns:
+        dict: requests, errors, throughput_rps and p50/p95/p99/mean latency in ms.
+    """
+    remaining = min(requests, scenario.max_requests or requests)
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, path, kwargs = scenario.build(ctx)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                ok = response.status_code in scenario.expect
+            except httpx.HTTPError:
+                ok = False
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += not ok
+
+    started = time.perf_counter()
+    workers = min(concurrency, scenario.max_concurrency or concurrency, remaining)
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    elapsed = time.perf_counter() - started
+    summary = summarize(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed,
+        **{f"{name}_ms": value for name, value in summary.items()},
+    }
+
+async def run_suite(
+    rows: int,
+    requests: int,
+    concurrency: int,
+    base_url: Optional[str] = None,
+    token: str = "load-test",
+    only: Optional[List[str]] = None
+) -> dict:
+    """
+    Seed the database and run every scenario (or those named in ``only``) in turn.
+
+    Returns:
+        dict: ``meta`` describing the run and per-scenario results under ``scenarios``.
+    """
+    scenarios = [s for s in SCENARIOS if not only or s.name in only]
+    run_id = f"{int(time.time())}{random.randrange(1000)}"
+    needs_deletes = sum(
+        min(requests, s.max_requests or requests) * (BATCH_ITEMS if s.name == "bulk_delete" else 1)
+        for s in scenarios if s.name in ("bulk_delete", "delete_product")
+    )
+    product_ids, doomed = seed(rows, needs_deletes, run_id)
+    ctx = Context(run_id=run_id, product_ids=product_ids, deletable=deque(doomed))
+
+    if base_url:
+        transport, target = None, base_url
+    else:
+        from api.main import app
+
+        transport, target = httpx.ASGITransport(app=app), "http://in-process"
+    async with httpx.AsyncClient(
+        transport=transport, base_url=target, headers={"Authorization": f"Bearer {token}"},
+        timeout=60.0, limits=httpx.Limits(max_connections=concurrency)
+    ) as client:
+        await _prepare(client, ctx)
+        results = {}
+        for scenario in scenarios:
+            results[scenario.name] = await run_scenario(client, scenario, ctx, requests, concurrency)
+    return {
+        "meta": {
+            "rows": rows,
+            "requests": requests,
+            "concurrency": concurrency,
+            "target": "asgi" if not base_url else base_url,
+            "database": database.engine.dialect.name,
+            "async_db": database.USE_ASYNC_DB,
+            "python": platform.python_version(),
+            "timestamp": datetime.utcnow().isoformat(),
+        },
+        "scenarios": results,
+    }
+
+def compare(current: dict, baseline: dict, thresholds: Dict[str, float]) -> List[str]:
+    """
+    Compare run results against a baseline.
+
+    Args:
+        current (dict): Results of this run.
+        baseline (dict): Stored baseline results.
+        thresholds (Dict[str, float]): Allowed fractional regression per metric.
+
+    Returns:
+        List[str]: One message per regression or failed request; empty when the run passes.
+    """
+    problems = []
+    for name, result in current["scenarios"].items():
+        if result["errors"]:
+            problems.append(f"{name}: {result['errors']} of {result['requests']} requests failed")
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            continue
+        for metric, allowed in thresholds.items():
+            if metric not in result or not base.get(metric):
+                continue
+            change = (result[metric] - base[metric]) / base[metric]
+            regressed = -change > allowed if metric in HIGHER_IS_BETTER else change > allowed
+            if regressed:
+                problems.append(
+                    f"{name}: {metric} {result[metric]:.2f} vs baseline {base[metric]:.2f} "
+                    f"({change:+.0%}, allowed {allowed:.0%})"
+                )
+    return problems
+
+def format_results(results: dict) -> str:
+    lines = [f"{'scenario':<24} {'reqs':>6} {'errors':>6} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+    for name, r in results["scenarios"].items():
+        lines.append(
+            f"{name:<24} {r['requests']:>6} {r['errors']:>6} {r['throughput_rps']:>9.1f} "
+            f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}"
+        )
+    return "\n".join(lines)
+
+def _parse_thresholds(values: List[str]) -> Dict[str, float]:
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    for value in values:
+        metric, _, fraction = value.partition("=")
+        thresholds[metric] = float(fraction)
+    return thresholds
+
+def _check(results: dict, baseline_path: str, thresholds: Dict[str, float]) -> int:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    problems = compare(results, baseline, thresholds)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    print(f"{len(problems)} regression(s) against {baseline_path}")
+    return 1 if problems else 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="seed and load-test the API")
+    run.add_argument("--rows", type=int, default=10000, help="seeded products, e.g. 10000 / 100000 / 1000000")
+    run.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    run.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    run.add_argument("--base-url", help="target a running server instead of the in-process app")
+    run.add_argument("--token", default=os.getenv("LOAD_TEST_TOKEN", "load-test"), help="bearer token")
+    run.add_argument("--scenario", action="append", help="run only this scenario (repeatable)")
+    run.add_argument("--output", help="write results JSON here (use as a baseline)")
+    run.add_argument("--baseline", help="compare against this baseline after the run")
+    run.add_argument("--threshold", action="append", default=[], metavar="METRIC=FRACTION")
+
+    check = commands.add_parser("compare", help="compare results against a baseline")
+    check.add_argument("results")
+    check.add_argument("baseline")
+    check.add_argument("--threshold", action="append", default=[], metavar="METRIC=FRACTION")
+
+    args = parser.parse_args()
+    thresholds = _parse_thresholds(args.threshold)
+    if args.command == "compare":
+        with open(args.results) as f:
+            return _check(json.load(f), args.baseline, thresholds)
+
+    results = asyncio.run(run_suite(
+        args.rows, args.requests, args.concurrency, base_url=args.base_url, token=args.token, only=args.scenario
+    ))
+    print(format_results(results))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    return _check(results, args.baseline, thresholds) if args.baseline else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
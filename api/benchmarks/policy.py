@@ -0,0 +1,153 @@
+"""
+Terraform plan policy check benchmark.
+
+Writes a synthetic ``terraform show -json`` plan with --resources resource
+changes (security groups, RDS instances, EC2 instances and untargeted types,
+with full attribute payloads and a few percent of violations) and reports:
+
+- parse + index: streaming with ijson versus loading the whole document,
+  with peak Python memory for each
+- evaluate: indexed rules in this process, and sharded on process pools
+- end to end: api.policy.check_plan with automatic worker selection
+- opa: with --opa-sample N and opa installed, the per-resource cost of
+  evaluating policies.rego by shelling out to ``opa eval``, extrapolated
+  to the whole plan
+
+    python -m api.benchmarks.policy --resources 20000
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, List
+
+from api import policy
+from api.benchmarks.timing import measure
+
+REGO = os.path.join(os.path.dirname(__file__), "..", "..", "iac", "terraform", "policies.rego")
+
+TYPES = (
+    ("aws_security_group", 0.2),
+    ("aws_db_instance", 0.05),
+    ("aws_instance", 0.25),
+    ("aws_subnet", 0.15),
+    ("aws_s3_bucket", 0.15),
+    ("aws_iam_role", 0.2),
+)
+
+def make_after(resource_type: str, i: int, rng: random.Random) -> dict:
+    tags = {"Project": "bench", "Environment": "prod", "Owner": "platform", "Name": f"{resource_type}-{i}"}
+    if rng.random() < 0.03:
+        del tags["Project"]
+    after = {f"attribute_{n}": f"value-{i}-{n}" for n in range(20)}
+    after["tags"] = tags
+    after["tags_all"] = dict(tags)
+    if resource_type == "aws_security_group":
+        after["name"] = f"sg-{i}"
+        after["ingress"] = [
+            {"from_port": port, "to_port": port, "protocol": "tcp", "description": "ingress",
+             "cidr_blocks": ["0.0.0.0/0"] if rng.random() < 0.5 else ["10.0.0.0/8"],
+             "ipv6_cidr_blocks": [], "prefix_list_ids": [], "security_groups": [], "self": False}
+            for port in rng.sample((22, 80, 443, 5432, 8000, 8080), rng.randrange(1, 5))
+        ]
+    elif resource_type == "aws_db_instance":
+        after.update(identifier=f"db-{i}", storage_encrypted=rng.random() > 0.05, publicly_accessible=rng.random() < 0.05)
+    elif resource_type == "aws_instance":
+        if rng.random() > 0.05:
+            tags["AuditLogEnabled"] = "true"
+    return after
+
+def write_plan(path: str, resources: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    names, weights = zip(*TYPES)
+    with open(path, "w") as f:
+        f.write('{"format_version": "1.2", "terraform_version": "1.7.5", "resource_changes": [')
+        for i in range(resources):
+            resource_type = rng.choices(names, weights)[0]
+            after = make_after(resource_type, i, rng)
+            change = {
+                "address": f"module.account_{i % 50}.{resource_type}.r{i}", "mode": "managed", "type": resource_type,
+                "name": f"r{i}", "provider_name": "registry.terraform.io/hashicorp/aws",
+                "change": {"actions": ["update"], "before": after, "after": after, "after_unknown": {}},
+            }
+            f.write(("," if i else "") + json.dumps(change))
+        f.write('], "configuration": {}}')
+
+def index_plan(path: str, streaming: bool) -> dict:
+    saved = policy.ijson
+    if not streaming:
+        policy.ijson = None
+    try:
+        with open(path, "rb") as stream:
+            return policy.index_resources(policy.read_resource_changes(stream))
+    finally:
+        policy.ijson = saved
+
+def peak_memory_mb(run: Callable[[], object]) -> float:
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+def opa_ms_per_resource(path: str, sample: int) -> float:
+    with open(path, "rb") as stream:
+        changes = [change for _, change in zip(range(sample), policy.read_resource_changes(stream))]
+    start = time.perf_counter()
+    for change in changes:
+        subprocess.run(
+            ["opa", "eval", "--format", "json", "--stdin-input", "-d", REGO, "data.terraform.security.deny"],
+            input=json.dumps({"resource_type": change["type"], "resource": change["change"]["after"]}),
+            capture_output=True, text=True, check=True
+        )
+    return (time.perf_counter() - start) * 1000 / len(changes)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resources", type=int, default=20000, help="resource changes in the synthetic plan")
+    parser.add_argument("--iterations", type=int, default=3, help="timed runs per case")
+    parser.add_argument("--workers", type=int, nargs="*", default=[2, 4], help="process pool sizes to compare")
+    parser.add_argument("--opa-sample", type=int, default=0, help="resources to evaluate with opa eval, if installed")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "plan.json")
+        write_plan(path, args.resources)
+        size_mb = os.path.getsize(path) / 1e6
+        index = index_plan(path, streaming=True)
+        checked = sum(len(entries) for entries in index.values())
+        violations = len(policy.evaluate(index))
+        print(f"plan: {args.resources} resources, {size_mb:.1f} MB, {violations} violations, {os.cpu_count()} CPUs")
+
+        rows: List[tuple] = []
+        parsers = [("parse + index (ijson)", True)] if policy.ijson is not None else []
+        parsers.append(("parse + index (json.load)", False))
+        for label, streaming in parsers:
+            ms = measure(lambda: index_plan(path, streaming), args.iterations)["p50"]
+            rows.append((label, ms, peak_memory_mb(lambda: index_plan(path, streaming))))
+        rows.append(("evaluate (in process)", measure(lambda: policy.evaluate(index, workers=1), args.iterations)["p50"], None))
+        for workers in args.workers:
+            shard_size = max(1, -(-checked // (workers * 4)))
+            ms = measure(lambda: policy.evaluate(index, workers=workers, shard_size=shard_size), args.iterations)["p50"]
+            rows.append((f"evaluate ({workers} processes)", ms, None))
+
+        def end_to_end():
+            with open(path, "rb") as stream:
+                return policy.check_plan(stream)
+        rows.append(("end to end (check_plan)", measure(end_to_end, args.iterations)["p50"], None))
+        if args.opa_sample and shutil.which("opa"):
+            per_resource = opa_ms_per_resource(path, args.opa_sample)
+            rows.append((f"opa eval per resource (x{checked}, estimated)", per_resource * checked, None))
+
+    print(f"{'stage':<44} {'ms':>10} {'resources/s':>12} {'peak MB':>8}")
+    for label, ms, peak in rows:
+        print(f"{label:<44} {ms:>10.1f} {checked / (ms / 1000):>12.0f} {'-' if peak is None else f'{peak:.1f}':>8}")
+
+if __name__ == "__main__":
+    main()
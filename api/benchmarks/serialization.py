@@ -0,0 +1,86 @@
+"""
+List page serialization benchmark.
+
+Compares the previous list_products response path with the current one for
+pages of 100 and 1000 products:
+
+- before: load ORM instances, build and dump a schemas.Product per row,
+  re-validate the page against the response model and encode it with json
+- after: load PRODUCT_COLUMNS row tuples, serialize them with
+  serialization.product_to_dict and encode the page with orjson
+
+Both the full path (query + serialization) and serialization alone are
+reported. Uses an in-memory SQLite database unless DATABASE_URL is set:
+
+    python -m api.benchmarks.serialization
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+from typing import List
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from api import crud, models, schemas, serialization
+from api.benchmarks.timing import measure
+
+PAGE_SIZES = (100, 1000)
+
+# What FastAPI does with a response_model: validate the returned content, dump it, json.dumps it
+_page_adapter = TypeAdapter(List[schemas.Product])
+
+def render_before(db: Session, limit: int) -> bytes:
+    products = db.execute(select(models.Product).order_by(models.Product.id).limit(limit)).scalars().all()
+    items = [schemas.Product.model_validate(p, from_attributes=True).model_dump(mode="json") for p in products]
+    content = _page_adapter.dump_python(_page_adapter.validate_python(items), mode="json")
+    db.expunge_all()
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def render_after(db: Session, limit: int) -> bytes:
+    rows = db.execute(select(*crud.PRODUCT_COLUMNS).order_by(models.Product.id).limit(limit)).all()
+    return orjson.dumps(serialization.products_to_dicts(rows))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200, help="timed runs per case")
+    args = parser.parse_args()
+
+    url = os.getenv("DATABASE_URL", "sqlite://")
+    engine = create_engine(url, future=True, poolclass=StaticPool) if url == "sqlite://" else create_engine(url, future=True)
+    models.Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        if db.query(models.Product).count() < max(PAGE_SIZES):
+            now = datetime.utcnow()
+            db.execute(insert(models.Product), [
+                {"name": f"serialization-{i}", "description": "Benchmark product " * 4,
+                 "created_at": now, "updated_at": now, "created_by": "benchmark", "updated_by": "benchmark"}
+                for i in range(max(PAGE_SIZES))
+            ])
+            db.commit()
+        assert orjson.loads(render_before(db, 10)) == orjson.loads(render_after(db, 10))
+
+        print(f"{'page':>5} {'stage':<14} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+        for limit in PAGE_SIZES:
+            orm = db.execute(select(models.Product).order_by(models.Product.id).limit(limit)).scalars().all()
+            rows = db.execute(select(*crud.PRODUCT_COLUMNS).order_by(models.Product.id).limit(limit)).all()
+            cases = {
+                "full path": (lambda: render_before(db, limit), lambda: render_after(db, limit)),
+                "serialize only": (
+                    lambda: json.dumps(_page_adapter.dump_python(_page_adapter.validate_python(
+                        [schemas.Product.model_validate(p, from_attributes=True).model_dump(mode="json") for p in orm]
+                    ), mode="json")),
+                    lambda: orjson.dumps(serialization.products_to_dicts(rows)),
+                ),
+            }
+            for stage, (before, after) in cases.items():
+                b = measure(before, args.iterations)["p50"]
+                a = measure(after, args.iterations)["p50"]
+                print(f"{limit:>5} {stage:<14} {b:>10.3f} {a:>10.3f} {b / a:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import time
+from typing import Callable, Dict, List
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of ``samples`` for ``fraction`` in [0, 1].
+    """
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """
+    p50/p95/p99 and mean of latency samples.
+    """
+    return {
+        "p50": percentile(samples, 0.50),
+        "p95": percentile(samples, 0.95),
+        "p99": percentile(samples, 0.99),
+        "mean": sum(samples) / len(samples),
+    }
+
+def measure(run: Callable[[], object], iterations: int) -> Dict[str, float]:
+    """
+    Time ``run`` after one warmup call; latencies in milliseconds.
+    """
+    run()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+# Exports:
+# - percentile: nearest-rank percentile
+# - summarize: latency summary of samples
+# - measure: time a callable
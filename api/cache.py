@@ -0,0 +1,287 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+class CacheBackend:
+    """
+    Minimal key/value interface used by ProductCache.
+
+    Values must be JSON-serializable so remote backends can store them.
+    Callers must not mutate values returned by get.
+    """
+    # True when calls perform network I/O and should stay off the event loop
+    blocking: bool = False
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[Any]]:
+        """
+        Look up several keys at once; values are None where absent.
+        """
+        return [self.get(key) for key in keys]
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        raise NotImplementedError
+
+    def add(self, key: str, value: Any, ttl: float) -> Any:
+        """
+        Store value only if key is absent; return the value now stored.
+        """
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+class InMemoryCache(CacheBackend):
+    """
+    Thread-safe in-process cache with per-entry TTL and LRU eviction.
+    """
+
+    def __init__(self, max_entries: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _live(self, key: str) -> Optional[Tuple[float, Any]]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self._clock():
+            del self._data[key]
+            self.expirations += 1
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def _store(self, key: str, value: Any, ttl: float) -> None:
+        self._data[key] = (self._clock() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._live(key)
+            return None if entry is None else entry[1]
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[Any]]:
+        with self._lock:
+            entries = [self._live(key) for key in keys]
+        return [None if entry is None else entry[1] for entry in entries]
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key: str, value: Any, ttl: float) -> Any:
+        with self._lock:
+            entry = self._live(key)
+            if entry is not None:
+                return entry[1]
+            self._store(key, value, ttl)
+            return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+class RedisCache(CacheBackend):
+    """
+    Cache backed by a Redis client (redis-py compatible), shared across workers.
+    """
+    blocking = True
+
+    def __init__(self, client: Any, prefix: str = "cloud-infra:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[Any]]:
+        if not keys:
+            return []
+        # One round trip for all keys
+        return [None if raw is None else json.loads(raw) for raw in self.client.mget([self.prefix + key for key in keys])]
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.client.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl)))
+
+    def add(self, key: str, value: Any, ttl: float) -> Any:
+        if self.client.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl)), nx=True):
+            return value
+        current = self.get(key)
+        # The existing key may have expired between the two calls
+        return value if current is None else current
+
+    def stats(self) -> Dict[str, Any]:
+        info = self.client.info("stats")
+        return {"evictions": info.get("evicted_keys", 0), "expirations": info.get("expired_keys", 0)}
+
+class ProductCache:
+    """
+    Read-through cache for single products and product list pages.
+
+    Entries are stored under keys that embed a version token. Writes replace
+    the token (per product, and one shared by all list pages) instead of
+    deleting entries, so a reader that loaded a row before a concurrent write
+    stores it under a token no later read will use, and superseded entries
+    simply age out through TTL/LRU. A missing token is always replaced by a
+    fresh one, so eviction of a token can cause misses but never stale hits.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend], ttl: float = 60.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def _token(self, name: str) -> str:
+        # Tokens outlive the entries keyed by them
+        return self.backend.add(f"{name}:token", uuid.uuid4().hex, self.ttl * 2)
+
+    def _tokens(self, names: Sequence[str]) -> List[str]:
+        tokens = self.backend.get_many([f"{name}:token" for name in names])
+        return [self._token(name) if token is None else token for name, token in zip(names, tokens)]
+
+    def _lookup(self, key: str) -> Optional[Any]:
+        return self._lookup_many([key])[0]
+
+    def _lookup_many(self, keys: Sequence[str]) -> List[Optional[Any]]:
+        values = self.backend.get_many(keys)
+        hits = sum(1 for value in values if value is not None)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(values) - hits
+        return values
+
+    def get_product(self, product_id: int) -> Tuple[str, Optional[dict]]:
+        """
+        Look up a cached product.
+
+        Returns:
+            Tuple[str, Optional[dict]]: The cache key to store a loaded value under, and the cached value if any.
+        """
+        key = f"product:{product_id}:{self._token(f'product:{product_id}')}"
+        return key, self._lookup(key)
+
+    def get_products(self, product_ids: Sequence[int]) -> Tuple[Dict[int, str], Dict[int, dict]]:
+        """
+        Look up several cached products, batching backend round trips.
+
+        Returns:
+            Tuple[Dict[int, str], Dict[int, dict]]: The cache key for each ID to
+            store a loaded value under, and the cached values found, by ID.
+        """
+        tokens = self._tokens([f"product:{product_id}" for product_id in product_ids])
+        keys = {product_id: f"product:{product_id}:{token}" for product_id, token in zip(product_ids, tokens)}
+        values = self._lookup_many(list(keys.values()))
+        return keys, {product_id: value for product_id, value in zip(keys, values) if value is not None}
+
+    def get_page(self, *params: Any) -> Tuple[str, Optional[list]]:
+        """
+        Look up a cached list page identified by its query parameters.
+
+        Returns:
+            Tuple[str, Optional[list]]: The cache key to store a loaded value under, and the cached value if any.
+        """
+        key = "products:{}:{}".format(self._token("products"), ":".join(str(p) for p in params))
+        return key, self._lookup(key)
+
+    def store(self, key: str, value: Any) -> None:
+        """
+        Store a value loaded after a miss under the key returned by the lookup.
+        """
+        self.backend.set(key, value, self.ttl)
+
+    def store_many(self, values: Dict[str, Any]) -> None:
+        """
+        Store several loaded values, keyed by the keys returned by the lookup.
+        """
+        for key, value in values.items():
+            self.backend.set(key, value, self.ttl)
+
+    def invalidate_pages(self) -> None:
+        """
+        Invalidate every cached list page.
+        """
+        if self.enabled:
+            self.backend.set("products:token", uuid.uuid4().hex, self.ttl * 2)
+
+    def invalidate_product(self, product_id: int) -> None:
+        """
+        Invalidate a product and every cached list page.
+        """
+        self.invalidate_products([product_id])
+
+    def invalidate_products(self, product_ids: Iterable[int]) -> None:
+        """
+        Invalidate several products and every cached list page.
+        """
+        if self.enabled:
+            for product_id in product_ids:
+                self.backend.set(f"product:{product_id}:token", uuid.uuid4().hex, self.ttl * 2)
+            self.invalidate_pages()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit, miss and eviction counters for this process.
+        """
+        if not self.enabled:
+            return {"backend": "none"}
+        with self._lock:
+            counters = {"hits": self.hits, "misses": self.misses}
+        return {"backend": type(self.backend).__name__, "ttl_seconds": self.ttl, **counters, **self.backend.stats()}
+
+def build_product_cache() -> ProductCache:
+    """
+    Build the product cache from environment configuration.
+
+    CACHE_BACKEND selects ``none`` (default), ``memory`` or ``redis``. The
+    in-process backend is per worker, so with several workers use ``redis``
+    to keep invalidation visible to all of them.
+    """
+    backend_name = os.getenv("CACHE_BACKEND", "none").lower()
+    ttl = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+    if backend_name == "memory":
+        backend = InMemoryCache(max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "10000")))
+    elif backend_name == "redis":
+        import redis  # Optional dependency, only needed for the Redis backend
+
+        backend = RedisCache(redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0")))
+    elif backend_name == "none":
+        backend = None
+    else:
+        raise ValueError(f"Unknown CACHE_BACKEND: {backend_name}")
+    return ProductCache(backend, ttl=ttl)
+
+# Process-wide product cache used by crud (invalidation) and async_crud (reads)
+product_cache = build_product_cache()
+
+# Exports:
+# - CacheBackend: cache backend interface
+# - InMemoryCache: in-process TTL + LRU backend
+# - RedisCache: Redis-backed backend
+# - ProductCache: versioned read-through cache for products and pages
+# - build_product_cache: build a ProductCache from environment configuration
+# - product_cache: process-wide ProductCache instance
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator, List, Optional, Tuple
+
+from . import async_crud, models, pagination, serialization
+
+# Feed position: (txid, seq) of the last change read; txid is 0 outside PostgreSQL
+Position = Tuple[int, int]
+
+# Seconds between change log polls while long-polling or streaming
+POLL_INTERVAL = float(os.getenv("CHANGE_POLL_INTERVAL", "0.5"))
+
+# Idle seconds between keep-alive comments on an event stream
+KEEPALIVE_INTERVAL = 15.0
+
+def decode_position(token: Optional[str]) -> Optional[Position]:
+    """
+    Decode a change feed token; an empty or missing token starts at the beginning.
+
+    Raises:
+        pagination.InvalidCursorError: If the token is malformed.
+    """
+    position = pagination.decode_cursor(token or "")
+    if position is None:
+        return None
+    if not isinstance(position.get("txid"), int):
+        raise pagination.InvalidCursorError("Malformed change feed token.")
+    return position["txid"], position["id"]
+
+def encode_position(position: Optional[Position]) -> str:
+    """
+    Encode a feed position into an opaque token.
+    """
+    txid, seq = position or (0, 0)
+    return pagination.encode_cursor({"id": seq, "txid": txid})
+
+def serialize_change(change: models.ProductChange, product: Optional[models.Product]) -> dict:
+    """
+    Serialize a change log row and the product's current state into JSON-ready schemas.ProductChange fields.
+
+    Builds the dict directly, like serialization.product_to_dict, rather
+    than validating and dumping a model per entry.
+    """
+    return {
+        "seq": change.seq,
+        "op": change.op,
+        "product_id": change.product_id,
+        "changed_at": change.changed_at.isoformat(),
+        "changed_by": change.changed_by,
+        "product": None if product is None else serialization.product_to_dict(product),
+    }
+
+async def read_changes(
+    db: async_crud.AnySession,
+    since: Optional[Position],
+    limit: int,
+    wait: float = 0.0
+) -> Tuple[List[dict], Optional[Position], bool]:
+    """
+    Read the next page of changes, long-polling up to ``wait`` seconds while there are none.
+
+    The session's connection is returned to the pool between polls, so
+    waiting clients do not hold database connections.
+
+    Returns:
+        Tuple[List[dict], Optional[Position], bool]: Serialized changes, the
+        position to resume from, and whether more changes are already available.
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        rows = await async_crud.get_product_changes(db, since=since, limit=limit + 1)
+        page, has_more = pagination.split_page(rows, limit)
+        if page:
+            last = page[-1][0]
+            entries = [serialize_change(change, product) for change, product in page]
+            return entries, (last.txid or 0, last.seq), has_more
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return [], since, False
+        await async_crud.release_connection(db)
+        await asyncio.sleep(min(POLL_INTERVAL, remaining))
+
+async def stream_changes(since: Optional[Position], duration: float, limit: int = 100) -> AsyncIterator[str]:
+    """
+    Stream changes as server-sent events for up to ``duration`` seconds.
+
+    Each page of ``change`` events is followed by an ``id`` field holding
+    the feed token after it, so an EventSource that reconnects resumes from
+    ``Last-Event-ID``. Delivery is at-least-once: a stream cut mid-page
+    resumes at the start of that page, so clients deduplicate by ``seq``.
+    Opens its own session: a streaming response outlives request-scoped
+    dependencies.
+
+    Yields:
+        str: Encoded ``change`` events and keep-alive comments.
+    """
+    deadline = time.monotonic() + duration
+    idle_since = time.monotonic()
+    async with async_crud.session_scope() as db:
+        while True:
+            wait = max(0.0, min(deadline - time.monotonic(), KEEPALIVE_INTERVAL))
+            entries, since, has_more = await read_changes(db, since, limit, wait=wait)
+            for entry in entries:
+                yield f"event: change\ndata: {json.dumps(entry, separators=(',', ':'))}\n\n"
+            if entries:
+                yield f"id: {encode_position(since)}\n\n"
+                idle_since = time.monotonic()
+            elif time.monotonic() - idle_since >= KEEPALIVE_INTERVAL:
+                yield ": keep-alive\n\n"
+                idle_since = time.monotonic()
+            if not has_more and time.monotonic() >= deadline:
+                return
+
+# Exports:
+# - Position: change feed position type
+# - POLL_INTERVAL: seconds between change log polls
+# - KEEPALIVE_INTERVAL: idle seconds between event stream keep-alives
+# - decode_position: decode a change feed token
+# - encode_position: encode a change feed position
+# - serialize_change: serialize a change log row
+# - read_changes: read (and long-poll for) the next page of changes
+# - stream_changes: stream changes as server-sent events
@@ -0,0 +1,250 @@
+import os
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+from . import metrics
+
+try:
+    import brotli  # Optional dependency, enables the "br" encoding
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard  # Optional dependency, enables the "zstd" encoding
+except ImportError:
+    zstandard = None
+
+# Responses smaller than this many bytes are sent uncompressed; below about a
+# kilobyte the CPU and encoding overhead outweigh the bytes saved
+MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# Server preference when the client accepts several encodings equally,
+# most preferred first; "" disables compression
+PREFERENCE: Tuple[str, ...] = tuple(
+    name.strip() for name in os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",") if name.strip()
+)
+
+# Levels trade CPU per response for bytes saved; the defaults suit dynamic
+# responses (brotli's maximum of 11 is meant for static assets)
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+# Media types worth compressing; everything else (images, archives) passes through
+COMPRESSIBLE_TYPES = frozenset({
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+})
+
+COMPRESSION_BYTES = metrics.registry.register(metrics.Counter(
+    "http_response_compression_bytes_total",
+    "Response body bytes before (in) and after (out) compression, by encoding.",
+    ("encoding", "stage")
+))
+
+class Compressor:
+    """
+    Incremental encoder for one response body.
+    """
+
+    def compress(self, data: bytes) -> bytes:
+        """
+        Encode a chunk and flush it, so the client can decode everything sent so far.
+        """
+        raise NotImplementedError
+
+    def finish(self, data: bytes = b"") -> bytes:
+        """
+        Encode the last chunk and end the stream.
+        """
+        raise NotImplementedError
+
+class GzipCompressor(Compressor):
+    def __init__(self, level: int = GZIP_LEVEL):
+        # wbits 16 + MAX_WBITS writes the gzip header and trailer
+        self._encoder = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._encoder.compress(data) + self._encoder.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._encoder.compress(data) + self._encoder.flush(zlib.Z_FINISH)
+
+class BrotliCompressor(Compressor):
+    def __init__(self, quality: int = BROTLI_QUALITY):
+        self._encoder = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._encoder.process(data) + self._encoder.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._encoder.process(data) + self._encoder.finish()
+
+class ZstdCompressor(Compressor):
+    def __init__(self, level: int = ZSTD_LEVEL):
+        self._encoder = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._encoder.compress(data) + self._encoder.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._encoder.compress(data) + self._encoder.flush()
+
+# Compressor factory per Content-Encoding token, for the codecs installed here
+ENCODERS: Dict[str, Callable[[], Compressor]] = {"gzip": GzipCompressor}
+if brotli is not None:
+    ENCODERS["br"] = BrotliCompressor
+if zstandard is not None:
+    ENCODERS["zstd"] = ZstdCompressor
+
+def negotiate(accept_encoding: Optional[str], preference: Tuple[str, ...] = PREFERENCE) -> Optional[str]:
+    """
+    Choose a response encoding from an Accept-Encoding header.
+
+    The encoding with the highest q-value wins; ties go to the earlier entry
+    in ``preference``. ``*`` covers encodings the header does not name, and
+    ``q=0`` rules an encoding out.
+
+    Args:
+        accept_encoding (Optional[str]): Accept-Encoding request header.
+        preference (Tuple[str, ...]): Supported encodings, most preferred first.
+
+    Returns:
+        Optional[str]: The chosen encoding, or None to send the body as is.
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip().lower()] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in preference:
+        if name not in ENCODERS:
+            continue
+        q = weights.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+def is_compressible(content_type: str) -> bool:
+    """
+    Whether a response media type benefits from compression.
+    """
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with the encoding the client prefers.
+
+    Complete bodies below ``min_size`` are sent as is. Streamed bodies
+    (exports, the change stream) are compressed chunk by chunk and flushed
+    after each one, so nothing is buffered and every chunk reaches the
+    client as soon as it is produced. Responses that already carry a
+    Content-Encoding, or whose media type does not compress, pass through.
+    """
+
+    def __init__(self, app, min_size: int = MIN_SIZE, preference: Tuple[str, ...] = PREFERENCE):
+        self.app = app
+        self.min_size = min_size
+        self.preference = preference
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = _header(scope["headers"], b"accept-encoding")
+        encoding = negotiate(accept_encoding and accept_encoding.decode("latin-1"), self.preference)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[dict] = None
+        compressor: Optional[Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                content_type = _header(headers, b"content-type")
+                if (
+                    message["status"] in (204, 304)
+                    or _header(headers, b"content-encoding") is not None
+                    or content_type is None or not is_compressible(content_type.decode("latin-1"))
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                # Held until the first body chunk shows whether to compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                start, start_message = start_message, None
+                # The representation depends on Accept-Encoding even when this one is sent as is
+                vary = _header(start.get("headers", []), b"vary")
+                headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"vary"]
+                headers.append((b"vary", b"Accept-Encoding" if vary is None else vary + b", Accept-Encoding"))
+                if not more_body and len(body) < self.min_size:
+                    passthrough = True
+                    await send({**start, "headers": headers})
+                    await send(message)
+                    return
+                headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+                compressor = ENCODERS[encoding]()
+                headers.append((b"content-encoding", encoding.encode()))
+                if not more_body:
+                    compressed = compressor.finish(body)
+                    headers.append((b"content-length", str(len(compressed)).encode()))
+                    await send({**start, "headers": headers})
+                    self._record(encoding, len(body), len(compressed))
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send({**start, "headers": headers})
+
+            compressed = compressor.compress(body) if more_body else compressor.finish(body)
+            self._record(encoding, len(body), len(compressed))
+            if compressed or not more_body:
+                await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _record(encoding: str, before: int, after: int) -> None:
+        COMPRESSION_BYTES.inc(encoding, "in", amount=before)
+        COMPRESSION_BYTES.inc(encoding, "out", amount=after)
+
+# Exports:
+# - MIN_SIZE, PREFERENCE, GZIP_LEVEL, BROTLI_QUALITY, ZSTD_LEVEL: compression settings
+# - COMPRESSIBLE_TYPES: media types compressed besides text/*
+# - Compressor: incremental encoder interface
+# - GzipCompressor / BrotliCompressor / ZstdCompressor: encoders per Content-Encoding
+# - ENCODERS: compressor factory per installed encoding
+# - negotiate: choose an encoding from Accept-Encoding
+# - is_compressible: whether a media type is worth compressing
+# - CompressionMiddleware: ASGI response compression
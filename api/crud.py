@@ -1,8 +1,43 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
+import csv
+import io
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
 
-from . import models, schemas
+from sqlalchemy import (
+    Column, Integer, MetaData, Numeric, Row, Select, String, Table, Text, and_, any_, bindparam, case, cast,
+    delete, func, insert, literal, literal_column, or_, select, true, tuple_, update
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import CreateTable, DropTable
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.util import await_only
+
+from . import audit, cache, models, schemas, serialization
+
+# Columns read for product list responses; rows support attribute access like models.Product
+PRODUCT_COLUMNS = (
+    models.Product.id,
+    models.Product.name,
+    models.Product.description,
+    models.Product.created_at,
+    models.Product.updated_at,
+    models.Product.created_by,
+    models.Product.updated_by,
+    models.Product.version,
+)
+
+def _record_changes(db: Session, op: schemas.ChangeOp, product_ids: Sequence[int], user: str) -> None:
+    """
+    Append change log entries in the caller's transaction.
+    """
+    if product_ids:
+        now = datetime.utcnow()
+        db.execute(insert(models.ProductChange), [
+            {"product_id": product_id, "op": op.value, "changed_at": now, "changed_by": user}
+            for product_id in product_ids
+        ])
 
 def create_product(db: Session, product: schemas.ProductCreate, user: str) -> models.Product:
     """
@@ -27,8 +62,14 @@ def create_product(db: Session, product: schemas.ProductCreate, user: str) -> mo
     )
     db.add(db_product)
     try:
+        db.flush()
+        _record_changes(db, schemas.ChangeOp.insert, [db_product.id], user)
         db.commit()
         db.refresh(db_product)
+        cache.product_cache.invalidate_pages()
+        audit.recorder.record(
+            schemas.ChangeOp.insert.value, db_product.id, user, after=serialization.product_to_dict(db_product)
+        )
         return db_product
     except SQLAlchemyError as e:
         db.rollback()
@@ -47,86 +88,999 @@ def get_product(db: Session, product_id: int) -> Optional[models.Product]:
     """
     return db.query(models.Product).filter(models.Product.id == product_id).first()
 
-def get_products(db: Session, skip: int = 0, limit: int = 100) -> List[models.Product]:
+def _any_of(db: Session, column, values: Sequence[Any]):
+    # One array parameter on PostgreSQL, so every batch size shares a single
+    # statement (and prepared plan); an expanding IN list elsewhere
+    if db.get_bind().dialect.name == "postgresql":
+        return column == any_(literal(list(values), postgresql.ARRAY(column.type)))
+    return column.in_(values)
+
+def get_products_by_ids(db: Session, product_ids: Sequence[int]) -> List[Row]:
+    """
+    Retrieve the products with the given IDs in one query.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        product_ids (Sequence[int]): Product IDs, without duplicates.
+
+    Returns:
+        List[Row]: PRODUCT_COLUMNS rows of the products found, in no particular order.
+    """
+    if not product_ids:
+        return []
+    return db.execute(select(*PRODUCT_COLUMNS).where(_any_of(db, models.Product.id, product_ids))).all()
+
+def get_products_by_names(db: Session, names: Sequence[str]) -> List[Row]:
+    """
+    Retrieve the products with the given unique names in one query.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        names (Sequence[str]): Product names, without duplicates.
+
+    Returns:
+        List[Row]: PRODUCT_COLUMNS rows of the products found, in no particular order.
+    """
+    if not names:
+        return []
+    return db.execute(select(*PRODUCT_COLUMNS).where(_any_of(db, models.Product.name, names))).all()
+
+def _utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    # Timestamps are stored as naive UTC
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _list_statement(
+    stmt: Select,
+    filters: Optional[schemas.ProductFilter],
+    sort: schemas.ProductSort,
+    after_id: Optional[int] = None,
+    after_updated_at: Optional[datetime] = None
+) -> Select:
+    """
+    Apply listing filters, sort order and an optional keyset position to a products select.
+
+    Every sort ends on ``id`` so the order is total and a page boundary is
+    exactly one (updated_at, id) or id position; the composite indexes on
+    (updated_at, id) and (created_by, id) serve these seeks directly.
+    """
+    product = models.Product
+    if filters is not None:
+        if filters.created_by is not None:
+            stmt = stmt.where(product.created_by == filters.created_by)
+        if filters.updated_after is not None:
+            stmt = stmt.where(product.updated_at > _utc_naive(filters.updated_after))
+        if filters.updated_before is not None:
+            stmt = stmt.where(product.updated_at < _utc_naive(filters.updated_before))
+
+    descending = sort.value.startswith("-")
+    if sort in (schemas.ProductSort.updated_at, schemas.ProductSort.updated_at_desc):
+        keys, position = (product.updated_at, product.id), (_utc_naive(after_updated_at), after_id)
+    else:
+        keys, position = (product.id,), (after_id,)
+
+    if after_id is not None:
+        key = tuple_(*keys) if len(keys) > 1 else keys[0]
+        value = tuple_(*position) if len(keys) > 1 else position[0]
+        stmt = stmt.where(key < value if descending else key > value)
+    return stmt.order_by(*(k.desc() if descending else k for k in keys))
+
+def get_products(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    filters: Optional[schemas.ProductFilter] = None,
+    sort: schemas.ProductSort = schemas.ProductSort.id
+) -> List[Row]:
     """
-    Retrieve a list of products.
+    Retrieve a list of products as PRODUCT_COLUMNS rows.
 
     Args:
         db (Session): SQLAlchemy session.
         skip (int): Number of records to skip.
         limit (int): Maximum number of records to return.
+        filters (Optional[schemas.ProductFilter]): Listing filters.
+        sort (schemas.ProductSort): Sort order.
+
+    Returns:
+        List[Row]: Product rows; plain tuples skip ORM identity-map bookkeeping.
+    """
+    stmt = _list_statement(select(*PRODUCT_COLUMNS), filters, sort).offset(skip).limit(limit)
+    return db.execute(stmt).all()
+
+def get_products_after(
+    db: Session,
+    after_id: Optional[int] = None,
+    limit: int = 100,
+    filters: Optional[schemas.ProductFilter] = None,
+    sort: schemas.ProductSort = schemas.ProductSort.id,
+    after_updated_at: Optional[datetime] = None
+) -> List[Row]:
+    """
+    Retrieve a page of products as PRODUCT_COLUMNS rows using keyset pagination.
+
+    Unlike get_products, the cost of a page does not grow with its depth:
+    the query seeks directly past the last row of the previous page on the
+    index matching the sort order.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        after_id (Optional[int]): ID of the last product on the previous page, or None for the first page.
+        limit (int): Maximum number of records to return.
+        filters (Optional[schemas.ProductFilter]): Listing filters.
+        sort (schemas.ProductSort): Sort order.
+        after_updated_at (Optional[datetime]): updated_at of the last product on the previous
+            page; required with after_id when sorting by updated_at.
+
+    Returns:
+        List[Row]: Product rows in sort order.
+    """
+    stmt = _list_statement(select(*PRODUCT_COLUMNS), filters, sort, after_id, after_updated_at).limit(limit)
+    return db.execute(stmt).all()
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _search_rank(db: Session, query: str):
+    """
+    Build the match condition and rank expression for a search query.
+    """
+    name = func.lower(models.Product.name)
+    pattern = _like_escape(query.lower())
+    prefix = name.like(pattern + "%", escape="\\")
+    if db.get_bind().dialect.name == "postgresql":
+        search_vector = literal_column("products.search_vector")
+        tsquery = func.websearch_to_tsquery(literal_column(f"'{models.SEARCH_CONFIG}'::regconfig"), query)
+        # Name prefix matches (typeahead) rank above body-only text matches
+        rank = func.round(
+            cast(func.ts_rank_cd(search_vector, tsquery), Numeric) + case((prefix, 1), else_=0), 6
+        )
+        return or_(search_vector.op("@@")(tsquery), prefix), rank
+    # Fallback without text search support: ranked substring scan
+    contains = "%" + pattern + "%"
+    in_name = name.like(contains, escape="\\")
+    in_description = func.lower(func.coalesce(models.Product.description, "")).like(contains, escape="\\")
+    rank = case((prefix, 3), (in_name, 2), else_=1)
+    return or_(in_name, in_description), rank
+
+def search_products(
+    db: Session,
+    query: str,
+    limit: int = 20,
+    after: Optional[Tuple[Decimal, int]] = None
+) -> List[Row]:
+    """
+    Search products by name and description, best matches first.
+
+    On PostgreSQL this is a full-text match against the indexed search_vector
+    column combined with an index-backed prefix match on the name, ranked by
+    ts_rank_cd with a boost for name prefix matches. Results are keyset
+    paginated on (rank DESC, id ASC).
+
+    Args:
+        db (Session): SQLAlchemy session.
+        query (str): Search text (web search syntax on PostgreSQL).
+        limit (int): Maximum number of records to return.
+        after (Optional[Tuple[Decimal, int]]): (rank, id) of the last result on the previous page.
+
+    Returns:
+        List[Row]: Rows of (Product, rank) ordered by rank, then ID.
+    """
+    condition, rank = _search_rank(db, query)
+    ranked = select(models.Product, rank.label("rank")).where(condition).subquery()
+    product = aliased(models.Product, ranked)
+    statement = select(product, ranked.c.rank)
+    if after is not None:
+        after_rank = literal(after[0], Numeric(asdecimal=True))
+        statement = statement.where(or_(
+            ranked.c.rank < after_rank,
+            and_(ranked.c.rank == after_rank, ranked.c.id > after[1])
+        ))
+    statement = statement.order_by(ranked.c.rank.desc(), ranked.c.id).limit(limit)
+    return db.execute(statement).all()
+
+def get_product_version(db: Session, product_id: int) -> Optional[Row]:
+    """
+    Retrieve only the (id, version) columns of a product.
+
+    Used to answer conditional requests without loading the full row.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        product_id (int): Product ID.
+
+    Returns:
+        Optional[Row]: Row with id and version if found, else None.
+    """
+    return db.execute(
+        select(models.Product.id, models.Product.version).where(models.Product.id == product_id)
+    ).first()
+
+def get_product_versions(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[int] = None,
+    filters: Optional[schemas.ProductFilter] = None,
+    sort: schemas.ProductSort = schemas.ProductSort.id,
+    after_updated_at: Optional[datetime] = None
+) -> List[Row]:
+    """
+    Retrieve the (id, version) columns for a page of products.
+
+    The window matches get_products(skip, limit), or get_products_after(after_id, limit)
+    when after_id is given, with the same filters and sort order.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        skip (int): Number of records to skip (ignored when after_id is given).
+        limit (int): Maximum number of records to return.
+        after_id (Optional[int]): Keyset position of the page.
+        filters (Optional[schemas.ProductFilter]): Listing filters.
+        sort (schemas.ProductSort): Sort order.
+        after_updated_at (Optional[datetime]): Keyset position when sorting by updated_at.
 
     Returns:
-        List[models.Product]: List of product instances.
+        List[Row]: Rows with id and version in sort order.
+    """
+    stmt = _list_statement(
+        select(models.Product.id, models.Product.version), filters, sort, after_id, after_updated_at
+    ).limit(limit)
+    if after_id is None:
+        stmt = stmt.offset(skip)
+    return db.execute(stmt).all()
+
+def get_product_changes(
+    db: Session,
+    since: Optional[Tuple[int, int]] = None,
+    limit: int = 100
+) -> List[Row]:
     """
-    return db.query(models.Product).order_by(models.Product.id).offset(skip).limit(limit).all()
+    Retrieve change log entries after a feed position, oldest first.
+
+    On PostgreSQL entries are ordered by (txid, seq) and only entries from
+    transactions that finished before every transaction still in flight are
+    returned, so a slow transaction can delay the feed but never commit
+    behind a position a reader has already passed. Elsewhere writers are
+    serialized and seq alone is commit-ordered.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        since (Optional[Tuple[int, int]]): (txid, seq) of the last entry already read, or None to start at the beginning.
+        limit (int): Maximum number of entries to return.
+
+    Returns:
+        List[Row]: Rows of (ProductChange, Optional[Product]) with the product's current state.
+    """
+    change = models.ProductChange
+    stmt = select(change, models.Product).outerjoin(models.Product, models.Product.id == change.product_id)
+    if db.get_bind().dialect.name == "postgresql":
+        horizon = literal_column("pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+        stmt = stmt.where(change.txid < horizon).order_by(change.txid, change.seq)
+        if since is not None:
+            stmt = stmt.where(tuple_(change.txid, change.seq) > tuple_(*since))
+    else:
+        stmt = stmt.order_by(change.seq)
+        if since is not None:
+            stmt = stmt.where(change.seq > since[1])
+    return db.execute(stmt.limit(limit)).all()
+
+class VersionConflictError(Exception):
+    """
+    Raised when a conditional update finds the product at a different version.
+    """
+
+    def __init__(self, product_id: int, current_version: int):
+        super().__init__(f"Product {product_id} is at version {current_version}.")
+        self.product_id = product_id
+        self.current_version = current_version
 
 def update_product(
     db: Session,
     product_id: int,
     product_update: schemas.ProductUpdate,
-    user: str
-) -> models.Product:
+    user: str,
+    expected_versions: Optional[Sequence[int]] = None
+) -> Optional[models.Product]:
     """
-    Update an existing product.
+    Update an existing product with a single UPDATE ... RETURNING statement.
+
+    Every update increments the version. With expected versions (from
+    If-Match and/or ``product_update.version``) the statement also matches
+    ``version IN (...)``, so a concurrent writer that got there first makes
+    this update match no row instead of being overwritten, without any
+    row locks held between the read and the write. The product as it was
+    before and after goes to the audit trail once the change commits; the
+    before image is read with SELECT ... FOR UPDATE, taking the row lock
+    the UPDATE needs anyway one round trip early, so no concurrent writer
+    can change the row in between.
 
     Args:
         db (Session): SQLAlchemy session.
         product_id (int): Product ID.
         product_update (schemas.ProductUpdate): Product update schema.
         user (str): Username of the updater.
+        expected_versions (Optional[Sequence[int]]): Versions the update may apply to;
+            None for no version condition.
 
     Returns:
-        models.Product: The updated product instance.
+        Optional[models.Product]: The updated product instance, or None if no product has this ID.
 
     Raises:
+        VersionConflictError: If the product exists at a version not expected.
         SQLAlchemyError: If database operation fails.
     """
-    db_product = get_product(db, product_id)
-    if db_product is None:
-        return None
-
     # Update fields if provided
+    values = {"updated_by": user, "updated_at": datetime.utcnow(), "version": models.Product.version + 1}
     if product_update.name is not None:
-        db_product.name = product_update.name
+        values["name"] = product_update.name
     if product_update.description is not None:
-        db_product.description = product_update.description
-    db_product.updated_by = user
+        values["description"] = product_update.description
 
+    stmt = update(models.Product).where(models.Product.id == product_id)
+    if expected_versions is not None:
+        stmt = stmt.where(models.Product.version.in_(expected_versions))
+    stmt = stmt.values(**values).returning(models.Product)
     try:
+        before = None
+        if audit.recorder.enabled:
+            # A self-join in the UPDATE would not do: under READ COMMITTED
+            # PostgreSQL re-checks only the target row after waiting on a
+            # concurrent writer, so the joined copy could predate that write
+            before = db.execute(
+                select(*PRODUCT_COLUMNS).where(models.Product.id == product_id).with_for_update()
+            ).first()
+            if before is None:
+                db.rollback()
+                return None
+        db_product = db.scalar(stmt)
+        if db_product is None:
+            current = None if expected_versions is None else db.scalar(
+                select(models.Product.version).where(models.Product.id == product_id)
+            )
+            db.rollback()
+            if current is not None:
+                raise VersionConflictError(product_id, current)
+            return None
+        _record_changes(db, schemas.ChangeOp.update, [product_id], user)
         db.commit()
-        db.refresh(db_product)
+        cache.product_cache.invalidate_product(product_id)
+        if audit.recorder.enabled:
+            audit.recorder.record(
+                schemas.ChangeOp.update.value, product_id, user,
+                before=serialization.products_to_dicts([before])[0],
+                after=serialization.product_to_dict(db_product)
+            )
         return db_product
     except SQLAlchemyError as e:
         db.rollback()
         raise e
 
-def delete_product(db: Session, product_id: int, user: str) -> None:
+def delete_product(db: Session, product_id: int, user: str) -> bool:
     """
-    Delete a product by its ID.
+    Delete a product by its ID with a single DELETE ... RETURNING statement.
 
     Args:
         db (Session): SQLAlchemy session.
         product_id (int): Product ID.
-        user (str): Username of the deleter (for audit logging).
+        user (str): Username of the deleter (for the change log and audit trail).
+
+    Returns:
+        bool: True if the product existed and was deleted.
 
     Raises:
         SQLAlchemyError: If database operation fails.
     """
-    db_product = get_product(db, product_id)
-    if db_product is None:
+    stmt = (
+        delete(models.Product)
+        .where(models.Product.id == product_id)
+        .returning(*PRODUCT_COLUMNS)
+    )
+    try:
+        before = db.execute(stmt).first()
+        deleted = before is not None
+        if deleted:
+            _record_changes(db, schemas.ChangeOp.delete, [product_id], user)
+        db.commit()
+        if deleted:
+            cache.product_cache.invalidate_product(product_id)
+            audit.recorder.record(
+                schemas.ChangeOp.delete.value, product_id, user, before=serialization.products_to_dicts([before])[0]
+            )
+        return deleted
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+# --- Export ---
+
+# Columns written by the catalog export, in output order
+EXPORT_COLUMNS = ("id", "name", "description", "created_at", "updated_at", "created_by", "updated_by", "version")
+
+def export_statement(batch_size: int) -> Select:
+    """
+    Build the catalog export query, streamed from a server-side cursor.
+
+    Args:
+        batch_size (int): Rows fetched from the cursor per round trip.
+
+    Returns:
+        Select: Column-only select over all products ordered by ID.
+    """
+    table = models.Product.__table__
+    return (
+        select(*(table.c[name] for name in EXPORT_COLUMNS))
+        .order_by(table.c.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+def stream_products(db: Session, batch_size: int = 1000) -> Iterator[Sequence[Row]]:
+    """
+    Stream every product as row tuples in batches, without materializing the table.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        batch_size (int): Rows per yielded batch.
+
+    Yields:
+        Sequence[Row]: Batches of rows with EXPORT_COLUMNS.
+    """
+    result = db.execute(export_statement(batch_size))
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+# --- Import ---
+
+# Temporary table that streamed import rows are loaded into before the merge
+IMPORT_STAGING_TABLE = "products_import_staging"
+
+# Kept out of models.Base.metadata so migrations never create it; on
+# PostgreSQL it is dropped when the import transaction commits
+IMPORT_STAGING = Table(
+    IMPORT_STAGING_TABLE,
+    MetaData(),
+    Column("line", Integer, nullable=False),
+    Column("name", String(128), nullable=False),
+    Column("description", Text),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="drop",
+)
+
+class ImportConflictError(Exception):
+    """
+    Raised when an import in ``fail`` mode contains names that already exist.
+    """
+
+    def __init__(self, conflicts: int):
+        super().__init__(f"{conflicts} imported product name(s) already exist.")
+        self.conflicts = conflicts
+
+def create_import_staging(db: Session) -> None:
+    """
+    Create the per-connection staging table for a bulk import.
+
+    Args:
+        db (Session): SQLAlchemy session; the import must stay in one transaction.
+    """
+    try:
+        if db.get_bind().dialect.name != "postgresql":
+            # DDL may run outside the transaction here; clear leftovers from an aborted import
+            db.execute(DropTable(IMPORT_STAGING, if_exists=True))
+        db.execute(CreateTable(IMPORT_STAGING))
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+def stage_import_rows(db: Session, rows: Sequence[Tuple[int, str, Optional[str]]]) -> None:
+    """
+    Load a chunk of validated (line, name, description) rows into the staging table.
+
+    Uses COPY on Postgres (psycopg2 copy_expert, or asyncpg copy_records_to_table
+    on the async path) and a multi-row INSERT elsewhere.
+
+    Args:
+        db (Session): SQLAlchemy session holding the staging table.
+        rows (Sequence[Tuple[int, str, Optional[str]]]): Rows to stage.
+
+    Raises:
+        SQLAlchemyError: If database operation fails.
+    """
+    if not rows:
         return
+    driver = db.get_bind().dialect.driver
+    try:
+        if driver == "psycopg2":
+            buffer = io.StringIO()
+            # Quoting every string keeps '' distinct from NULL (an unquoted empty field)
+            csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(rows)
+            buffer.seek(0)
+            raw = db.connection().connection.driver_connection
+            with raw.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY {IMPORT_STAGING_TABLE} (line, name, description) FROM STDIN WITH (FORMAT csv)",
+                    buffer
+                )
+        elif driver == "asyncpg":
+            raw = db.connection().connection.driver_connection
+            await_only(raw.copy_records_to_table(
+                IMPORT_STAGING_TABLE, records=rows, columns=["line", "name", "description"]
+            ))
+        else:
+            db.execute(
+                insert(IMPORT_STAGING),
+                [{"line": line, "name": name, "description": description} for line, name, description in rows]
+            )
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+def merge_import(db: Session, on_conflict: str, user: str, max_errors: int = 1000) -> dict:
+    """
+    Merge the staging table into products and commit the import.
+
+    Names repeated within the import keep their first occurrence; later ones
+    are reported as errors. Existing names are skipped, updated or abort the
+    import depending on on_conflict. Once committed, the rows the merge wrote
+    are read back in chunks for the audit trail; upserted rows carry the
+    product as it was before the import.
+
+    Args:
+        db (Session): SQLAlchemy session holding the staging table.
+        on_conflict (str): ``skip``, ``upsert`` or ``fail``.
+        user (str): Username recorded as creator/updater.
+        max_errors (int): Maximum duplicate-line errors to return.
+
+    Returns:
+        dict: Counts (inserted, updated, skipped, duplicates) and duplicate-line errors.
+
+    Raises:
+        ImportConflictError: If on_conflict is ``fail`` and any name already exists.
+        SQLAlchemyError: If database operation fails.
+    """
+    staging = IMPORT_STAGING
+    first_lines = (
+        select(staging.c.name, func.min(staging.c.line).label("first_line")).group_by(staging.c.name).subquery("f")
+    )
+    repeated = (
+        select(staging.c.line, first_lines.c.first_line)
+        .join(first_lines, staging.c.name == first_lines.c.name)
+        .where(staging.c.line != first_lines.c.first_line)
+    )
+    try:
+        duplicates = db.execute(select(func.count()).select_from(repeated.subquery())).scalar_one()
+        errors = [
+            {"line": row.line, "error": f"Duplicate name within import (first seen on line {row.first_line})."}
+            for row in db.execute(repeated.order_by(staging.c.line).limit(max_errors))
+        ]
+        if duplicates:
+            db.execute(delete(staging).where(
+                staging.c.line.not_in(select(func.min(staging.c.line)).group_by(staging.c.name))
+            ))
+
+        total = db.execute(select(func.count()).select_from(staging)).scalar_one()
+        existing = db.execute(
+            select(*PRODUCT_COLUMNS).join(staging, models.Product.name == staging.c.name)
+        ).all() if on_conflict != "skip" else []
+        existing_ids = [row.id for row in existing]
+        if on_conflict == "fail" and existing_ids:
+            raise ImportConflictError(len(existing_ids))
+
+        now = datetime.utcnow()
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        # "WHERE true" keeps SQLite from parsing ON CONFLICT as a join clause
+        stmt = dialect.insert(models.Product).from_select(
+            ["name", "description", "created_at", "updated_at", "created_by", "updated_by"],
+            select(
+                staging.c.name, staging.c.description, literal(now), literal(now), literal(user), literal(user)
+            ).where(true()).order_by(staging.c.line)
+        )
+        if on_conflict == "skip":
+            stmt = stmt.on_conflict_do_nothing(index_elements=["name"])
+        elif on_conflict == "upsert":
+            stmt = stmt.on_conflict_do_update(index_elements=["name"], set_={
+                "description": stmt.excluded.description,
+                "updated_at": stmt.excluded.updated_at,
+                "updated_by": stmt.excluded.updated_by,
+                "version": models.Product.version + 1,
+            })
+        result = db.execute(stmt)
+        # Rows this merge wrote are the staged names stamped with its timestamp
+        db.execute(insert(models.ProductChange).from_select(
+            ["product_id", "op", "changed_at", "changed_by"],
+            select(
+                models.Product.id,
+                case(
+                    (models.Product.created_at == now, schemas.ChangeOp.insert.value),
+                    else_=schemas.ChangeOp.update.value
+                ),
+                literal(now),
+                literal(user),
+            )
+            .join(staging, models.Product.name == staging.c.name)
+            .where(models.Product.updated_at == now, models.Product.updated_by == user)
+            .order_by(staging.c.line)
+        ))
+
+        if on_conflict == "skip":
+            inserted, updated = result.rowcount, 0
+        else:
+            inserted, updated = total - len(existing_ids), len(existing_ids)
+        if db.get_bind().dialect.name != "postgresql":
+            db.execute(DropTable(staging))
+        db.commit()
+    except (ImportConflictError, SQLAlchemyError) as e:
+        db.rollback()
+        raise e
+    cache.product_cache.invalidate_products(existing_ids)
+    if audit.recorder.enabled and inserted + updated:
+        before = dict(zip(existing_ids, serialization.products_to_dicts(existing))) if updated else {}
+        _audit_import(db, now, user, before)
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "skipped": total - inserted - updated,
+        "duplicates": duplicates,
+        "errors": errors,
+    }
+
+def _audit_import(db: Session, now: datetime, user: str, before: Dict[int, dict]) -> None:
+    """
+    Record the rows a committed import wrote, streamed in BULK_CHUNK_SIZE partitions.
+
+    The rows are the ones stamped with the import's timestamp and user, the
+    same match as its change log entries.
+    """
+    written = db.execute(
+        select(*PRODUCT_COLUMNS)
+        .where(models.Product.updated_at == now, models.Product.updated_by == user)
+        .order_by(models.Product.id)
+        .execution_options(yield_per=BULK_CHUNK_SIZE)
+    )
+    try:
+        for partition in written.partitions():
+            inserts, updates = [], []
+            for row, after in zip(partition, serialization.products_to_dicts(partition)):
+                if row.id in before:
+                    updates.append((row.id, before[row.id], after))
+                else:
+                    inserts.append((row.id, None, after))
+            audit.recorder.record_many(schemas.ChangeOp.insert.value, user, inserts)
+            audit.recorder.record_many(schemas.ChangeOp.update.value, user, updates)
+    finally:
+        written.close()
+        db.rollback()
+
+# --- Bulk operations ---
 
-    db.delete(db_product)
+# Rows per multi-row statement; bounds statement size and per-chunk memory.
+BULK_CHUNK_SIZE = 500
+
+T = TypeVar("T")
+
+def _chunks(items: Sequence[T], size: int) -> Iterator[Sequence[T]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _existing_names(db: Session, names: Sequence[str]) -> Dict[str, int]:
+    if not names:
+        return {}
+    rows = db.execute(
+        select(models.Product.id, models.Product.name).where(models.Product.name.in_(names))
+    ).all()
+    return {row.name: row.id for row in rows}
+
+def _result(
+    index: int,
+    status: schemas.BulkStatus,
+    product_id: Optional[int] = None,
+    product: Optional[models.Product] = None,
+    detail: Optional[str] = None
+) -> dict:
+    return {"index": index, "status": status, "id": product_id, "product": product, "detail": detail}
+
+def _conflict(index: int, product_id: Optional[int] = None) -> dict:
+    return _result(index, schemas.BulkStatus.conflict, product_id, detail="Product with this name already exists.")
+
+def _not_found(index: int, product_id: int) -> dict:
+    return _result(index, schemas.BulkStatus.not_found, product_id, detail="Product not found.")
+
+def _duplicate(index: int, product_id: int) -> dict:
+    return _result(index, schemas.BulkStatus.conflict, product_id, detail="Product ID appears earlier in this batch.")
+
+def bulk_create_products(
+    db: Session,
+    products: Sequence[schemas.ProductCreate],
+    user: str,
+    chunk_size: int = BULK_CHUNK_SIZE
+) -> List[dict]:
+    """
+    Create many products in one transaction using multi-row INSERT ... RETURNING.
+
+    Name conflicts (with existing rows or earlier items in the same batch) are
+    reported per item and do not abort the batch. Each chunk runs in a
+    savepoint; if a concurrent writer wins a name between the conflict check
+    and the insert, that chunk falls back to per-row inserts. Created rows
+    go to the audit trail once the batch commits.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        products (Sequence[schemas.ProductCreate]): Products to create.
+        user (str): Username of the creator.
+        chunk_size (int): Maximum rows per INSERT statement.
+
+    Returns:
+        List[dict]: One schemas.BulkItemResult-shaped result per input item, in input order.
+
+    Raises:
+        SQLAlchemyError: If database operation fails.
+    """
+    results: List[Optional[dict]] = [None] * len(products)
+    seen_names = set()
+    now = datetime.utcnow()
+    try:
+        for chunk in _chunks(list(enumerate(products)), chunk_size):
+            existing = _existing_names(db, [p.name for _, p in chunk])
+            pending = []
+            for index, product in chunk:
+                if product.name in existing or product.name in seen_names:
+                    results[index] = _conflict(index, existing.get(product.name))
+                    continue
+                seen_names.add(product.name)
+                pending.append((index, {
+                    "name": product.name,
+                    "description": product.description,
+                    "created_at": now,
+                    "updated_at": now,
+                    "created_by": user,
+                    "updated_by": user,
+                }))
+            if not pending:
+                continue
+            try:
+                with db.begin_nested():
+                    created = db.scalars(
+                        insert(models.Product).returning(models.Product, sort_by_parameter_order=True),
+                        [values for _, values in pending]
+                    ).all()
+                for (index, _), db_product in zip(pending, created):
+                    results[index] = _result(index, schemas.BulkStatus.created, db_product.id, db_product)
+            except IntegrityError:
+                for index, values in pending:
+                    try:
+                        with db.begin_nested():
+                            db_product = db.scalars(
+                                insert(models.Product).returning(models.Product), [values]
+                            ).one()
+                        results[index] = _result(index, schemas.BulkStatus.created, db_product.id, db_product)
+                    except IntegrityError:
+                        results[index] = _conflict(index)
+        created = [r["product"] for r in results if r["status"] == schemas.BulkStatus.created]
+        _record_changes(db, schemas.ChangeOp.insert, [p.id for p in created], user)
+        db.commit()
+        cache.product_cache.invalidate_pages()
+        audit.recorder.record_many(schemas.ChangeOp.insert.value, user, (
+            (p.id, None, serialization.product_to_dict(p)) for p in created
+        ))
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+    return results
+
+def bulk_update_products(
+    db: Session,
+    updates: Sequence[schemas.ProductBulkUpdateItem],
+    user: str,
+    chunk_size: int = BULK_CHUNK_SIZE
+) -> List[dict]:
+    """
+    Update many products in one transaction with a single executemany UPDATE per chunk.
+
+    Fields left as None are kept unchanged, matching update_product. Missing
+    IDs and name conflicts are reported per item without aborting the batch.
+    Once an item passes these checks, later items with the same ID are
+    reported as conflicts, whichever chunk they fall in; a repeat after a
+    rejected item (say, a retry at a fresher version) still applies.
+    Items carrying a ``version`` only apply at that version, otherwise they
+    are reported as conflicts; they run as one conditional UPDATE each,
+    since executemany row counts do not say which row matched. The audit
+    trail gets each product as read by the existence check and as
+    refreshed after the update.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        updates (Sequence[schemas.ProductBulkUpdateItem]): Updates keyed by product ID.
+        user (str): Username of the updater.
+        chunk_size (int): Maximum rows per UPDATE statement.
+
+    Returns:
+        List[dict]: One schemas.BulkItemResult-shaped result per input item, in input order.
+
+    Raises:
+        SQLAlchemyError: If database operation fails.
+    """
+    table = models.Product.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(
+            name=func.coalesce(bindparam("b_name"), table.c.name),
+            description=func.coalesce(bindparam("b_description"), table.c.description),
+            updated_at=bindparam("b_updated_at"),
+            updated_by=bindparam("b_updated_by"),
+            version=table.c.version + 1,
+        )
+    )
+    versioned_stmt = stmt.where(table.c.version == bindparam("b_version"))
+    results: List[Optional[dict]] = [None] * len(updates)
+    claimed_names = set()
+    # Products as they were before this batch, for the audit trail
+    before: Dict[int, Row] = {}
+    # IDs an earlier item of the batch updates, across chunks
+    claimed_ids = set()
+    try:
+        for chunk in _chunks(list(enumerate(updates)), chunk_size):
+            ids = [item.id for _, item in chunk]
+            if audit.recorder.enabled:
+                rows = db.execute(select(*PRODUCT_COLUMNS).where(models.Product.id.in_(ids))).all()
+                before.update((row.id, row) for row in rows)
+                found = {row.id: row.version for row in rows}
+            else:
+                found = dict(db.execute(
+                    select(models.Product.id, models.Product.version).where(models.Product.id.in_(ids))
+                ).all())
+            existing = _existing_names(db, [item.name for _, item in chunk if item.name is not None])
+            now = datetime.utcnow()
+            pending = []
+            for index, item in chunk:
+                if item.id in claimed_ids:
+                    results[index] = _duplicate(index, item.id)
+                    continue
+                if item.id not in found:
+                    results[index] = _not_found(index, item.id)
+                    continue
+                if item.version is not None and item.version != found[item.id]:
+                    results[index] = _conflict(index, item.id)
+                    continue
+                if item.name is not None:
+                    owner = existing.get(item.name)
+                    if (owner is not None and owner != item.id) or item.name in claimed_names:
+                        results[index] = _conflict(index, item.id)
+                        continue
+                    claimed_names.add(item.name)
+                claimed_ids.add(item.id)
+                pending.append((index, {
+                    "b_id": item.id,
+                    "b_name": item.name,
+                    "b_description": item.description,
+                    "b_updated_at": now,
+                    "b_updated_by": user,
+                    "b_version": item.version,
+                }))
+            if not pending:
+                continue
+            applied = []
+            batch = [entry for entry in pending if entry[1]["b_version"] is None]
+            one_by_one = [entry for entry in pending if entry[1]["b_version"] is not None]
+            if batch:
+                try:
+                    with db.begin_nested():
+                        db.execute(stmt, [params for _, params in batch])
+                    applied.extend(batch)
+                except IntegrityError:
+                    one_by_one.extend(batch)
+            for index, params in sorted(one_by_one, key=lambda entry: entry[0]):
+                try:
+                    with db.begin_nested():
+                        matched = db.execute(
+                            versioned_stmt if params["b_version"] is not None else stmt, params
+                        ).rowcount
+                    if matched:
+                        applied.append((index, params))
+                    else:
+                        # Changed by a concurrent writer since the version check above
+                        results[index] = _conflict(index, params["b_id"])
+                except IntegrityError:
+                    results[index] = _conflict(index, params["b_id"])
+            refreshed = {
+                p.id: p for p in db.scalars(
+                    select(models.Product)
+                    .where(models.Product.id.in_([params["b_id"] for _, params in applied]))
+                    .execution_options(populate_existing=True)
+                ).all()
+            }
+            for index, params in applied:
+                results[index] = _result(
+                    index, schemas.BulkStatus.updated, params["b_id"], refreshed.get(params["b_id"])
+                )
+        updated = [r["product"] for r in results if r["status"] == schemas.BulkStatus.updated]
+        _record_changes(db, schemas.ChangeOp.update, [p.id for p in updated], user)
+        db.commit()
+        cache.product_cache.invalidate_products(p.id for p in updated)
+        audit.recorder.record_many(schemas.ChangeOp.update.value, user, (
+            (p.id, serialization.products_to_dicts([before[p.id]])[0], serialization.product_to_dict(p))
+            for p in updated
+        ))
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+    return results
+
+def bulk_delete_products(
+    db: Session,
+    product_ids: Sequence[int],
+    user: str,
+    chunk_size: int = BULK_CHUNK_SIZE
+) -> List[dict]:
+    """
+    Delete many products in one transaction using DELETE ... WHERE id IN (...) RETURNING,
+    which also returns the deleted rows for the audit trail.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        product_ids (Sequence[int]): IDs of the products to delete.
+        user (str): Username of the deleter (for the change log and audit trail).
+        chunk_size (int): Maximum IDs per DELETE statement.
+
+    Returns:
+        List[dict]: One schemas.BulkItemResult-shaped result per input ID, in input order.
+
+    Raises:
+        SQLAlchemyError: If database operation fails.
+    """
+    results: List[dict] = []
+    removed: List[Row] = []
     try:
+        for chunk in _chunks(list(enumerate(product_ids)), chunk_size):
+            deleted = {row.id: row for row in db.execute(
+                delete(models.Product)
+                .where(models.Product.id.in_({product_id for _, product_id in chunk}))
+                .returning(*PRODUCT_COLUMNS)
+                .execution_options(synchronize_session=False)
+            )}
+            for index, product_id in chunk:
+                row = deleted.pop(product_id, None)
+                if row is not None:
+                    removed.append(row)
+                    results.append(_result(index, schemas.BulkStatus.deleted, product_id))
+                else:
+                    results.append(_not_found(index, product_id))
+        _record_changes(db, schemas.ChangeOp.delete, [row.id for row in removed], user)
         db.commit()
+        cache.product_cache.invalidate_products(row.id for row in removed)
+        audit.recorder.record_many(schemas.ChangeOp.delete.value, user, (
+            (row.id, snapshot, None) for row, snapshot in zip(removed, serialization.products_to_dicts(removed))
+        ))
     except SQLAlchemyError as e:
         db.rollback()
         raise e
+    return results
 
 # Exports:
+# - PRODUCT_COLUMNS
 # - create_product
 # - get_product
+# - get_products_by_ids
+# - get_products_by_names
 # - get_products
+# - get_products_after
+# - search_products
+# - get_product_version
+# - get_product_versions
+# - get_product_changes
+# - VersionConflictError
 # - update_product
-# - delete_product
\ No newline at end of file
+# - delete_product
+# - EXPORT_COLUMNS
+# - export_statement
+# - stream_products
+# - ImportConflictError
+# - create_import_staging
+# - stage_import_rows
+# - merge_import
+# - bulk_create_products
+# - bulk_update_products
+# - bulk_delete_products
\ No newline at end of file
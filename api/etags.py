@@ -0,0 +1,89 @@
+import hashlib
+import re
+from typing import Any, Iterable, List, Optional, Tuple
+
+_PRODUCT_ETAG = re.compile(r'^(?:W/)?"p(\d+)-v(\d+)"$')
+
+def product_etag(product_id: int, version: int) -> str:
+    """
+    Build the weak ETag for a single product from its ID and version.
+
+    Args:
+        product_id (int): Product ID.
+        version (int): Product version column.
+
+    Returns:
+        str: Weak ETag header value.
+    """
+    return f'W/"p{product_id}-v{version}"'
+
+def collection_etag(params: Tuple[Any, ...], rows: Iterable[Tuple[int, int]]) -> str:
+    """
+    Build the weak ETag for a list page from its query and the versions of its rows.
+
+    Args:
+        params (Tuple[Any, ...]): Query parameters identifying the page.
+        rows (Iterable[Tuple[int, int]]): (id, version) of every row on the page.
+
+    Returns:
+        str: Weak ETag header value.
+    """
+    digest = hashlib.blake2b(repr(params).encode("utf-8"), digest_size=16)
+    for product_id, version in rows:
+        digest.update(f"{product_id}:{version};".encode("ascii"))
+    return f'W/"c{digest.hexdigest()}"'
+
+def matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag using weak comparison.
+
+    Args:
+        if_none_match (Optional[str]): Raw If-None-Match header value.
+        etag (str): Current ETag of the resource.
+
+    Returns:
+        bool: True if the client's copy is current.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+def if_match_versions(if_match: str, product_id: int) -> Optional[List[int]]:
+    """
+    Extract the product versions named by an If-Match header.
+
+    Product ETags are weak because representations may vary in encoding,
+    but the version they carry is exact, so If-Match compares them by
+    version rather than rejecting weak tags outright.
+
+    Args:
+        if_match (str): Raw If-Match header value.
+        product_id (int): ID of the product being modified.
+
+    Returns:
+        Optional[List[int]]: None for ``*`` (any current version), otherwise the
+        versions of this product named by the header; empty if none can match.
+    """
+    if if_match.strip() == "*":
+        return None
+    versions = []
+    for candidate in if_match.split(","):
+        match = _PRODUCT_ETAG.match(candidate.strip())
+        if match and int(match.group(1)) == product_id:
+            versions.append(int(match.group(2)))
+    return versions
+
+# Exports:
+# - product_etag: weak ETag for a single product
+# - collection_etag: weak ETag for a list page
+# - matches: weak If-None-Match comparison
+# - if_match_versions: product versions named by If-Match
@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Sequence
+
+from sqlalchemy import Row
+
+from .crud import EXPORT_COLUMNS
+
+# Rows fetched from the server-side cursor per batch
+EXPORT_BATCH_SIZE = 1000
+
+class ExportFormat(str, Enum):
+    """
+    Supported catalog export formats.
+    """
+    ndjson = "ndjson"
+    csv = "csv"
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _ndjson_batch(rows: Sequence[Row]) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=_json_default, separators=(",", ":")) + "\n"
+        for row in rows
+    ).encode("utf-8")
+
+def _csv_batch(rows: Sequence[Row]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        [value.isoformat() if isinstance(value, datetime) else value for value in row]
+        for row in rows
+    )
+    return buffer.getvalue().encode("utf-8")
+
+async def encode_export(batches: AsyncIterator[Sequence[Row]], fmt: ExportFormat) -> AsyncIterator[bytes]:
+    """
+    Encode streamed row batches into NDJSON or CSV chunks, one chunk per batch.
+
+    Args:
+        batches (AsyncIterator[Sequence[Row]]): Row batches with EXPORT_COLUMNS.
+        fmt (ExportFormat): Output format.
+
+    Yields:
+        bytes: Encoded chunk; the CSV stream starts with a header row.
+    """
+    if fmt == ExportFormat.csv:
+        header = io.StringIO()
+        csv.writer(header).writerow(EXPORT_COLUMNS)
+        yield header.getvalue().encode("utf-8")
+        encode = _csv_batch
+    else:
+        encode = _ndjson_batch
+    async for rows in batches:
+        yield encode(rows)
+
+# Exports:
+# - EXPORT_BATCH_SIZE: rows per server-side cursor batch
+# - ExportFormat: supported export formats
+# - MEDIA_TYPES: response media type per format
+# - encode_export: encode row batches into NDJSON/CSV chunks
@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.concurrency import run_in_threadpool
+
+from . import database, metrics
+
+logger = logging.getLogger("cloud-infra-api.health")
+
+# Seconds a readiness result is reused; however often the load balancer and
+# orchestrator poll /ready, each worker probes the database at most this often
+READY_CACHE_SECONDS = float(os.getenv("READY_CACHE_SECONDS", "2"))
+
+# A probe slower than this counts as a failure
+READY_TIMEOUT_SECONDS = float(os.getenv("READY_TIMEOUT_SECONDS", "2"))
+
+# Connections opened at startup, so the first requests do not pay for
+# connection setup; capped at DB_POOL_SIZE, 0 disables warming
+POOL_WARM_CONNECTIONS = int(os.getenv("DB_POOL_WARM_CONNECTIONS", str(database.POOL_SIZE)))
+
+# Seconds spent in each startup phase, in the order they completed
+STARTUP_PHASES: Dict[str, float] = {}
+
+READINESS_PROBES = metrics.registry.register(metrics.Counter(
+    "readiness_probes_total", "Database probes run for /ready (cached answers excluded), by result.", ("result",)
+))
+
+metrics.registry.register(metrics.Gauge(
+    "app_startup_phase_seconds", "Seconds this worker spent in each startup phase.", ("phase",),
+    lambda: {(name, ): seconds for name, seconds in STARTUP_PHASES.items()}
+))
+
+def record_phase(name: str, seconds: float) -> None:
+    """
+    Record the duration of a startup phase.
+    """
+    STARTUP_PHASES[name] = seconds
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Time the enclosed block as a startup phase.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - started)
+
+def _warm_count(pool, connections: int) -> int:
+    # NullPool (aiosqlite, external poolers) keeps nothing to warm
+    size = getattr(pool, "size", None)
+    return min(connections, size()) if callable(size) else 0
+
+def warm_pool(engine: Engine, connections: int = POOL_WARM_CONNECTIONS) -> int:
+    """
+    Open pool connections concurrently and return them to the pool idle.
+
+    Performs blocking I/O; call it from a worker thread. Failures are logged,
+    not raised: a database that is down at startup shows up in /ready.
+
+    Returns:
+        int: Connections opened.
+    """
+    count = _warm_count(engine.pool, connections)
+    if count == 0:
+        return 0
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        futures = [executor.submit(engine.connect) for _ in range(count)]
+    opened = 0
+    for future in futures:
+        try:
+            future.result().close()
+            opened += 1
+        except SQLAlchemyError as e:
+            logger.warning("Connection pool warmup failed: %s", e)
+    return opened
+
+async def warm_pool_async(engine: AsyncEngine, connections: int = POOL_WARM_CONNECTIONS) -> int:
+    """
+    Async version of warm_pool.
+    """
+    count = _warm_count(engine.pool, connections)
+    if count == 0:
+        return 0
+    results = await asyncio.gather(*(engine.connect().start() for _ in range(count)), return_exceptions=True)
+    opened = 0
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.warning("Connection pool warmup failed: %s", result)
+            continue
+        await result.close()
+        opened += 1
+    return opened
+
+async def warm_request_pool() -> int:
+    """
+    Warm the pool of the engine serving requests (selected by DB_ASYNC).
+    """
+    if database.USE_ASYNC_DB:
+        return await warm_pool_async(database.async_engine)
+    return await run_in_threadpool(warm_pool, database.engine)
+
+def _ping_sync() -> None:
+    with database.engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+async def ping_database() -> None:
+    """
+    Run ``SELECT 1`` on the primary through the engine serving requests.
+    """
+    if database.USE_ASYNC_DB:
+        async with database.async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    else:
+        await run_in_threadpool(_ping_sync)
+
+class ReadinessProbe:
+    """
+    Cached, single-flight readiness check.
+
+    Not ready until ``started`` is set at the end of application startup.
+    After that, a result is reused for ``cache_seconds``; when it is stale
+    the next caller runs one probe and concurrent callers wait for that
+    same probe, so the database sees at most one probe per interval per
+    worker. A probe that fails or exceeds ``timeout`` reports not ready.
+    """
+
+    def __init__(
+        self,
+        ping: Callable[[], Awaitable[None]] = ping_database,
+        cache_seconds: float = READY_CACHE_SECONDS,
+        timeout: float = READY_TIMEOUT_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ping = ping
+        self.cache_seconds = cache_seconds
+        self.timeout = timeout
+        self.started = False
+        self._clock = clock
+        self._result: Optional[Tuple[bool, str]] = None
+        self._checked_at = -math.inf
+        self._probe: Optional[asyncio.Task] = None
+
+    async def _run(self) -> Tuple[bool, str]:
+        try:
+            await asyncio.wait_for(self.ping(), self.timeout)
+            result = (True, "ok")
+        except Exception as e:
+            result = (False, type(e).__name__)
+        READINESS_PROBES.inc("ok" if result[0] else "failed")
+        if not result[0]:
+            logger.warning("Readiness probe failed: %s", result[1])
+        self._result, self._checked_at = result, self._clock()
+        return result
+
+    async def check(self) -> Tuple[bool, str]:
+        """
+        Whether this worker can serve requests.
+
+        Returns:
+            Tuple[bool, str]: Readiness, and ``ok`` or the reason it is not ready.
+        """
+        if not self.started:
+            return False, "starting"
+        if self._result is not None and self._clock() - self._checked_at < self.cache_seconds:
+            return self._result
+        loop = asyncio.get_running_loop()
+        if self._probe is None or self._probe.done() or self._probe.get_loop() is not loop:
+            self._probe = loop.create_task(self._run())
+        # Shielded: a caller that disconnects must not cancel the probe others wait on
+        return await asyncio.shield(self._probe)
+
+# Process-wide probe served at /ready
+readiness = ReadinessProbe()
+
+# Exports:
+# - READY_CACHE_SECONDS, READY_TIMEOUT_SECONDS, POOL_WARM_CONNECTIONS: probe and warmup settings
+# - STARTUP_PHASES: seconds per startup phase
+# - READINESS_PROBES: database probe counter by result
+# - record_phase / phase: record startup phase timings
+# - warm_pool / warm_pool_async / warm_request_pool: open pool connections at startup
+# - ping_database: database connectivity check
+# - ReadinessProbe: cached, single-flight readiness check
+# - readiness: process-wide ReadinessProbe
@@ -0,0 +1,175 @@
+import codecs
+import csv
+import json
+from enum import Enum
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from . import async_crud, schemas
+from .export import ExportFormat
+
+# Imports accept the same formats the catalog export produces
+ImportFormat = ExportFormat
+
+# Validated rows staged per round trip
+IMPORT_CHUNK_SIZE = 5000
+
+# Per-line errors returned in the job summary; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+class ConflictMode(str, Enum):
+    """
+    How an import treats names that already exist.
+    """
+    skip = "skip"
+    upsert = "upsert"
+    fail = "fail"
+
+async def iter_records(chunks: AsyncIterator[bytes], fmt: ImportFormat) -> AsyncIterator[Tuple[int, str]]:
+    """
+    Split a streamed UTF-8 body into records without buffering the whole body.
+
+    NDJSON records are single lines. CSV records may span lines inside quoted
+    fields; a record is complete once it contains an even number of quotes.
+
+    Args:
+        chunks (AsyncIterator[bytes]): Raw request body chunks.
+        fmt (ImportFormat): Body format.
+
+    Yields:
+        Tuple[int, str]: Line number the record starts on, and the record text.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    record: List[str] = []
+    record_start = line_no = 0
+
+    def complete(text: str) -> Optional[Tuple[int, str]]:
+        nonlocal record, record_start
+        if not record:
+            record_start = line_no
+        record.append(text)
+        joined = "\n".join(record)
+        if fmt == ImportFormat.csv and joined.count('"') % 2:
+            return None
+        record = []
+        return (record_start, joined) if joined.strip() else None
+
+    async def lines() -> AsyncIterator[str]:
+        nonlocal pending
+        async for chunk in chunks:
+            pending += decoder.decode(chunk)
+            *complete_lines, pending = pending.split("\n")
+            for line in complete_lines:
+                yield line.rstrip("\r")
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            yield pending.rstrip("\r")
+
+    async for line in lines():
+        line_no += 1
+        result = complete(line)
+        if result is not None:
+            yield result
+    if record:
+        yield record_start, "\n".join(record)
+
+def parse_record(fmt: ImportFormat, text: str, header: Optional[List[str]]) -> Dict[str, Optional[str]]:
+    """
+    Parse one NDJSON or CSV record into product fields.
+
+    Raises:
+        ValueError: If the record cannot be parsed.
+    """
+    if fmt == ImportFormat.ndjson:
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object.")
+        return data
+    values = next(csv.reader([text]))
+    if len(values) != len(header):
+        raise ValueError(f"Expected {len(header)} columns, got {len(values)}.")
+    data = dict(zip(header, values))
+    # CSV cannot distinguish NULL from empty; the export writes NULL as empty
+    if data.get("description") == "":
+        data["description"] = None
+    return data
+
+def _validation_message(error: ValidationError) -> str:
+    first = error.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    return f"{location}: {first['msg']}" if location else first["msg"]
+
+async def run_import(
+    db: async_crud.AnySession,
+    chunks: AsyncIterator[bytes],
+    fmt: ImportFormat,
+    on_conflict: ConflictMode,
+    user: str
+) -> dict:
+    """
+    Stream, validate and load an import body, then merge it into products.
+
+    Rows are validated against schemas.ProductCreate as they arrive and
+    staged in chunks of IMPORT_CHUNK_SIZE, so memory is bounded by the chunk
+    size rather than the body size. The whole import is one transaction.
+
+    Returns:
+        dict: Job summary matching schemas.ImportSummary.
+
+    Raises:
+        ValueError: If a CSV body has no usable header.
+        crud.ImportConflictError: If on_conflict is ``fail`` and any name already exists.
+    """
+    summary = {"received": 0, "valid": 0, "invalid": 0, "errors": []}
+
+    def reject(line: int, message: str) -> None:
+        summary["invalid"] += 1
+        if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+            summary["errors"].append({"line": line, "error": message})
+
+    await async_crud.create_import_staging(db)
+    header: Optional[List[str]] = None
+    chunk: List[Tuple[int, str, Optional[str]]] = []
+    async for line, text in iter_records(chunks, fmt):
+        if fmt == ImportFormat.csv and header is None:
+            header = [column.strip() for column in next(csv.reader([text]))]
+            if "name" not in header:
+                raise ValueError("CSV header must include a 'name' column.")
+            continue
+        summary["received"] += 1
+        try:
+            data = parse_record(fmt, text, header)
+            product = schemas.ProductCreate(name=data.get("name"), description=data.get("description"))
+        except ValidationError as e:
+            reject(line, _validation_message(e))
+            continue
+        except (ValueError, csv.Error) as e:
+            reject(line, f"Malformed record: {e}")
+            continue
+        chunk.append((line, product.name, product.description))
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            await async_crud.stage_import_rows(db, chunk)
+            chunk = []
+    await async_crud.stage_import_rows(db, chunk)
+
+    merged = await async_crud.merge_import(
+        db, on_conflict=on_conflict.value, user=user,
+        max_errors=MAX_REPORTED_ERRORS - len(summary["errors"])
+    )
+    summary["invalid"] += merged["duplicates"]
+    summary["valid"] = summary["received"] - summary["invalid"]
+    summary["errors"] = sorted(summary["errors"] + merged["errors"], key=lambda e: e["line"])
+    summary["errors_truncated"] = summary["invalid"] > len(summary["errors"])
+    summary.update(inserted=merged["inserted"], updated=merged["updated"], skipped=merged["skipped"])
+    return summary
+
+# Exports:
+# - ImportFormat: accepted import formats
+# - IMPORT_CHUNK_SIZE: validated rows staged per round trip
+# - MAX_REPORTED_ERRORS: maximum per-line errors in the summary
+# - ConflictMode: conflict handling for existing names
+# - iter_records: split a streamed body into records
+# - parse_record: parse one record into product fields
+# - run_import: stream, validate, stage and merge an import
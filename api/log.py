@@ -0,0 +1,256 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from . import metrics
+
+# Records buffered between request threads and the writer thread; further records are dropped
+QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Fraction of requests whose INFO records are kept; WARNING and above are always kept
+INFO_SAMPLE_RATE = float(os.getenv("LOG_INFO_SAMPLE_RATE", "1.0"))
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Header carrying the request id in and out; generated when the client sends none
+REQUEST_ID_HEADER = "x-request-id"
+
+# Standard LogRecord attributes; anything else on a record came from ``extra``
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# Context fields copied onto every record logged while handling a request
+CONTEXT_FIELDS = ("request_id", "route", "user")
+
+LOG_RECORDS_DROPPED = metrics.registry.register(metrics.Counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full."
+))
+LOG_RECORDS_SAMPLED_OUT = metrics.registry.register(metrics.Counter(
+    "log_records_sampled_out_total", "INFO log records skipped by sampling."
+))
+
+# Queue installed by configure(), reported by the log_queue_depth gauge
+_queue: Optional[queue.Queue] = None
+
+metrics.registry.register(metrics.Gauge(
+    "log_queue_depth", "Log records waiting to be written.",
+    callback=lambda: _queue.qsize() if _queue is not None else 0
+))
+
+class RequestContext:
+    """
+    Request details attached to log records; ``user`` is filled in once authenticated.
+    """
+    __slots__ = ("request_id", "scope", "user", "sampled")
+
+    def __init__(self, request_id: str, scope: dict, sampled: bool = True):
+        self.request_id = request_id
+        self.scope = scope
+        self.user: Optional[str] = None
+        self.sampled = sampled
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+
+# Set by RequestLogMiddleware; copied into threadpool workers with the request context
+_request_context: ContextVar[Optional[RequestContext]] = ContextVar("request_context", default=None)
+
+def current_request() -> Optional[RequestContext]:
+    """
+    Return the logging context of the request being handled, if any.
+    """
+    return _request_context.get()
+
+def set_user(username: str) -> None:
+    """
+    Record the authenticated user on the current request's log context.
+    """
+    context = _request_context.get()
+    if context is not None:
+        context.user = username
+
+def is_sampled(request_id: str, rate: float) -> bool:
+    """
+    Decide whether a request's INFO records are kept.
+
+    Keyed on the request id, so a kept request keeps all of its lines and
+    the decision is the same in every worker.
+    """
+    if rate >= 1.0:
+        return True
+    return zlib.crc32(request_id.encode("utf-8")) % 10000 < rate * 10000
+
+class ContextFilter(logging.Filter):
+    """
+    Copy request context onto records and apply INFO sampling.
+
+    Runs on the logging thread, before the record is queued: the context
+    variable is not visible from the writer thread.
+    """
+
+    def __init__(self, sample_rate: float = INFO_SAMPLE_RATE):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _request_context.get()
+        if context is not None:
+            for name in CONTEXT_FIELDS:
+                if not hasattr(record, name):
+                    setattr(record, name, getattr(context, name))
+        if record.levelno > logging.INFO:
+            return True
+        sampled = context.sampled if context is not None else random.random() < self.sample_rate
+        if not sampled:
+            LOG_RECORDS_SAMPLED_OUT.inc()
+        return sampled
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Queue handler that never blocks: records that do not fit are counted and dropped.
+
+    Formatting is left to the listener thread; only the message is merged
+    with its arguments here, so later changes to mutable arguments are not
+    seen by the writer.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line.
+
+    Fields: timestamp, level, logger, message, the request context fields
+    and any ``extra`` passed to the logging call.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES:
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+def configure(
+    level: str = LOG_LEVEL,
+    queue_size: int = QUEUE_SIZE,
+    sample_rate: float = INFO_SAMPLE_RATE,
+    stream=None
+) -> QueueListener:
+    """
+    Route root logging through a bounded queue to a JSON writer thread.
+
+    Replaces any handlers on the root logger. The listener is stopped (and
+    the queue drained) at interpreter exit.
+
+    Returns:
+        QueueListener: The running listener writing records to ``stream`` (stderr by default).
+    """
+    writer = logging.StreamHandler(stream or sys.stderr)
+    writer.setFormatter(JsonFormatter())
+    records: queue.Queue = queue.Queue(maxsize=queue_size)
+    handler = DroppingQueueHandler(records)
+    handler.addFilter(ContextFilter(sample_rate))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    global _queue
+    _queue = records
+    listener = QueueListener(records, writer, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+access_logger = logging.getLogger("cloud-infra-api.access")
+
+class RequestLogMiddleware:
+    """
+    ASGI middleware assigning request ids and writing one access record per request.
+
+    The request id is taken from ``X-Request-ID`` (or generated) and echoed
+    back on the response. Access records are INFO, or ERROR for 5xx
+    responses, so server errors are never sampled out.
+    """
+
+    def __init__(self, app, sample_rate: float = INFO_SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER.encode("latin-1"):
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        context = RequestContext(request_id, scope, is_sampled(request_id, self.sample_rate))
+        token = _request_context.set(context)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", ()), (REQUEST_ID_HEADER.encode("latin-1"), request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            latency_ms = round((time.perf_counter() - start) * 1000, 3)
+            access_logger.log(
+                logging.ERROR if status_code >= 500 else logging.INFO,
+                "%s %s %s", scope["method"], context.route, status_code,
+                extra={"method": scope["method"], "status": status_code, "latency_ms": latency_ms},
+            )
+            _request_context.reset(token)
+
+# Exports:
+# - QUEUE_SIZE, INFO_SAMPLE_RATE, LOG_LEVEL: logging settings
+# - LOG_RECORDS_DROPPED, LOG_RECORDS_SAMPLED_OUT: logging counters
+# - RequestContext / current_request / set_user: per-request log context
+# - is_sampled: per-request INFO sampling decision
+# - ContextFilter: attach request context and sample records
+# - DroppingQueueHandler: non-blocking bounded queue handler
+# - JsonFormatter: JSON lines formatter
+# - configure: install the queue-based JSON logging pipeline
+# - RequestLogMiddleware: request id and access log middleware
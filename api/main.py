@@ -1,22 +1,28 @@
+import time
+
+# Startup timing begins before the application's imports
+_started = time.perf_counter()
+
 import logging
-from typing import List
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import List, Optional, Union
 
-from fastapi import FastAPI, Depends, HTTPException, status, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, status, Request, Response
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
+from pydantic import conlist
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from . import models, schemas, crud, database
+from . import schemas, crud, async_crud, audit, auth, cache, changes, compression, database, etags, export, health, importer, log, metrics, migrations, pagination, ratelimit, replicas, serialization
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s %(name)s %(message)s"
-)
+# JSON logs written by a background thread through a bounded queue (LOG_LEVEL, LOG_QUEUE_SIZE, LOG_INFO_SAMPLE_RATE)
+log.configure()
 logger = logging.getLogger("cloud-infra-api")
+health.record_phase("import", time.perf_counter() - _started)
 
-# OAuth2/JWT security setup (placeholder, to be integrated with real auth provider)
+# Bearer tokens, validated by get_current_user
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 def get_db():
@@ -29,43 +35,156 @@ def get_db():
     finally:
         db.close()
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_async_db():
+    """
+    Dependency to get an async DB session.
+    """
+    async with database.AsyncSessionLocal() as db:
+        yield db
+
+# Session dependency used by the endpoints, selected by DB_ASYNC
+get_session = get_async_db if database.USE_ASYNC_DB else get_db
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
     """
-    Placeholder for user authentication.
-    Replace with real JWT/OAuth2 validation.
+    Authenticate the bearer token.
+
+    Tokens are verified against the identity provider's JWKS (AUTH_JWKS_URL);
+    verified tokens are cached until they expire. Without AUTH_JWKS_URL any
+    non-empty token is accepted as ``demo-user``.
     """
-    # TODO: Integrate with real authentication provider
     if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Not authenticated",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    # For demo, accept any non-empty token
-    return {"username": "demo-user"}
+    try:
+        user = await auth.authenticate(token)
+    except auth.InvalidTokenError as e:
+        logger.warning("Token rejected: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication token",
+            headers={"WWW-Authenticate": 'Bearer error="invalid_token"'},
+        )
+    log.set_user(user["username"])
+    return user
+
+def get_read_db(request: Request, user: dict = Depends(get_current_user)):
+    """
+    Dependency to get a DB session for a read-only endpoint.
+
+    Served by a read replica (DATABASE_REPLICA_URLS) when one is healthy and
+    the client has not written recently, otherwise by the primary. Depends
+    on get_current_user (resolved once per request), so requests that fail
+    authentication never take a connection.
+    """
+    db = replicas.router.read_session(ratelimit.client_key(request.scope))
+    try:
+        yield db
+    finally:
+        db.close()
 
+async def get_async_read_db(request: Request, user: dict = Depends(get_current_user)):
+    """
+    Dependency to get an async DB session for a read-only endpoint, after authentication.
+    """
+    async with await replicas.router.read_session_async(ratelimit.client_key(request.scope)) as db:
+        yield db
+
+# Session dependency used by read-only endpoints, selected by DB_ASYNC
+get_read_session = get_async_read_db if database.USE_ASYNC_DB else get_read_db
+
+_build_started = time.perf_counter()
 app = FastAPI(
     title="Cloud Infrastructure Automation Platform API",
     description="RESTful API for managing products and automating cloud resources.",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
+# Middleware is added innermost first: a request passes through request logging,
+# metrics, rate limiting, read-your-writes and compression, in that order
+
+# Negotiated gzip/br/zstd compression above COMPRESSION_MIN_SIZE; innermost, so
+# request latency includes it and every other middleware sees uncompressed sizes
+app.add_middleware(compression.CompressionMiddleware)
+# Read-your-writes: a client's reads go to the primary for a while after it writes
+app.add_middleware(replicas.ReadYourWritesMiddleware)
+# Load shedding (503) and per-client rate limits (429), before any request work;
+# inside metrics and access logging, so rejections still show up there, and
+# outside read-your-writes and compression, so rejected requests skip both
+app.add_middleware(ratelimit.RateLimitMiddleware)
+# Per-route request counts/latency and per-request DB usage, served at /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+# Request ids and one JSON access record per request; outermost, so latency covers the whole stack
+app.add_middleware(log.RequestLogMiddleware)
+
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
     """
-    Initialize database and log startup.
+    Check the schema, warm the connection pool and log startup.
+
+    The schema is not changed here: it is created and upgraded by the
+    migration step (python -m api.migrations) before workers start, and a
+    worker refuses to start against a database that step has not upgraded.
+    The check uses the sync engine, so it runs in the threadpool rather
+    than blocking the event loop while the database is slow to answer.
     """
     logger.info("Starting Cloud Infrastructure Automation Platform API...")
-    models.Base.metadata.create_all(bind=database.engine)
+    await run_in_threadpool(migrations.check_schema, database.engine)
+    with health.phase("pool_warm"):
+        await health.warm_request_pool()
+
+@app.on_event("startup")
+async def start_auth():
+    """
+    Load token signing keys before serving requests.
+    """
+    await auth.startup()
+
+@app.on_event("shutdown")
+def stop_auth():
+    """
+    Stop the background signing key refresh.
+    """
+    auth.shutdown()
+
+@app.on_event("startup")
+def start_audit():
+    """
+    Start writing buffered audit events in the background.
+    """
+    audit.recorder.start()
+
+@app.on_event("shutdown")
+def stop_audit():
+    """
+    Write buffered audit events, or spool them if the database cannot take them.
+    """
+    audit.recorder.stop()
+
+@app.on_event("startup")
+def startup_complete():
+    """
+    Record startup timings and start reporting ready.
+    """
+    health.record_phase("total", time.perf_counter() - _started)
+    health.readiness.started = True
+    logger.info(
+        "Ready to serve in %.3fs", health.STARTUP_PHASES["total"],
+        extra={"startup_phases": dict(health.STARTUP_PHASES)}
+    )
 
 @app.exception_handler(SQLAlchemyError)
 async def sqlalchemy_exception_handler(request: Request, exc: SQLAlchemyError):
     """
     Handle SQLAlchemy errors globally.
     """
-    logger.error(f"Database error: {exc}")
+    logger.error("Database error: %s", exc)
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={"detail": "Internal database error."}
@@ -76,19 +195,57 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     """
     Handle HTTP exceptions globally.
     """
-    logger.warning(f"HTTP error: {exc.detail}")
+    logger.warning("HTTP error: %s", exc.detail)
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail}
+        content={"detail": exc.detail},
+        headers=exc.headers
     )
 
 @app.get("/health", tags=["Health"], response_model=dict)
 def health_check():
     """
-    Health check endpoint.
+    Liveness check: the process is up and serving. Does not touch the database.
     """
     return {"status": "ok"}
 
+@app.get("/ready", tags=["Health"], response_model=dict)
+async def readiness_check():
+    """
+    Readiness check: 200 once startup has finished and the database answers, else 503.
+
+    The database probe is cached for READY_CACHE_SECONDS and shared by
+    concurrent callers, so frequent polling does not load the database.
+    """
+    ready, detail = await health.readiness.check()
+    if not ready:
+        return ORJSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "unavailable", "detail": detail},
+            headers={"Retry-After": str(max(1, round(health.READY_CACHE_SECONDS)))}
+        )
+    return {"status": "ready"}
+
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+def prometheus_metrics():
+    """
+    Prometheus metrics for this worker.
+    """
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/cache/stats", tags=["Health"], response_model=dict)
+def cache_stats():
+    """
+    Product cache hit, miss and eviction counters for this worker.
+    """
+    return cache.product_cache.stats()
+
+def not_modified(etag: str) -> Response:
+    """
+    Build a 304 response for a conditional GET whose ETag matched.
+    """
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
 # --- Product CRUD Endpoints ---
 
 @app.post(
@@ -98,26 +255,26 @@ def health_check():
     tags=["Products"],
     summary="Create a new product"
 )
-def create_product(
+async def create_product(
     product: schemas.ProductCreate,
-    db: Session = Depends(get_db),
+    db: async_crud.AnySession = Depends(get_session),
     user: dict = Depends(get_current_user)
 ):
     """
     Create a new product.
     """
     try:
-        db_product = crud.create_product(db=db, product=product, user=user["username"])
-        logger.info(f"Product created: {db_product.id} by {user['username']}")
+        db_product = await async_crud.create_product(db=db, product=product, user=user["username"])
+        logger.info("Product created: %s by %s", db_product.id, user['username'])
         return db_product
     except IntegrityError as e:
-        logger.error(f"Integrity error on product creation: {e}")
+        logger.error("Integrity error on product creation: %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Product with this name already exists."
         )
     except Exception as e:
-        logger.error(f"Unexpected error on product creation: {e}")
+        logger.error("Unexpected error on product creation: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create product."
@@ -125,23 +282,420 @@ def create_product(
 
 @app.get(
     "/products/",
-    response_model=List[schemas.Product],
+    response_model=Union[schemas.ProductPage, List[schemas.Product]],
     status_code=status.HTTP_200_OK,
     tags=["Products"],
     summary="List all products"
 )
-def list_products(
+async def list_products(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    after: Optional[str] = None,
+    created_by: Optional[str] = None,
+    updated_after: Optional[datetime] = None,
+    updated_before: Optional[datetime] = None,
+    sort: schemas.ProductSort = schemas.ProductSort.id,
+    if_none_match: Optional[str] = Header(None),
+    db: async_crud.AnySession = Depends(get_read_session),
     user: dict = Depends(get_current_user)
 ):
     """
     Retrieve all products.
+
+    Passing ``after`` (an empty value starts from the beginning) switches to
+    keyset pagination and returns a page with ``next_cursor``. Without it the
+    legacy ``skip``/``limit`` offset listing is returned. Both accept
+    ``created_by``, ``updated_after`` ("changed since"), ``updated_before``
+    and ``sort`` (``id``, ``updated_at``, ``-`` prefix for descending); a
+    cursor is only valid with the sort it was issued for. Pages carry an
+    ETag; a matching If-None-Match returns 304 Not Modified.
+    """
+    filters = schemas.ProductFilter(created_by=created_by, updated_after=updated_after, updated_before=updated_before)
+    by_updated_at = sort in (schemas.ProductSort.updated_at, schemas.ProductSort.updated_at_desc)
+    after_id = after_updated_at = None
+    if after is not None:
+        try:
+            position = pagination.decode_cursor(after)
+            if position is not None:
+                after_id = position["id"]
+                if by_updated_at:
+                    after_updated_at = datetime.fromisoformat(position["updated_at"])
+        except (pagination.InvalidCursorError, KeyError, TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Malformed pagination cursor."
+            )
+        # One lookahead row tells whether another page exists
+        window = limit + 1
+        params = ("after", after_id, after_updated_at and after_updated_at.isoformat(), window)
+    else:
+        window = limit
+        params = ("offset", skip, window)
+    params += async_crud.list_params(filters, sort)
+
+    if if_none_match and not cache.product_cache.enabled:
+        # Compare versions before loading and serializing full rows
+        versions = await async_crud.get_product_versions(
+            db=db, skip=skip if after is None else 0, limit=window, after_id=after_id,
+            filters=filters, sort=sort, after_updated_at=after_updated_at
+        )
+        etag = etags.collection_etag(params, versions)
+        if etags.matches(if_none_match, etag):
+            return not_modified(etag)
+
+    if after is None:
+        products = await async_crud.get_products_cached(db=db, skip=skip, limit=limit, filters=filters, sort=sort)
+        rows = products
+    else:
+        rows = await async_crud.get_products_after_cached(
+            db=db, after_id=after_id, limit=window, filters=filters, sort=sort, after_updated_at=after_updated_at
+        )
+        products, has_more = pagination.split_page(rows, limit)
+
+    etag = etags.collection_etag(params, ((p["id"], p["version"]) for p in rows))
+    if etags.matches(if_none_match, etag):
+        return not_modified(etag)
+
+    # Items are already serialized; skip response_model re-validation
+    if after is None:
+        logger.info("Products listed by %s: count=%s", user['username'], len(products))
+        return serialization.json_response(products, headers={"ETag": etag})
+    next_cursor = None
+    if has_more and products:
+        last = products[-1]
+        cursor = {"id": last["id"], "updated_at": last["updated_at"]} if by_updated_at else {"id": last["id"]}
+        next_cursor = pagination.encode_cursor(cursor)
+    logger.info("Products page listed by %s: count=%s", user['username'], len(products))
+    return serialization.json_response({"items": products, "next_cursor": next_cursor}, headers={"ETag": etag})
+
+# --- Search Endpoints ---
+
+@app.get(
+    "/products/search",
+    response_model=schemas.ProductSearchPage,
+    status_code=status.HTTP_200_OK,
+    tags=["Products"],
+    summary="Search products"
+)
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=256),
+    limit: int = Query(20, ge=1, le=100),
+    after: Optional[str] = None,
+    db: async_crud.AnySession = Depends(get_read_session),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Search products by name and description.
+
+    Results are ranked, with name prefix matches first for typeahead, and
+    paginated with ``after`` set to the previous page's ``next_cursor``.
+    """
+    try:
+        position = pagination.decode_cursor(after or "")
+        after_key = None if position is None else (Decimal(str(position["rank"])), position["id"])
+    except (pagination.InvalidCursorError, KeyError, InvalidOperation):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Malformed pagination cursor."
+        )
+    rows = await async_crud.search_products_cached(db=db, query=q, limit=limit + 1, after=after_key)
+    results, has_more = pagination.split_page(rows, limit)
+    next_cursor = None
+    if has_more and results:
+        next_cursor = pagination.encode_cursor({"rank": str(results[-1]["rank"]), "id": results[-1]["id"]})
+    logger.info("Products searched by %s: count=%s", user['username'], len(results))
+    return serialization.json_response({"items": results, "next_cursor": next_cursor})
+
+# --- Batch Lookup Endpoints ---
+
+async def _batch_lookup(
+    db: async_crud.AnySession,
+    ids: Optional[List[int]],
+    names: Optional[List[str]],
+    user: dict
+) -> Response:
+    if (ids is None) == (names is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pass either ids or names."
+        )
+    keys = list(dict.fromkeys(ids if ids is not None else names))
+    if not keys or len(keys) > schemas.MAX_BATCH_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Between 1 and {schemas.MAX_BATCH_ITEMS} ids or names are allowed."
+        )
+    if ids is not None:
+        found = await async_crud.get_products_by_ids_cached(db=db, product_ids=keys)
+    else:
+        rows = await async_crud.get_products_by_names(db=db, names=keys)
+        found = {p["name"]: p for p in serialization.products_to_dicts(rows)}
+    items = [found[key] for key in keys if key in found]
+    missing = [key for key in keys if key not in found]
+    logger.info("Products batch retrieved by %s: found=%s missing=%s", user['username'], len(items), len(missing))
+    # Items are already serialized; skip response_model re-validation
+    return serialization.json_response({"items": items, "missing": missing})
+
+@app.get(
+    "/products/batch",
+    response_model=schemas.ProductBatch,
+    status_code=status.HTTP_200_OK,
+    tags=["Products"],
+    summary="Get many products by ID or name"
+)
+async def get_products_batch(
+    ids: Optional[str] = Query(None, description="Comma-separated product IDs."),
+    names: Optional[List[str]] = Query(None, description="Product names; repeat the parameter for each name."),
+    db: async_crud.AnySession = Depends(get_read_session),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Retrieve many products in one request, by ``ids`` or by ``names``.
+
+    Items come back in request order, each once; IDs or names that do not
+    exist are listed in ``missing``. Use POST for lists too long for a URL.
+    """
+    product_ids = None
+    if ids is not None:
+        try:
+            product_ids = [int(value) for value in ids.split(",") if value.strip()]
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Malformed ids."
+            )
+    return await _batch_lookup(db, product_ids, names, user)
+
+@app.post(
+    "/products/batch",
+    response_model=schemas.ProductBatch,
+    status_code=status.HTTP_200_OK,
+    tags=["Products"],
+    summary="Get many products by ID or name"
+)
+async def post_products_batch(
+    lookup: schemas.ProductBatchLookup,
+    db: async_crud.AnySession = Depends(get_read_session),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Retrieve many products in one request, with the IDs or names in the body.
+
+    Same as ``GET /products/batch``; reads only.
     """
-    products = crud.get_products(db=db, skip=skip, limit=limit)
-    logger.info(f"Products listed by {user['username']}: count={len(products)}")
-    return products
+    return await _batch_lookup(db, lookup.ids, lookup.names, user)
+
+# --- Change Feed Endpoints ---
+
+def _decode_since(since: Optional[str]) -> Optional[changes.Position]:
+    try:
+        return changes.decode_position(since)
+    except pagination.InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@app.get(
+    "/products/changes",
+    response_model=schemas.ProductChangeFeed,
+    status_code=status.HTTP_200_OK,
+    tags=["Products"],
+    summary="Read the product change feed"
+)
+async def list_product_changes(
+    since: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    wait: float = Query(0, ge=0, le=30),
+    db: async_crud.AnySession = Depends(get_session),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Retrieve inserts, updates and deletes (tombstones) after ``since``, oldest first.
+
+    Start without ``since`` and pass ``next`` back until ``has_more`` is false;
+    keep ``next`` to fetch only later changes. With ``wait`` the request
+    long-polls for up to that many seconds while there are no changes.
+
+    Entries carry the product's latest state, not its state as of that
+    change: several changes to one product all show its current row, and
+    every change to a since-deleted product shows null. Use the feed to
+    learn which products changed, not to replay their history.
+    """
+    position = _decode_since(since)
+    entries, position, has_more = await changes.read_changes(db, position, limit, wait=wait)
+    logger.info("Product changes read by %s: count=%s", user['username'], len(entries))
+    return serialization.json_response({"changes": entries, "next": changes.encode_position(position), "has_more": has_more})
+
+@app.get(
+    "/products/changes/stream",
+    status_code=status.HTTP_200_OK,
+    tags=["Products"],
+    summary="Stream the product change feed as server-sent events"
+)
+async def stream_product_changes(
+    since: Optional[str] = None,
+    duration: float = Query(300, ge=0, le=3600),
+    last_event_id: Optional[str] = Header(None),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Stream changes after ``since`` (or the ``Last-Event-ID`` of a reconnecting
+    EventSource) as ``change`` events, closing after ``duration`` seconds.
+    Entries carry the product's latest state, as in ``GET /products/changes``.
+    """
+    position = _decode_since(last_event_id or since)
+    logger.info("Product change stream opened by %s", user['username'])
+    return StreamingResponse(
+        changes.stream_changes(position, duration),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# --- Bulk & Export Product Endpoints ---
+# Declared before the /products/{product_id} routes so "bulk" and "export" are not parsed as IDs.
+
+@app.get(
+    "/products/export",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+    tags=["Products"],
+    summary="Export the full product catalog"
+)
+async def export_products(
+    format: export.ExportFormat = export.ExportFormat.ndjson,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Stream every product as NDJSON or CSV from a server-side cursor.
+
+    Memory stays flat regardless of table size: rows are fetched and encoded
+    in batches and written to the client as they are produced.
+    """
+    logger.info("Product export (%s) started by %s", format.value, user['username'])
+    batches = async_crud.stream_products(batch_size=export.EXPORT_BATCH_SIZE)
+    return StreamingResponse(
+        export.encode_export(batches, format),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="products.{format.value}"'}
+    )
+
+def _bulk_response(results: List[dict], success: schemas.BulkStatus) -> dict:
+    succeeded = sum(1 for r in results if r["status"] == success)
+    return {"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
+
+@app.post(
+    "/products/import",
+    response_model=schemas.ImportSummary,
+    status_code=status.HTTP_200_OK,
+    tags=["Products"],
+    summary="Import products from a streamed NDJSON or CSV body"
+)
+async def import_products(
+    request: Request,
+    format: importer.ImportFormat = importer.ImportFormat.ndjson,
+    on_conflict: importer.ConflictMode = importer.ConflictMode.skip,
+    db: async_crud.AnySession = Depends(get_session),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Bulk-load products from the request body in a single transaction.
+
+    The body is read as a stream and validated in chunks; rows are loaded
+    into a staging table (COPY on Postgres) and merged into products.
+    ``on_conflict`` decides whether existing names are skipped, updated, or
+    fail the whole import with 409.
+    """
+    try:
+        summary = await importer.run_import(
+            db, request.stream(), format, on_conflict, user=user["username"]
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except crud.ImportConflictError as e:
+        logger.warning("Product import rejected for %s: %s", user['username'], e)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    logger.info(
+        "Products imported by %s: received=%s inserted=%s updated=%s skipped=%s invalid=%s",
+        user["username"], summary["received"], summary["inserted"], summary["updated"],
+        summary["skipped"], summary["invalid"]
+    )
+    return summary
+
+@app.post(
+    "/products/bulk",
+    response_model=schemas.BulkResult,
+    status_code=status.HTTP_200_OK,
+    tags=["Products"],
+    summary="Create products in bulk"
+)
+async def bulk_create_products(
+    products: conlist(schemas.ProductCreate, min_length=1, max_length=schemas.MAX_BULK_ITEMS),
+    db: async_crud.AnySession = Depends(get_session),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Create many products in a single transaction, reporting results per item.
+    """
+    results = await async_crud.bulk_create_products(db=db, products=products, user=user["username"])
+    response = _bulk_response(results, schemas.BulkStatus.created)
+    logger.info(
+        "Products bulk created by %s: succeeded=%s failed=%s",
+        user["username"], response["succeeded"], response["failed"]
+    )
+    return response
+
+@app.patch(
+    "/products/bulk",
+    response_model=schemas.BulkResult,
+    status_code=status.HTTP_200_OK,
+    tags=["Products"],
+    summary="Update products in bulk"
+)
+async def bulk_update_products(
+    updates: conlist(schemas.ProductBulkUpdateItem, min_length=1, max_length=schemas.MAX_BULK_ITEMS),
+    db: async_crud.AnySession = Depends(get_session),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Update many products in a single transaction, reporting results per item.
+    """
+    results = await async_crud.bulk_update_products(db=db, updates=updates, user=user["username"])
+    response = _bulk_response(results, schemas.BulkStatus.updated)
+    logger.info(
+        "Products bulk updated by %s: succeeded=%s failed=%s",
+        user["username"], response["succeeded"], response["failed"]
+    )
+    return response
+
+@app.delete(
+    "/products/bulk",
+    response_model=schemas.BulkResult,
+    status_code=status.HTTP_200_OK,
+    tags=["Products"],
+    summary="Delete products in bulk"
+)
+async def bulk_delete_products(
+    request: schemas.ProductBulkDelete,
+    db: async_crud.AnySession = Depends(get_session),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Delete many products in a single transaction, reporting results per ID.
+    """
+    results = await async_crud.bulk_delete_products(db=db, product_ids=request.ids, user=user["username"])
+    response = _bulk_response(results, schemas.BulkStatus.deleted)
+    logger.info(
+        "Products bulk deleted by %s: succeeded=%s failed=%s",
+        user["username"], response["succeeded"], response["failed"]
+    )
+    return response
 
 @app.get(
     "/products/{product_id}",
@@ -150,23 +704,37 @@ def list_products(
     tags=["Products"],
     summary="Get product by ID"
 )
-def get_product(
+async def get_product(
     product_id: int,
-    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
+    db: async_crud.AnySession = Depends(get_read_session),
     user: dict = Depends(get_current_user)
 ):
     """
     Retrieve a product by its ID.
+
+    The response carries an ETag; a matching If-None-Match returns 304 Not Modified.
     """
-    product = crud.get_product(db=db, product_id=product_id)
+    if if_none_match and not cache.product_cache.enabled:
+        # Compare versions before loading and serializing the full row
+        version = await async_crud.get_product_version(db=db, product_id=product_id)
+        if version is not None:
+            etag = etags.product_etag(version.id, version.version)
+            if etags.matches(if_none_match, etag):
+                return not_modified(etag)
+
+    product = await async_crud.get_product_cached(db=db, product_id=product_id)
     if not product:
-        logger.warning(f"Product not found: id={product_id}")
+        logger.warning("Product not found: id=%s", product_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found."
         )
-    logger.info(f"Product retrieved: id={product_id} by {user['username']}")
-    return product
+    etag = etags.product_etag(product["id"], product["version"])
+    if etags.matches(if_none_match, etag):
+        return not_modified(etag)
+    logger.info("Product retrieved: id=%s by %s", product_id, user['username'])
+    return serialization.json_response(product, headers={"ETag": etag})
 
 @app.put(
     "/products/{product_id}",
@@ -175,43 +743,63 @@ def get_product(
     tags=["Products"],
     summary="Update product by ID"
 )
-def update_product(
+async def update_product(
     product_id: int,
     product_update: schemas.ProductUpdate,
-    db: Session = Depends(get_db),
+    if_match: Optional[str] = Header(None),
+    db: async_crud.AnySession = Depends(get_session),
     user: dict = Depends(get_current_user)
 ):
     """
     Update an existing product.
+
+    To avoid overwriting a concurrent change, send the ETag from a GET in
+    If-Match (412 Precondition Failed if the product has changed since), or
+    the version read in the body's ``version`` (409 Conflict). Without either
+    the update applies unconditionally. The response carries the new ETag.
     """
-    product = crud.get_product(db=db, product_id=product_id)
-    if not product:
-        logger.warning(f"Product not found for update: id={product_id}")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found."
-        )
+    expected_versions = etags.if_match_versions(if_match, product_id) if if_match else None
+    if product_update.version is not None:
+        candidates = [product_update.version] if expected_versions is None else expected_versions
+        expected_versions = [v for v in candidates if v == product_update.version]
     try:
-        updated_product = crud.update_product(
+        updated_product = await async_crud.update_product(
             db=db,
             product_id=product_id,
             product_update=product_update,
-            user=user["username"]
+            user=user["username"],
+            expected_versions=expected_versions
+        )
+    except crud.VersionConflictError as e:
+        logger.warning("Product update conflict: id=%s current_version=%s", product_id, e.current_version)
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED if if_match else status.HTTP_409_CONFLICT,
+            detail=f"Product was modified concurrently; current version is {e.current_version}.",
+            headers={"ETag": etags.product_etag(product_id, e.current_version)}
         )
-        logger.info(f"Product updated: id={product_id} by {user['username']}")
-        return updated_product
     except IntegrityError as e:
-        logger.error(f"Integrity error on product update: {e}")
+        logger.error("Integrity error on product update: %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Product update failed due to integrity error."
         )
     except Exception as e:
-        logger.error(f"Unexpected error on product update: {e}")
+        logger.error("Unexpected error on product update: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update product."
         )
+    if updated_product is None:
+        logger.warning("Product not found for update: id=%s", product_id)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found."
+        )
+    logger.info("Product updated: id=%s by %s", product_id, user['username'])
+    return serialization.json_response(
+        serialization.product_to_dict(updated_product),
+        headers={"ETag": etags.product_etag(product_id, updated_product.version)}
+    )
 
 @app.delete(
     "/products/{product_id}",
@@ -220,31 +808,32 @@ def update_product(
     tags=["Products"],
     summary="Delete product by ID"
 )
-def delete_product(
+async def delete_product(
     product_id: int,
-    db: Session = Depends(get_db),
+    db: async_crud.AnySession = Depends(get_session),
     user: dict = Depends(get_current_user)
 ):
     """
     Delete a product by its ID.
     """
-    product = crud.get_product(db=db, product_id=product_id)
-    if not product:
-        logger.warning(f"Product not found for deletion: id={product_id}")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found."
-        )
     try:
-        crud.delete_product(db=db, product_id=product_id, user=user["username"])
-        logger.info(f"Product deleted: id={product_id} by {user['username']}")
-        return {"detail": "Product deleted successfully."}
+        deleted = await async_crud.delete_product(db=db, product_id=product_id, user=user["username"])
     except Exception as e:
-        logger.error(f"Unexpected error on product deletion: {e}")
+        logger.error("Unexpected error on product deletion: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to delete product."
         )
+    if not deleted:
+        logger.warning("Product not found for deletion: id=%s", product_id)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found."
+        )
+    logger.info("Product deleted: id=%s by %s", product_id, user['username'])
+    return {"detail": "Product deleted successfully."}
+
+health.record_phase("app_build", time.perf_counter() - _build_started)
 
 # Export FastAPI app instance
 # This is used by ASGI servers (e.g., uvicorn) to run the application
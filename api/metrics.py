@@ -0,0 +1,307 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+# Default latency buckets (seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Finer buckets for individual queries and pool checkouts (seconds)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Buckets for statements issued per request
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    """
+    Base class for metrics rendered in the Prometheus text exposition format.
+    """
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+class Counter(Metric):
+    """
+    Monotonically increasing counter with optional labels.
+    """
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        with self._lock:
+            return self._values.get(labelvalues, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return super().render() + [
+            f"{self.name}{_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in items
+        ]
+
+class Gauge(Metric):
+    """
+    Gauge whose value is read from a callback at render time.
+
+    Without labels the callback returns a number; with labels it returns a
+    mapping of label value tuples to numbers.
+    """
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Callable[[], Union[float, Dict[Tuple[str, ...], float]]] = lambda: 0.0
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        values = self.callback()
+        if not self.labelnames:
+            values = {(): values}
+        return super().render() + [
+            f"{self.name}{_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(values.items())
+        ]
+
+class Histogram(Metric):
+    """
+    Cumulative histogram with fixed buckets and optional labels.
+    """
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last)], sum, count
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(labelvalues, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, *labelvalues: str) -> int:
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            return sum(entry[0]) if entry else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, (list(counts), total[0])) for labels, (counts, total) in self._values.items())
+        lines = super().render()
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="{}"'.format(_format_value(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class Registry:
+    """
+    Collection of metrics rendered together at /metrics.
+    """
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests by method, route template and status code.",
+    ("method", "route", "status")
+))
+REQUEST_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template.",
+    ("method", "route")
+))
+REQUEST_QUERIES = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements issued per HTTP request.",
+    ("route",), buckets=QUERY_COUNT_BUCKETS
+))
+REQUEST_DB_TIME = registry.register(Histogram(
+    "http_request_db_duration_seconds", "Total SQL execution time per HTTP request.",
+    ("route",)
+))
+DB_QUERY_LATENCY = registry.register(Histogram(
+    "db_query_duration_seconds", "Latency of individual SQL statements.",
+    buckets=DB_BUCKETS
+))
+DB_POOL_WAIT = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting to check a connection out of the pool.",
+    buckets=DB_BUCKETS
+))
+DB_POOL_TIMEOUTS = registry.register(Counter(
+    "db_pool_timeouts_total", "Checkouts that gave up after the pool timeout."
+))
+
+class DecayingAverage:
+    """
+    Exponentially weighted average whose weight decays with time, not sample count.
+
+    Without new samples the value decays towards zero, so a signal that
+    stops arriving (e.g. pool waits while requests are being shed) does not
+    stay high forever.
+    """
+
+    def __init__(self, half_life: float = 5.0, clock: Callable[[], float] = time.monotonic):
+        self.half_life = half_life
+        self._clock = clock
+        self._value = 0.0
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _decay(self, now: float) -> None:
+        self._value *= 0.5 ** ((now - self._updated) / self.half_life)
+        self._updated = now
+
+    def update(self, value: float) -> None:
+        with self._lock:
+            now = self._clock()
+            self._decay(now)
+            # Each sample moves the average a tenth of the way, however close together samples arrive
+            self._value += (value - self._value) * 0.1
+
+    def value(self) -> float:
+        with self._lock:
+            self._decay(self._clock())
+            return self._value
+
+# Recent pool checkout wait, read by load shedding
+DB_POOL_WAIT_RECENT = DecayingAverage()
+
+class RequestStats:
+    """
+    Database work attributed to the current request.
+    """
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+# Set by MetricsMiddleware; copied into threadpool workers with the request context
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def record_query(seconds: float) -> None:
+    """
+    Record one SQL statement, attributing it to the current request if any.
+    """
+    DB_QUERY_LATENCY.observe(seconds)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += seconds
+
+def record_pool_wait(seconds: float) -> None:
+    """
+    Record time spent waiting for a pooled connection.
+    """
+    DB_POOL_WAIT.observe(seconds)
+    DB_POOL_WAIT_RECENT.update(seconds)
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route request counts, latency and DB usage.
+
+    Routes are labelled by their template (e.g. ``/products/{product_id}``)
+    to keep label cardinality bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            route = scope.get("route")
+            route_label = getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            REQUESTS.inc(method, route_label, str(status_code))
+            REQUEST_LATENCY.observe(elapsed, method, route_label)
+            REQUEST_QUERIES.observe(stats.queries, route_label)
+            REQUEST_DB_TIME.observe(stats.db_seconds, route_label)
+
+# Exports:
+# - Counter, Gauge, Histogram: metric types
+# - Registry / registry: metric collection rendered at /metrics
+# - CONTENT_TYPE: Prometheus exposition content type
+# - REQUESTS, REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_DB_TIME: request metrics
+# - DB_QUERY_LATENCY, DB_POOL_WAIT, DB_POOL_TIMEOUTS: database metrics
+# - DecayingAverage / DB_POOL_WAIT_RECENT: time-decayed recent pool wait
+# - record_query: record a SQL statement
+# - record_pool_wait: record a pool checkout wait
+# - MetricsMiddleware: ASGI request metrics middleware
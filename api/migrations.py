@@ -0,0 +1,140 @@
+"""
+Schema migration step, run once per deploy before the API starts:
+
+    python -m api.migrations
+
+Creates missing tables (with their PostgreSQL search and change log DDL)
+and upgrades databases created by earlier versions with the columns and
+indexes added since. Every step is idempotent, and on PostgreSQL
+concurrent runs wait on an advisory lock, so running it from several
+hosts at once is safe. The API itself never changes the schema.
+"""
+import logging
+import time
+from typing import List, Set
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateIndex
+
+from . import database, log, models
+
+logger = logging.getLogger("cloud-infra-api.migrations")
+
+# pg_advisory_xact_lock key serializing concurrent migration runs
+LOCK_KEY = 7_412_603_118
+
+class SchemaOutdatedError(RuntimeError):
+    """
+    Raised at startup when the database lacks tables or columns the models use.
+    """
+
+def missing_schema(connection: Connection) -> List[str]:
+    """
+    List model tables and columns the database does not have.
+
+    Args:
+        connection (Connection): Connection to the primary database.
+
+    Returns:
+        List[str]: Missing ``table`` and ``table.column`` names; empty when current.
+    """
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    missing = []
+    for table in models.Base.metadata.sorted_tables:
+        if table.name not in tables:
+            missing.append(table.name)
+            continue
+        present = {column["name"] for column in inspector.get_columns(table.name)}
+        missing += [f"{table.name}.{column.name}" for column in table.columns if column.name not in present]
+    return missing
+
+def check_schema(engine: Engine) -> None:
+    """
+    Fail fast when the migration step has not run for this version.
+
+    Without it a worker would start, pass readiness and fail every query
+    touching a column added since (such as products.version).
+
+    Raises:
+        SchemaOutdatedError: If tables or columns are missing.
+    """
+    with engine.connect() as connection:
+        missing = missing_schema(connection)
+    if missing:
+        raise SchemaOutdatedError(
+            f"Database schema is out of date (missing {', '.join(missing)}); run python -m api.migrations first."
+        )
+
+def _add_version_column(connection: Connection) -> bool:
+    columns = {column["name"] for column in inspect(connection).get_columns("products")}
+    if "version" in columns:
+        return False
+    connection.execute(text("ALTER TABLE products ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+    return True
+
+def _create_missing_indexes(connection: Connection, table_names: Set[str]) -> List[str]:
+    # create_all skips tables that exist, and with them any index added to the model later
+    inspector = inspect(connection)
+    created = []
+    for table in models.Base.metadata.sorted_tables:
+        if table.name not in table_names:
+            continue
+        present = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name not in present:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+                created.append(f"create index {index.name}")
+    return created
+
+def migrate(engine: Engine) -> List[str]:
+    """
+    Bring the database schema up to date, in one transaction.
+
+    Args:
+        engine (Engine): Engine connected to the primary database.
+
+    Returns:
+        List[str]: Steps applied; empty when the schema was already current.
+    """
+    applied = []
+    with engine.begin() as connection:
+        postgres = connection.dialect.name == "postgresql"
+        if postgres:
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY})
+        existing = set(inspect(connection).get_table_names())
+        # New tables get their dialect DDL from the after_create listeners in models
+        models.Base.metadata.create_all(bind=connection)
+        applied += [f"create table {table.name}" for table in models.Base.metadata.sorted_tables if table.name not in existing]
+        if "products" in existing:
+            if _add_version_column(connection):
+                applied.append("add column products.version")
+            if postgres:
+                # IF NOT EXISTS throughout; cheap when already applied
+                for statement in models.SEARCH_DDL:
+                    connection.execute(text(statement))
+        if postgres and "product_changes" in existing:
+            for statement in models.CHANGE_LOG_DDL:
+                connection.execute(text(statement))
+        applied += _create_missing_indexes(connection, existing)
+    return applied
+
+def main() -> None:
+    log.configure()
+    started = time.perf_counter()
+    applied = migrate(database.engine)
+    logger.info(
+        "Schema migrated in %.3fs: %s", time.perf_counter() - started, ", ".join(applied) or "already up to date",
+        extra={"applied": applied}
+    )
+
+# Exports:
+# - LOCK_KEY: advisory lock key serializing migration runs
+# - SchemaOutdatedError: the database needs migrating
+# - missing_schema / check_schema: compare the database with the models
+# - migrate: create and upgrade the schema
+# - main: command line entry point
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import DDL, JSON, BigInteger, Column, Index, Integer, String, Text, DateTime, event, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 
 # Base class for SQLAlchemy models
@@ -12,6 +13,11 @@ class Product(Base):
     Represents a product managed by the platform.
     """
     __tablename__ = "products"
+    __table_args__ = (
+        # Keyset pagination for listings sorted by update time / filtered by creator
+        Index("ix_products_updated_at_id", "updated_at", "id"),
+        Index("ix_products_created_by_id", "created_by", "id"),
+    )
 
     id: int = Column(Integer, primary_key=True, index=True)
     name: str = Column(String(128), unique=True, nullable=False, index=True)
@@ -20,10 +26,94 @@ class Product(Base):
     updated_at: datetime = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     created_by: str = Column(String(64), nullable=False)
     updated_by: str = Column(String(64), nullable=True)
+    # Incremented by every update; conditional updates compare it (see crud.update_product)
+    version: int = Column(Integer, nullable=False, default=1, server_default=text("1"))
 
     def __repr__(self) -> str:
         return f"<Product(id={self.id}, name='{self.name}')>"
 
+class ProductChange(Base):
+    """
+    SQLAlchemy model for the product change log.
+    One row per insert, update or delete of a product, written in the same
+    transaction as the change; deletes leave a tombstone row.
+    """
+    __tablename__ = "product_changes"
+    __table_args__ = (
+        Index("ix_product_changes_txid_seq", "txid", "seq"),
+    )
+
+    seq: int = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    # Writing transaction ID (PostgreSQL only, see CHANGE_LOG_DDL)
+    txid: int = Column(BigInteger, nullable=True)
+    product_id: int = Column(Integer, nullable=False)
+    op: str = Column(String(8), nullable=False)
+    changed_at: datetime = Column(DateTime, default=datetime.utcnow, nullable=False)
+    changed_by: str = Column(String(64), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<ProductChange(seq={self.seq}, op='{self.op}', product_id={self.product_id})>"
+
+class AuditEvent(Base):
+    """
+    SQLAlchemy model for the product audit trail.
+    One row per create, update or delete, with the product as it was before
+    and after the change (None for a create's before and a delete's after).
+    Written in batches after the change commits (see audit.AuditRecorder).
+    """
+    __tablename__ = "audit_events"
+    __table_args__ = (
+        Index("ix_audit_events_product_id_id", "product_id", "id"),
+    )
+
+    id: int = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    occurred_at: datetime = Column(DateTime, nullable=False, index=True)
+    actor: str = Column(String(64), nullable=True)
+    action: str = Column(String(8), nullable=False)
+    product_id: int = Column(Integer, nullable=False)
+    request_id: str = Column(String(64), nullable=True)
+    before: dict = Column(JSON().with_variant(JSONB, "postgresql"), nullable=True)
+    after: dict = Column(JSON().with_variant(JSONB, "postgresql"), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<AuditEvent(id={self.id}, action='{self.action}', product_id={self.product_id})>"
+
+# Sequence numbers are assigned at insert, not at commit, so on PostgreSQL a
+# transaction can commit a lower seq after a reader has moved past it. Each
+# change therefore records its transaction ID, and the feed only reads changes
+# from transactions older than every in-flight one (see crud.get_product_changes).
+CHANGE_LOG_DDL = (
+    "ALTER TABLE product_changes ALTER COLUMN txid SET DEFAULT (pg_current_xact_id()::text::bigint)",
+)
+
+for _statement in CHANGE_LOG_DDL:
+    event.listen(ProductChange.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+
+# Text search configuration used by the search_vector column and queries
+SEARCH_CONFIG = "english"
+
+# Postgres-only search support, created alongside the products table:
+# - search_vector: generated tsvector over name (weight A) and description (weight B)
+#   with a GIN index, for ranked full-text search
+# - a trigram GIN index on lower(name), so typeahead prefix LIKE queries use an index
+# Other dialects have neither and fall back to LIKE scans (see crud.search_products).
+SEARCH_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (lower(name) gin_trgm_ops)",
+)
+
+for _statement in SEARCH_DDL:
+    event.listen(Product.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+
 # Exports
 # - Base: SQLAlchemy declarative base
-# - Product: Product model class
\ No newline at end of file
+# - Product: Product model class
+# - ProductChange: product change log model class
+# - AuditEvent: product audit trail model class
+# - CHANGE_LOG_DDL: Postgres statements recording the writing transaction of each change
+# - SEARCH_CONFIG: text search configuration for product search
+# - SEARCH_DDL: Postgres statements creating the search column and indexes
\ No newline at end of file
@@ -0,0 +1,66 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+class InvalidCursorError(ValueError):
+    """
+    Raised when a pagination cursor cannot be decoded.
+    """
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """
+    Encode a keyset position into an opaque, URL-safe cursor.
+
+    Args:
+        position (Dict[str, Any]): Column values of the last row on the page.
+
+    Returns:
+        str: Opaque cursor string.
+    """
+    raw = json.dumps(position, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Optional[Dict[str, Any]]:
+    """
+    Decode an opaque cursor back into a keyset position.
+
+    Args:
+        cursor (str): Cursor produced by encode_cursor. An empty string
+            requests the first page.
+
+    Returns:
+        Optional[Dict[str, Any]]: The keyset position, or None for the first page.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed.
+    """
+    if not cursor:
+        return None
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise InvalidCursorError("Malformed pagination cursor.") from e
+    if not isinstance(position, dict) or not isinstance(position.get("id"), int):
+        raise InvalidCursorError("Malformed pagination cursor.")
+    return position
+
+def split_page(rows: Sequence[Any], limit: int) -> Tuple[List[Any], bool]:
+    """
+    Split a result fetched with limit + 1 rows into the page and a has-more flag.
+
+    Args:
+        rows (Sequence[Any]): Rows fetched with a LIMIT of limit + 1.
+        limit (int): Requested page size.
+
+    Returns:
+        Tuple[List[Any], bool]: The page rows and whether another page exists.
+    """
+    return list(rows[:limit]), len(rows) > limit
+
+# Exports:
+# - InvalidCursorError: raised for malformed cursors
+# - encode_cursor: encode a keyset position into an opaque cursor
+# - decode_cursor: decode an opaque cursor into a keyset position
+# - split_page: split a limit + 1 result into page and has-more flag
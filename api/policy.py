@@ -0,0 +1,340 @@
+"""
+Terraform plan policy check, evaluating the deny rules of
+iac/terraform/policies.rego in process:
+
+    terraform show -json plan.tfplan | python -m api.policy -
+    python -m api.policy plan.json --workers 4 --format json
+
+Each managed resource in the plan's ``resource_changes`` that still exists
+after the plan (everything but deletes) is checked as the Rego input
+``{"resource_type": <type>, "resource": <change.after>}``, and produces
+the same deny messages OPA would. The plan is parsed as a stream (with
+the optional ``ijson`` package) and resources are indexed by type, so
+each rule only visits the resources it applies to; large plans are
+evaluated in shards on a process pool.
+
+Exit status is 0 without violations and 1 with violations.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from typing import Any, BinaryIO, Callable, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    import ijson  # Optional dependency, parses the plan incrementally instead of loading it whole
+except ImportError:
+    ijson = None
+
+# Resources per shard handed to a worker process
+SHARD_SIZE = int(os.getenv("POLICY_SHARD_SIZE", "5000"))
+
+# With --workers 0 (the default), plans with fewer resources are evaluated in
+# this process: below this, starting workers and pickling shards costs more
+# than the evaluation it spreads out
+POOL_MIN_RESOURCES = int(os.getenv("POLICY_POOL_MIN_RESOURCES", "50000"))
+
+# Ports that may be open to 0.0.0.0/0 (allowed_ports in the Rego file)
+ALLOWED_PORTS = frozenset({80, 443, 8000})
+
+class Violation(NamedTuple):
+    """
+    One deny message for one planned resource.
+    """
+    address: str
+    resource_type: str
+    message: str
+
+class Rule(NamedTuple):
+    """
+    A deny rule: the resource type it applies to (None for every type),
+    the attributes of ``change.after`` it reads, and a check yielding
+    deny messages for one resource.
+    """
+    name: str
+    resource_type: Optional[str]
+    keys: FrozenSet[str]
+    check: Callable[[str, Any], Iterator[str]]
+
+# --- Rego semantics ---
+
+# Rego's undefined: a missing key, or a key looked up on something that is not an object
+_UNDEFINED = object()
+
+def _get(value: Any, key: str) -> Any:
+    return value.get(key, _UNDEFINED) if isinstance(value, dict) else _UNDEFINED
+
+def _truthy(value: Any) -> bool:
+    # A Rego expression holds unless it is undefined or false; null, 0 and "" hold
+    return value is not _UNDEFINED and value is not False
+
+def _members(value: Any) -> Iterable[Any]:
+    # x[_] iterates arrays and object values, and nothing else
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        return value.values()
+    return ()
+
+def _go_float(value: float) -> str:
+    # Go's %v for float64: shortest digits, exponent form from 1e+06 and below 1e-04
+    if value == 0:
+        return "0"
+    sign, digit_tuple, exponent = Decimal(repr(value)).normalize().as_tuple()
+    digits = "".join(map(str, digit_tuple))
+    point = len(digits) + exponent
+    prefix = "-" if sign else ""
+    if point - 1 < -4 or point - 1 >= 6:
+        mantissa = digits[0] + ("." + digits[1:] if len(digits) > 1 else "")
+        return f"{prefix}{mantissa}e{'-' if point - 1 < 0 else '+'}{abs(point - 1):02d}"
+    if point <= 0:
+        return f"{prefix}0.{'0' * -point}{digits}"
+    if point >= len(digits):
+        return prefix + digits + "0" * (point - len(digits))
+    return f"{prefix}{digits[:point]}.{digits[point:]}"
+
+def _term_string(value: Any) -> str:
+    # OPA's string form of a term, used by sprintf for non-string, non-number arguments
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, list):
+        return "[" + ", ".join(_term_string(item) for item in value) + "]"
+    return "{" + ", ".join(f"{_term_string(key)}: {_term_string(value[key])}" for key in sorted(value)) + "}"
+
+def _format_arg(verb: str, value: Any) -> str:
+    # OPA's sprintf passes Go values to fmt.Sprintf: numbers as int or float64,
+    # strings as string, anything else as its term string
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        value = _term_string(value)
+    if isinstance(value, str):
+        return value if verb == "s" else f"%!{verb}(string={value})"
+    if isinstance(value, int):
+        if verb == "d":
+            return str(value)
+        kind = "int" if -2**63 <= value < 2**63 else "*big.Int"
+        return f"%!{verb}({kind}={value})"
+    return f"%!{verb}(float64={_go_float(value)})"
+
+_VERB = re.compile(r"%([sd])")
+
+def _sprintf(template: str, *args: Any) -> str:
+    values = iter(args)
+    return _VERB.sub(lambda match: _format_arg(match.group(1), next(values)), template)
+
+# --- Rules, in the order of policies.rego ---
+
+def _rds_encryption(resource_type: str, resource: Any) -> Iterator[str]:
+    identifier = _get(resource, "identifier")
+    if not _truthy(_get(resource, "storage_encrypted")) and identifier is not _UNDEFINED:
+        yield _sprintf("RDS instance '%s' must have storage_encrypted=true for compliance.", identifier)
+
+def _rds_public_access(resource_type: str, resource: Any) -> Iterator[str]:
+    identifier = _get(resource, "identifier")
+    if _truthy(_get(resource, "publicly_accessible")) and identifier is not _UNDEFINED:
+        yield _sprintf("RDS instance '%s' must not be publicly accessible.", identifier)
+
+def _open_ingress(resource_type: str, resource: Any) -> Iterator[str]:
+    name = _get(resource, "name")
+    if name is _UNDEFINED:
+        return
+    for ingress in _members(_get(resource, "ingress")):
+        port = _get(ingress, "from_port")
+        if port is _UNDEFINED or not any(
+            isinstance(cidr, str) and cidr == "0.0.0.0/0" for cidr in _members(_get(ingress, "cidr_blocks"))
+        ):
+            continue
+        # Rego compares numbers by value (80.0 is 80) and never equal to booleans
+        if not isinstance(port, bool) and isinstance(port, (int, float)) and port in ALLOWED_PORTS:
+            continue
+        yield _sprintf(
+            "Security group '%s' allows ingress from 0.0.0.0/0 on port %d, which is not allowed.", name, port
+        )
+
+def _audit_log_tag(resource_type: str, resource: Any) -> Iterator[str]:
+    tags = _get(resource, "tags")
+    name = _get(tags, "Name")
+    if not _truthy(_get(tags, "AuditLogEnabled")) and name is not _UNDEFINED:
+        yield _sprintf("API server '%s' must have AuditLogEnabled tag for compliance.", name)
+
+def _project_tag(resource_type: str, resource: Any) -> Iterator[str]:
+    if not _truthy(_get(_get(resource, "tags"), "Project")):
+        yield _sprintf("Resource '%s' must have 'Project' tag for traceability.", resource_type)
+
+RULES: Tuple[Rule, ...] = (
+    Rule("rds_encryption", "aws_db_instance", frozenset({"storage_encrypted", "identifier"}), _rds_encryption),
+    Rule("rds_public_access", "aws_db_instance", frozenset({"publicly_accessible", "identifier"}), _rds_public_access),
+    Rule("open_ingress", "aws_security_group", frozenset({"ingress", "name"}), _open_ingress),
+    Rule("audit_log_tag", "aws_instance", frozenset({"tags"}), _audit_log_tag),
+    Rule("project_tag", None, frozenset({"tags"}), _project_tag),
+)
+
+_TYPED_RULES: Dict[str, Tuple[Rule, ...]] = {}
+for _rule in RULES:
+    if _rule.resource_type is not None:
+        _TYPED_RULES[_rule.resource_type] = _TYPED_RULES.get(_rule.resource_type, ()) + (_rule,)
+_GLOBAL_RULES = tuple(rule for rule in RULES if rule.resource_type is None)
+
+def rules_for(resource_type: str) -> Tuple[Rule, ...]:
+    """
+    The rules that apply to a resource type.
+    """
+    return _TYPED_RULES.get(resource_type, ()) + _GLOBAL_RULES
+
+def _keys_for(resource_type: str) -> FrozenSet[str]:
+    return frozenset().union(*(rule.keys for rule in rules_for(resource_type)))
+
+def evaluate_resource(resource_type: str, resource: Any) -> List[str]:
+    """
+    Deny messages for one Rego input, sorted and without duplicates like OPA's ``deny`` set.
+
+    Args:
+        resource_type (str): ``input.resource_type``.
+        resource (Any): ``input.resource``, the planned attributes (``change.after``).
+
+    Returns:
+        List[str]: Deny messages.
+    """
+    return sorted({message for rule in rules_for(resource_type) for message in rule.check(resource_type, resource)})
+
+# --- Plans ---
+
+# (position in the plan, address, attributes the type's rules read)
+Entry = Tuple[int, str, Any]
+
+def read_resource_changes(stream: BinaryIO) -> Iterator[dict]:
+    """
+    Iterate the ``resource_changes`` of ``terraform show -json`` output.
+
+    With ijson installed, one resource is held in memory at a time;
+    otherwise the whole document is loaded first.
+    """
+    if ijson is not None:
+        return ijson.items(stream, "resource_changes.item", use_float=True)
+    return iter(json.load(stream).get("resource_changes") or ())
+
+def index_resources(changes: Iterable[dict]) -> Dict[str, List[Entry]]:
+    """
+    Index the resources to check by type.
+
+    Data sources and deletes are skipped. Only the attributes read by the
+    rules for each type are kept, which keeps the index (and the shards
+    sent to worker processes) small.
+
+    Args:
+        changes (Iterable[dict]): Plan ``resource_changes``.
+
+    Returns:
+        Dict[str, List[Entry]]: Entries per resource type, in plan order.
+    """
+    index: Dict[str, List[Entry]] = {}
+    keys: Dict[str, FrozenSet[str]] = {}
+    for position, change in enumerate(changes):
+        after = (change.get("change") or {}).get("after")
+        if change.get("mode", "managed") != "managed" or after is None:
+            continue
+        resource_type = change["type"]
+        if resource_type not in keys:
+            keys[resource_type] = _keys_for(resource_type)
+        if isinstance(after, dict):
+            after = {key: value for key, value in after.items() if key in keys[resource_type]}
+        index.setdefault(resource_type, []).append((position, change.get("address", ""), after))
+    return index
+
+def _shards(index: Dict[str, List[Entry]], shard_size: int) -> Iterator[Tuple[str, List[Entry]]]:
+    for resource_type, entries in index.items():
+        for start in range(0, len(entries), shard_size):
+            yield resource_type, entries[start:start + shard_size]
+
+def _evaluate_shard(shard: Tuple[str, List[Entry]]) -> List[Tuple[int, Violation]]:
+    resource_type, entries = shard
+    rules = rules_for(resource_type)
+    found = []
+    for position, address, resource in entries:
+        messages = {message for rule in rules for message in rule.check(resource_type, resource)}
+        found.extend((position, Violation(address, resource_type, message)) for message in sorted(messages))
+    return found
+
+def evaluate(index: Dict[str, List[Entry]], workers: int = 1, shard_size: int = SHARD_SIZE) -> List[Violation]:
+    """
+    Evaluate indexed resources, on ``workers`` processes when more than one.
+
+    Args:
+        index (Dict[str, List[Entry]]): Resources from index_resources.
+        workers (int): Worker processes; 1 evaluates in this process.
+        shard_size (int): Resources per shard.
+
+    Returns:
+        List[Violation]: Violations in plan order, sorted by message within a resource.
+    """
+    shards = list(_shards(index, shard_size))
+    if workers > 1 and len(shards) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as pool:
+            found = [item for result in pool.map(_evaluate_shard, shards) for item in result]
+    else:
+        found = [item for shard in shards for item in _evaluate_shard(shard)]
+    found.sort(key=lambda item: item[0])
+    return [violation for _, violation in found]
+
+def check_plan(stream: BinaryIO, workers: int = 0, shard_size: int = SHARD_SIZE) -> Tuple[int, List[Violation]]:
+    """
+    Check a ``terraform show -json`` plan.
+
+    Args:
+        stream (BinaryIO): Plan JSON.
+        workers (int): Worker processes; 0 uses one per CPU for plans of at
+            least POOL_MIN_RESOURCES resources, and none below.
+        shard_size (int): Resources per shard.
+
+    Returns:
+        Tuple[int, List[Violation]]: Resources checked, and their violations.
+    """
+    index = index_resources(read_resource_changes(stream))
+    checked = sum(len(entries) for entries in index.values())
+    if workers == 0:
+        workers = (os.cpu_count() or 1) if checked >= POOL_MIN_RESOURCES else 1
+    return checked, evaluate(index, workers, shard_size)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("plan", help="terraform show -json output, or - to read it from stdin")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (default: automatic)")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="resources per worker shard")
+    parser.add_argument("--format", choices=("text", "json"), default="text")
+    args = parser.parse_args(argv)
+
+    if args.plan == "-":
+        checked, violations = check_plan(sys.stdin.buffer, args.workers, args.shard_size)
+    else:
+        with open(args.plan, "rb") as stream:
+            checked, violations = check_plan(stream, args.workers, args.shard_size)
+    if args.format == "json":
+        print(json.dumps([violation._asdict() for violation in violations], indent=2))
+    else:
+        for violation in violations:
+            print(f"DENY {violation.address}: {violation.message}")
+    print(f"Checked {checked} resources: {len(violations)} violations.", file=sys.stderr)
+    return 1 if violations else 0
+
+# Exports:
+# - SHARD_SIZE, POOL_MIN_RESOURCES: evaluation settings
+# - ALLOWED_PORTS: ports that may be open to 0.0.0.0/0
+# - Violation: a deny message for a planned resource
+# - Rule / RULES / rules_for: deny rules and their dispatch by resource type
+# - evaluate_resource: deny messages for one Rego input
+# - read_resource_changes: stream resource changes from plan JSON
+# - index_resources: index checked resources by type
+# - evaluate: evaluate indexed resources, optionally on a process pool
+# - check_plan: check a plan
+# - main: command line entry point
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+
+from . import auth, metrics
+
+logger = logging.getLogger("cloud-infra-api.ratelimit")
+
+# (requests per minute, burst) applied per client across all routes
+DEFAULT_LIMIT = (
+    float(os.getenv("RATE_LIMIT_PER_MINUTE", "600")),
+    float(os.getenv("RATE_LIMIT_BURST", "100")),
+)
+
+# Stricter per-client limits for expensive routes, keyed by "METHOD /path/template";
+# extended or overridden by RATE_LIMIT_ROUTES, e.g. '{"GET /products/": [120, 20]}'
+ROUTE_LIMITS: Dict[str, Tuple[float, float]] = {
+    "GET /products/export": (6, 2),
+    "POST /products/import": (6, 2),
+    "POST /products/bulk": (60, 10),
+    "PATCH /products/bulk": (60, 10),
+    "DELETE /products/bulk": (60, 10),
+    "GET /products/changes/stream": (12, 4),
+    **{route: tuple(limit) for route, limit in json.loads(os.getenv("RATE_LIMIT_ROUTES", "{}")).items()},
+}
+
+# Paths never limited or shed, so health checks and scraping keep working under load
+EXEMPT_PATHS = frozenset({"/health", "/ready", "/metrics"})
+
+# Long-lived responses that hold no DB connection while open; not counted as in-flight
+LONG_LIVED_ROUTES = frozenset({"/products/changes/stream"})
+
+# Load shedding thresholds per worker; 0 disables a check
+SHED_MAX_IN_FLIGHT = int(os.getenv("SHED_MAX_IN_FLIGHT", "256"))
+SHED_POOL_WAIT_SECONDS = float(os.getenv("SHED_POOL_WAIT_SECONDS", "0.5"))
+SHED_RETRY_AFTER = int(os.getenv("SHED_RETRY_AFTER_SECONDS", "1"))
+
+RATE_LIMITED = metrics.registry.register(metrics.Counter(
+    "http_requests_rate_limited_total", "Requests rejected with 429 by route template.", ("route",)
+))
+SHED = metrics.registry.register(metrics.Counter(
+    "http_requests_shed_total", "Requests rejected with 503 by load shedding, by reason.", ("reason",)
+))
+
+class RateLimitBackend:
+    """
+    Token bucket storage.
+
+    Buckets are kept in GCRA form: one "theoretical arrival time" per key
+    instead of a token count and refill timestamp. It admits exactly what a
+    token bucket of the same rate and burst admits, and it updates a single
+    value, which keeps the shared backend to one atomic script call.
+    """
+    # True when calls perform network I/O and should stay off the event loop
+    blocking: bool = False
+
+    def take_all(self, buckets: Sequence[Tuple[str, float, float]]) -> float:
+        """
+        Take one token from each bucket, atomically: from all of them, or none.
+
+        Args:
+            buckets (Sequence[Tuple[str, float, float]]): (key, refill rate in
+                tokens per second, capacity) per bucket.
+
+        Returns:
+            float: 0 if the request is allowed, otherwise seconds until every bucket has a token.
+        """
+        raise NotImplementedError
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        """
+        Take one token from the bucket at ``key``; see take_all.
+        """
+        return self.take_all([(key, rate, burst)])
+
+def _gcra(tat: Optional[float], now: float, interval: float, burst: float) -> Tuple[float, Optional[float]]:
+    """
+    Returns (retry_after, new_tat); new_tat is None when the request is denied.
+    """
+    new_tat = max(tat or now, now) + interval
+    allow_at = new_tat - burst * interval
+    if allow_at > now:
+        return allow_at - now, None
+    return 0.0, new_tat
+
+class InMemoryRateLimiter(RateLimitBackend):
+    """
+    Per-worker buckets with LRU eviction; an evicted bucket starts full again.
+    """
+
+    def __init__(self, max_keys: int = 100000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take_all(self, buckets: Sequence[Tuple[str, float, float]]) -> float:
+        with self._lock:
+            now = self._clock()
+            retry_after, updates = 0.0, []
+            for key, rate, burst in buckets:
+                wait, new_tat = _gcra(self._buckets.get(key), now, 1.0 / rate, burst)
+                retry_after = max(retry_after, wait)
+                updates.append((key, new_tat))
+            if retry_after:
+                return retry_after
+            for key, new_tat in updates:
+                self._buckets[key] = new_tat
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return 0.0
+
+# One bucket per key, with (interval, burst) pairs in ARGV; updates every bucket
+# only if all allow the request. Uses the server clock so workers with skewed
+# clocks share one timeline; returns a string because Redis truncates Lua
+# numbers to integers
+GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local retry = 0
+local new_tats = {}
+for i, key in ipairs(KEYS) do
+  local interval = tonumber(ARGV[2 * i - 1])
+  local burst = tonumber(ARGV[2 * i])
+  local tat = tonumber(redis.call('GET', key)) or now
+  if tat < now then tat = now end
+  new_tats[i] = tat + interval
+  local wait = new_tats[i] - burst * interval - now
+  if wait > retry then retry = wait end
+end
+if retry > 0 then return tostring(retry) end
+for i, key in ipairs(KEYS) do
+  redis.call('SET', key, tostring(new_tats[i]), 'PX', math.ceil((new_tats[i] - now) * 1000))
+end
+return '0'
+"""
+
+class RedisRateLimiter(RateLimitBackend):
+    """
+    Buckets in Redis, shared by all workers; each take is one atomic script call.
+    """
+    blocking = True
+
+    def __init__(self, client: Any, prefix: str = "cloud-infra:ratelimit:"):
+        self.prefix = prefix
+        self._script = client.register_script(GCRA_SCRIPT)
+
+    def take_all(self, buckets: Sequence[Tuple[str, float, float]]) -> float:
+        args = []
+        for _, rate, burst in buckets:
+            args += [repr(1.0 / rate), repr(burst)]
+        return float(self._script(keys=[self.prefix + key for key, _, _ in buckets], args=args))
+
+class RateLimiter:
+    """
+    Applies the client-wide limit and any route limit to a request.
+    """
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        default: Tuple[float, float] = DEFAULT_LIMIT,
+        routes: Optional[Dict[str, Tuple[float, float]]] = None
+    ):
+        self.backend = backend
+        self.default = default
+        self.routes = ROUTE_LIMITS if routes is None else routes
+
+    def check(self, client: str, route: str) -> float:
+        """
+        Take a token for ``client`` on ``route`` ("METHOD /path/template").
+
+        The client-wide and route buckets are taken together: a request
+        denied by either consumes neither.
+
+        Returns:
+            float: 0 if allowed, otherwise seconds to wait before retrying.
+        """
+        # The client in braces keeps its keys in one Redis Cluster hash slot
+        limits = [(f"{{{client}}}:*", self.default)]
+        if route in self.routes:
+            limits.append((f"{{{client}}}:{route}", self.routes[route]))
+        return self.backend.take_all([(key, per_minute / 60.0, burst) for key, (per_minute, burst) in limits])
+
+class LoadShedder:
+    """
+    Rejects new requests while the worker is saturated.
+
+    Saturation is either too many requests in flight, or a recent average
+    pool checkout wait above the threshold: waiting for connections is the
+    first sign the database is the bottleneck, and queueing more requests
+    behind it only raises everyone's latency.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = SHED_MAX_IN_FLIGHT,
+        max_pool_wait: float = SHED_POOL_WAIT_SECONDS,
+        pool_wait: Callable[[], float] = metrics.DB_POOL_WAIT_RECENT.value
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_pool_wait = max_pool_wait
+        self.pool_wait = pool_wait
+        self.in_flight = 0
+
+    def reject_reason(self) -> Optional[str]:
+        """
+        Return why a new request should be shed, or None to admit it.
+        """
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return "in_flight"
+        if self.max_pool_wait and self.pool_wait() > self.max_pool_wait:
+            return "pool_wait"
+        return None
+
+def build_rate_limiter() -> Optional[RateLimiter]:
+    """
+    Build the rate limiter from environment configuration.
+
+    RATE_LIMIT_BACKEND selects ``none`` (default), ``memory`` (per worker,
+    so each worker allows the full rate) or ``redis`` (shared, uses REDIS_URL).
+    """
+    backend_name = os.getenv("RATE_LIMIT_BACKEND", "none").lower()
+    if backend_name == "memory":
+        return RateLimiter(InMemoryRateLimiter())
+    if backend_name == "redis":
+        import redis  # Optional dependency, only needed for the Redis backend
+
+        return RateLimiter(RedisRateLimiter(redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))))
+    if backend_name == "none":
+        return None
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend_name}")
+
+# Process-wide limiter (None when disabled) and shedder used by RateLimitMiddleware
+rate_limiter = build_rate_limiter()
+load_shedder = LoadShedder()
+
+metrics.registry.register(metrics.Gauge(
+    "http_requests_in_flight", "Requests being handled by this worker, excluding long-lived streams.",
+    callback=lambda: load_shedder.in_flight
+))
+
+def client_key(scope: dict) -> str:
+    """
+    Identify the client: its bearer token once this worker has verified it, else its address.
+
+    Runs before authentication, so an unverified token must not pick the
+    bucket: a client sending a new made-up token per request would get a
+    fresh bucket every time. A valid token is keyed by address until its
+    first request has been authenticated (see auth.verified_token_key).
+    """
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            key = auth.verified_token_key(token.strip()) if scheme.lower() == "bearer" else None
+            if key is not None:
+                return "token:" + key[:32]
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+def _match_route(scope: dict) -> Optional[Any]:
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route
+    return None
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying load shedding (503) and per-client rate limits (429).
+
+    Runs before routing, so rejected requests cost no database work. The
+    matched route is stored in the scope, so metrics and access logs label
+    rejected requests by route template too. If the shared backend is
+    unreachable, requests are allowed rather than failing.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        route = _match_route(scope)
+        path = getattr(route, "path", "unmatched")
+        if route is not None:
+            scope["route"] = route
+
+        shedder = load_shedder
+        reason = shedder.reject_reason()
+        if reason is not None:
+            SHED.inc(reason)
+            response = JSONResponse(
+                {"detail": "Server is overloaded, retry later."},
+                status_code=503, headers={"Retry-After": str(SHED_RETRY_AFTER)}
+            )
+            await response(scope, receive, send)
+            return
+
+        limiter = rate_limiter
+        if limiter is not None:
+            route_key = f"{scope['method']} {path}"
+            try:
+                if limiter.backend.blocking:
+                    retry_after = await run_in_threadpool(limiter.check, client_key(scope), route_key)
+                else:
+                    retry_after = limiter.check(client_key(scope), route_key)
+            except Exception as e:
+                logger.warning("Rate limit check failed, allowing request: %s", e)
+                retry_after = 0.0
+            if retry_after:
+                RATE_LIMITED.inc(path)
+                response = JSONResponse(
+                    {"detail": "Rate limit exceeded."},
+                    status_code=429, headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+                )
+                await response(scope, receive, send)
+                return
+
+        if path in LONG_LIVED_ROUTES:
+            await self.app(scope, receive, send)
+            return
+        shedder.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            shedder.in_flight -= 1
+
+# Exports:
+# - DEFAULT_LIMIT, ROUTE_LIMITS: rate limits per client and per route
+# - EXEMPT_PATHS, LONG_LIVED_ROUTES: paths skipped by limiting / in-flight counting
+# - SHED_MAX_IN_FLIGHT, SHED_POOL_WAIT_SECONDS, SHED_RETRY_AFTER: load shedding settings
+# - RATE_LIMITED, SHED: rejection counters
+# - RateLimitBackend: token bucket storage interface
+# - InMemoryRateLimiter / RedisRateLimiter: per-worker and shared backends
+# - GCRA_SCRIPT: Redis script for the shared backend
+# - RateLimiter: client-wide and per-route limits
+# - LoadShedder: in-flight and pool wait based shedding
+# - build_rate_limiter: build the limiter from environment configuration
+# - rate_limiter / load_shedder: process-wide instances
+# - client_key: identify the client of a request
+# - RateLimitMiddleware: ASGI rate limiting and load shedding middleware
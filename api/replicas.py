@@ -0,0 +1,310 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, List, Optional, Sequence, Union
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from . import cache, database, metrics, ratelimit
+
+logger = logging.getLogger("cloud-infra-api.replicas")
+
+# Seconds a failed or lagging replica is left out of rotation before it is tried again
+RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+
+# Replication lag (PostgreSQL) above which a replica is left out of rotation,
+# probed at most every DB_REPLICA_CHECK_SECONDS per replica and worker
+MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+CHECK_SECONDS = float(os.getenv("DB_REPLICA_CHECK_SECONDS", "5"))
+
+# After a successful write, the same client's reads go to the primary for this
+# long, so it reads its own writes; keep it above the expected replication lag
+STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "10"))
+
+# Requests recorded as writes for read-your-writes stickiness
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+# POST endpoints that only read (the body carries a long query), never recorded as writes
+READ_ONLY_PATHS = frozenset({"/products/batch"})
+
+# Zero once a standby has replayed all WAL it received (nothing to catch up on,
+# even if the primary has been idle), else the age of the last replayed
+# transaction; NULL on a server that is not a standby
+LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+READ_SESSIONS = metrics.registry.register(metrics.Counter(
+    "db_read_sessions_total",
+    "Sessions opened for read-only requests, by target (primary or replica name) and reason.",
+    ("target", "reason")
+))
+REPLICA_FAILURES = metrics.registry.register(metrics.Counter(
+    "db_replica_failures_total", "Replicas taken out of rotation, by replica and reason.", ("replica", "reason")
+))
+
+class ReplicaLagError(Exception):
+    """
+    Raised when a replica is too far behind the primary to serve reads.
+    """
+
+class Replica:
+    """
+    A read replica: its engines and health state.
+    """
+
+    def __init__(self, name: str, engine: Engine, async_engine: Optional[AsyncEngine] = None):
+        self.name = name
+        self.engine = engine
+        self.async_engine = async_engine
+        # Monotonic time until which the replica is out of rotation
+        self.down_until = 0.0
+        # Monotonic time of the last lag probe, None until the first one
+        self.checked_at: Optional[float] = None
+
+    def open(self) -> Session:
+        """
+        Open a sync session on the replica, configured like the primary's.
+        """
+        return database.SessionLocal(bind=self.engine, info={"replica": self.name})
+
+    def open_async(self) -> AsyncSession:
+        """
+        Open an async session on the replica, configured like the primary's.
+        """
+        return database.AsyncSessionLocal(bind=self.async_engine, info={"replica": self.name})
+
+class ReplicaRouter:
+    """
+    Chooses the database serving each read-only request.
+
+    Healthy replicas take turns (round robin). A replica whose connection
+    fails or whose lag exceeds the limit is skipped for ``retry_seconds``,
+    after which the next request tries it again; when no replica can serve,
+    reads fall back to the primary. Clients that wrote within
+    ``sticky_seconds`` read from the primary, so they see their own writes.
+    Writes are remembered in ``writes``, which must be a shared backend for
+    stickiness to hold across workers.
+    """
+
+    def __init__(
+        self,
+        replicas: Sequence[Replica],
+        writes: cache.CacheBackend,
+        retry_seconds: float = RETRY_SECONDS,
+        max_lag: float = MAX_LAG_SECONDS,
+        check_interval: float = CHECK_SECONDS,
+        sticky_seconds: float = STICKY_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.replicas = list(replicas)
+        self.writes = writes
+        self.retry_seconds = retry_seconds
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.sticky_seconds = sticky_seconds
+        self._clock = clock
+        self._turn = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def candidates(self) -> List[Replica]:
+        """
+        Replicas currently in rotation, starting with the one whose turn it is.
+
+        The rest follow in order, as fallbacks if the first cannot serve.
+        """
+        now = self._clock()
+        healthy = [replica for replica in self.replicas if replica.down_until <= now]
+        if not healthy:
+            return []
+        with self._lock:
+            start = self._turn % len(healthy)
+            self._turn += 1
+        return healthy[start:] + healthy[:start]
+
+    def mark_down(self, replica: Replica, reason: str) -> None:
+        """
+        Take a replica out of rotation for ``retry_seconds``.
+        """
+        replica.down_until = self._clock() + self.retry_seconds
+        REPLICA_FAILURES.inc(replica.name, reason)
+        logger.warning("Replica %s out of rotation for %ss: %s", replica.name, self.retry_seconds, reason)
+
+    def check(self, replica: Replica, connection: Connection) -> None:
+        """
+        Probe a replica's lag on a checked-out connection, when a probe is due.
+
+        Raises:
+            ReplicaLagError: If the replica is more than ``max_lag`` seconds behind.
+        """
+        now = self._clock()
+        if replica.checked_at is not None and now - replica.checked_at < self.check_interval:
+            return
+        replica.checked_at = now
+        if connection.dialect.name != "postgresql":
+            return
+        lag = connection.execute(LAG_QUERY).scalar()
+        if lag is not None and float(lag) > self.max_lag:
+            raise ReplicaLagError(f"replication lag {float(lag):.1f}s exceeds {self.max_lag}s")
+
+    def record_write(self, client: str) -> None:
+        """
+        Send the client's reads to the primary for the next ``sticky_seconds``.
+        """
+        self.writes.set(f"replica-sticky:{client}", 1, self.sticky_seconds)
+
+    def is_sticky(self, client: str) -> bool:
+        """
+        Whether the client wrote within the last ``sticky_seconds``.
+        """
+        return self.writes.get(f"replica-sticky:{client}") is not None
+
+    async def _writes_call(self, fn: Callable, client: str):
+        # Remote backends do network I/O; keep them off the event loop
+        if self.writes.blocking:
+            return await run_in_threadpool(fn, client)
+        return fn(client)
+
+    def _primary(self, reason: str) -> Session:
+        READ_SESSIONS.inc("primary", reason)
+        return database.SessionLocal()
+
+    def read_session(self, client: str) -> Session:
+        """
+        Open a sync session for a read-only request from ``client``.
+
+        Performs blocking I/O; call it from a worker thread.
+        """
+        if not self.enabled:
+            return database.SessionLocal()
+        if self.is_sticky(client):
+            return self._primary("sticky")
+        for replica in self.candidates():
+            db = replica.open()
+            try:
+                self.check(replica, db.connection())
+            except (SQLAlchemyError, ReplicaLagError) as e:
+                db.close()
+                self.mark_down(replica, type(e).__name__)
+                continue
+            READ_SESSIONS.inc(replica.name, "balanced")
+            return db
+        return self._primary("unavailable")
+
+    async def read_session_async(self, client: str) -> AsyncSession:
+        """
+        Async version of read_session, opening an AsyncSession.
+        """
+        if not self.enabled:
+            return database.AsyncSessionLocal()
+        if await self._writes_call(self.is_sticky, client):
+            READ_SESSIONS.inc("primary", "sticky")
+            return database.AsyncSessionLocal()
+        for replica in self.candidates():
+            db = replica.open_async()
+            try:
+                connection = await db.connection()
+                await connection.run_sync(lambda sync_connection: self.check(replica, sync_connection))
+            except (SQLAlchemyError, ReplicaLagError) as e:
+                await db.close()
+                self.mark_down(replica, type(e).__name__)
+                continue
+            READ_SESSIONS.inc(replica.name, "balanced")
+            return db
+        READ_SESSIONS.inc("primary", "unavailable")
+        return database.AsyncSessionLocal()
+
+    async def record_write_async(self, client: str) -> None:
+        """
+        Async version of record_write.
+        """
+        await self._writes_call(self.record_write, client)
+
+def is_replica(db: Union[Session, AsyncSession]) -> bool:
+    """
+    Whether a session reads from a replica, which may lag behind the primary.
+    """
+    return "replica" in db.info
+
+def build_router() -> ReplicaRouter:
+    """
+    Build the router over the replicas in DATABASE_REPLICA_URLS.
+
+    DB_REPLICA_STICKY_BACKEND selects where recent writers are remembered:
+    ``memory`` (default, per worker, so stickiness only holds when the
+    client's requests reach the same worker) or ``redis`` (shared, uses REDIS_URL).
+    """
+    replicas = [Replica(name, *engines) for name, engines in database.replica_engines.items()]
+    backend_name = os.getenv("DB_REPLICA_STICKY_BACKEND", "memory").lower()
+    if backend_name == "memory":
+        writes = cache.InMemoryCache(max_entries=int(os.getenv("DB_REPLICA_STICKY_MAX_CLIENTS", "100000")))
+    elif backend_name == "redis":
+        import redis  # Optional dependency, only needed for the Redis backend
+
+        writes = cache.RedisCache(redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0")))
+    else:
+        raise ValueError(f"Unknown DB_REPLICA_STICKY_BACKEND: {backend_name}")
+    return ReplicaRouter(replicas, writes)
+
+# Process-wide router used by the read session dependency and ReadYourWritesMiddleware
+router = build_router()
+
+metrics.registry.register(metrics.Gauge(
+    "db_replica_healthy", "Whether a read replica is in rotation (1) or skipped after a failure (0).", ("replica",),
+    lambda: {(replica.name, ): int(replica.down_until <= time.monotonic()) for replica in router.replicas}
+))
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware recording successful writes for read-your-writes stickiness.
+
+    The write is recorded before the response starts, so a client that waits
+    for the response can never read from a replica too early. Clients are
+    identified like rate limiting does (ratelimit.client_key). If the shared
+    backend is unreachable the write is not recorded rather than failing.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http" or scope["method"] not in WRITE_METHODS
+            or scope["path"] in READ_ONLY_PATHS or not router.enabled
+        ):
+            await self.app(scope, receive, send)
+            return
+        current = router
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                try:
+                    await current.record_write_async(ratelimit.client_key(scope))
+                except Exception:
+                    logger.exception("Recording write for read-your-writes failed")
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+# Exports:
+# - RETRY_SECONDS, MAX_LAG_SECONDS, CHECK_SECONDS, STICKY_SECONDS: routing settings
+# - WRITE_METHODS: request methods recorded as writes
+# - READ_ONLY_PATHS: POST paths that only read
+# - ReplicaLagError: replica too far behind to serve reads
+# - Replica: a read replica and its health state
+# - ReplicaRouter: health-aware round robin with read-your-writes stickiness
+# - is_replica: whether a session reads from a replica
+# - build_router: build the router from environment configuration
+# - router: process-wide ReplicaRouter
+# - ReadYourWritesMiddleware: record successful writes per client
@@ -1,7 +1,14 @@
 from datetime import datetime
-from typing import Optional
+from enum import Enum
+from typing import List, Optional, Union
 
-from pydantic import BaseModel, Field, constr
+from pydantic import BaseModel, Field, conlist, constr
+
+# Upper bound on items accepted by a single bulk request.
+MAX_BULK_ITEMS = 5000
+
+# Upper bound on IDs or names resolved by a single batch lookup.
+MAX_BATCH_ITEMS = 1000
 
 class ProductBase(BaseModel):
     """
@@ -22,6 +29,9 @@ class ProductUpdate(BaseModel):
     """
     name: Optional[constr(strip_whitespace=True, min_length=1, max_length=128)] = Field(None, example="Cloud Automation Suite")
     description: Optional[str] = Field(None, example="Updated description for the product.")
+    version: Optional[int] = Field(
+        None, example=3, description="Apply the update only if the product is still at this version."
+    )
 
 class Product(ProductBase):
     """
@@ -32,12 +42,176 @@ class Product(ProductBase):
     updated_at: datetime = Field(..., example="2024-06-01T12:30:00Z")
     created_by: str = Field(..., example="admin")
     updated_by: Optional[str] = Field(None, example="admin")
+    version: int = Field(..., example=3)
 
     class Config:
         orm_mode = True
 
+class ProductSort(str, Enum):
+    """
+    Sort orders for product listings; a leading ``-`` means descending.
+    """
+    id = "id"
+    id_desc = "-id"
+    updated_at = "updated_at"
+    updated_at_desc = "-updated_at"
+
+class ProductFilter(BaseModel):
+    """
+    Filters for product listings. Timestamps without a timezone are UTC.
+    """
+    created_by: Optional[str] = Field(None, example="admin")
+    updated_after: Optional[datetime] = Field(None, example="2024-06-01T00:00:00Z")
+    updated_before: Optional[datetime] = Field(None, example="2024-07-01T00:00:00Z")
+
+class ProductPage(BaseModel):
+    """
+    Cursor-paginated page of products.
+    """
+    items: List[Product]
+    next_cursor: Optional[str] = Field(None, example="eyJpZCI6MTAwfQ")
+
+class ProductSearchResult(Product):
+    """
+    Product matched by a search, with its relevance rank.
+    """
+    rank: float = Field(..., example=1.0607)
+
+class ProductSearchPage(BaseModel):
+    """
+    Cursor-paginated page of search results, best matches first.
+    """
+    items: List[ProductSearchResult]
+    next_cursor: Optional[str] = Field(None, example="eyJpZCI6NDIsInJhbmsiOiIxLjA2MDcifQ")
+
+class ProductBatchLookup(BaseModel):
+    """
+    Products to fetch in one request, by ID or by name (exactly one of the two).
+    """
+    ids: Optional[conlist(int, min_length=1, max_length=MAX_BATCH_ITEMS)] = Field(None, example=[3, 1, 2])
+    names: Optional[conlist(str, min_length=1, max_length=MAX_BATCH_ITEMS)] = Field(
+        None, example=["Cloud Automation Suite"]
+    )
+
+class ProductBatch(BaseModel):
+    """
+    Products found by a batch lookup, in request order with duplicates
+    returned once, and the requested IDs or names that do not exist.
+    """
+    items: List[Product]
+    missing: List[Union[int, str]] = Field(..., example=[42])
+
+class ProductBulkUpdateItem(ProductUpdate):
+    """
+    Update for a single product within a bulk update.
+    """
+    id: int = Field(..., example=1)
+
+class ProductBulkDelete(BaseModel):
+    """
+    IDs of products to delete in bulk.
+    """
+    ids: conlist(int, min_length=1, max_length=MAX_BULK_ITEMS) = Field(..., example=[1, 2, 3])
+
+class BulkStatus(str, Enum):
+    """
+    Outcome of a single item in a bulk operation.
+    """
+    created = "created"
+    updated = "updated"
+    deleted = "deleted"
+    conflict = "conflict"
+    not_found = "not_found"
+
+class BulkItemResult(BaseModel):
+    """
+    Result for one item of a bulk operation.
+    """
+    index: int = Field(..., example=0)
+    status: BulkStatus = Field(..., example="created")
+    id: Optional[int] = Field(None, example=1)
+    product: Optional[Product] = None
+    detail: Optional[str] = Field(None, example="Product with this name already exists.")
+
+    class Config:
+        orm_mode = True
+
+class BulkResult(BaseModel):
+    """
+    Per-item results of a bulk operation.
+    """
+    succeeded: int = Field(..., example=2)
+    failed: int = Field(..., example=1)
+    results: List[BulkItemResult]
+
+class ChangeOp(str, Enum):
+    """
+    Kind of change recorded in the product change log.
+    """
+    insert = "insert"
+    update = "update"
+    delete = "delete"
+
+class ProductChange(BaseModel):
+    """
+    One entry of the product change feed.
+    ``product`` is the product's current state, or null once it has been deleted.
+    """
+    seq: int = Field(..., example=1042)
+    op: ChangeOp = Field(..., example="update")
+    product_id: int = Field(..., example=1)
+    changed_at: datetime = Field(..., example="2024-06-01T12:30:00Z")
+    changed_by: Optional[str] = Field(None, example="admin")
+    product: Optional[Product] = None
+
+class ProductChangeFeed(BaseModel):
+    """
+    Page of the product change feed.
+    Pass ``next`` back as ``since`` to continue; it is returned even when the page is empty.
+    """
+    changes: List[ProductChange]
+    next: str = Field(..., example="eyJzZXEiOjEwNDIsInR4aWQiOjB9")
+    has_more: bool = Field(False, example=False)
+
+class ImportLineError(BaseModel):
+    """
+    Error for a single line of an import.
+    """
+    line: int = Field(..., example=3)
+    error: str = Field(..., example="name: String should have at least 1 character")
+
+class ImportSummary(BaseModel):
+    """
+    Job summary of a bulk import.
+    """
+    received: int = Field(..., example=1000)
+    valid: int = Field(..., example=998)
+    invalid: int = Field(..., example=2)
+    inserted: int = Field(..., example=990)
+    updated: int = Field(..., example=0)
+    skipped: int = Field(..., example=8)
+    errors: List[ImportLineError]
+    errors_truncated: bool = Field(False, example=False)
+
 # Exports:
 # - ProductBase: shared product properties
 # - ProductCreate: schema for product creation
 # - ProductUpdate: schema for product update
-# - Product: schema for product response
\ No newline at end of file
+# - Product: schema for product response
+# - ProductSort: sort orders for product listings
+# - ProductFilter: filters for product listings
+# - ProductPage: schema for a cursor-paginated product page
+# - ProductSearchResult: schema for a ranked search result
+# - ProductSearchPage: schema for a page of search results
+# - ProductBatchLookup: schema for a batch lookup by IDs or names
+# - ProductBatch: schema for a batch lookup response
+# - ProductBulkUpdateItem: schema for one item of a bulk update
+# - ProductBulkDelete: schema for a bulk delete request
+# - BulkStatus: per-item bulk outcome
+# - BulkItemResult: schema for one bulk item result
+# - BulkResult: schema for a bulk operation response
+# - ChangeOp: kind of change in the change log
+# - ProductChange: schema for one change feed entry
+# - ProductChangeFeed: schema for a page of the change feed
+# - ImportLineError: schema for a per-line import error
+# - ImportSummary: schema for an import job summary
\ No newline at end of file
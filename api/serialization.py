@@ -0,0 +1,70 @@
+from typing import Any, Iterable, List, Mapping, Optional, Sequence
+
+from fastapi.responses import ORJSONResponse
+
+def product_to_dict(product: Any) -> dict:
+    """
+    Serialize a product ORM instance into JSON-ready schemas.Product fields.
+
+    Equivalent to ``schemas.Product.model_validate(...).model_dump(mode="json")``
+    for rows read from the database, without building and validating a model.
+    The output is also what the product cache stores.
+
+    Args:
+        product (Any): models.Product instance, or any object with its attributes.
+
+    Returns:
+        dict: Product fields with timestamps as ISO 8601 strings.
+    """
+    return {
+        "name": product.name,
+        "description": product.description,
+        "id": product.id,
+        "created_at": product.created_at.isoformat(),
+        "updated_at": product.updated_at.isoformat(),
+        "created_by": product.created_by,
+        "updated_by": product.updated_by,
+        "version": product.version,
+    }
+
+def products_to_dicts(rows: Iterable[Sequence[Any]]) -> List[dict]:
+    """
+    Serialize crud.PRODUCT_COLUMNS rows into JSON-ready schemas.Product fields.
+
+    Rows are unpacked positionally; named attribute access on a Row costs
+    several times more per field.
+
+    Args:
+        rows (Iterable[Sequence[Any]]): Rows with crud.PRODUCT_COLUMNS, in that order.
+
+    Returns:
+        List[dict]: Product fields with timestamps as ISO 8601 strings.
+    """
+    return [
+        {
+            "name": name,
+            "description": description,
+            "id": product_id,
+            "created_at": created_at.isoformat(),
+            "updated_at": updated_at.isoformat(),
+            "created_by": created_by,
+            "updated_by": updated_by,
+            "version": version,
+        }
+        for product_id, name, description, created_at, updated_at, created_by, updated_by, version in rows
+    ]
+
+def json_response(content: Any, status_code: int = 200, headers: Optional[Mapping[str, str]] = None) -> ORJSONResponse:
+    """
+    Return already-serialized content as JSON encoded by orjson.
+
+    Returning a Response from an endpoint skips FastAPI's response_model
+    validation and jsonable_encoder pass; only use it for content built by
+    the serializers above, which already matches the declared schema.
+    """
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
+
+# Exports:
+# - product_to_dict: serialize a product without model validation
+# - products_to_dicts: serialize PRODUCT_COLUMNS rows
+# - json_response: orjson response for pre-serialized content
@@ -0,0 +1,31 @@
+import pytest
+
+from api import audit, auth, database, migrations, models
+from api.tests.helpers import LocalKeyServer
+
+@pytest.fixture(scope="session", autouse=True)
+def setup_database():
+    """
+    Migrate the test database before tests and drop its tables after.
+
+    The app no longer creates tables at startup; this is the migration step
+    a deploy runs before starting workers.
+    """
+    migrations.migrate(database.engine)
+    yield
+    # Write buffered audit events while their table still exists
+    audit.recorder.stop()
+    models.Base.metadata.drop_all(bind=database.engine)
+
+@pytest.fixture
+def issue_token(monkeypatch):
+    """
+    Verify bearer tokens against a local key server for one test.
+
+    Yields a function signing a token for a subject; the API accepts it as that user.
+    """
+    with LocalKeyServer() as server:
+        validator = auth.TokenValidator(auth.JWKSCache(server.url, min_refresh_interval=0), issuer=server.issuer)
+        monkeypatch.setattr(auth, "validator", validator)
+        yield server.issue
+        validator.jwks.stop()
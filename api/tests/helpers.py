@@ -0,0 +1,170 @@
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import jwt
+
+from api import ratelimit
+
+# Python equivalents of Lua scripts run through LocalRedis.register_script, keyed by script source
+LOCAL_SCRIPTS: Dict[str, Callable[["LocalRedis", List[str], List[Any]], Any]] = {}
+
+class LocalRedis:
+    """
+    In-process stand-in for the subset of the redis-py client used by
+    cache.RedisCache and ratelimit.RedisRateLimiter, for tests without a
+    Redis server.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._data: Dict[str, Tuple[Optional[float], bytes]] = {}
+        self._lock = threading.Lock()
+        self._expired = 0
+
+    def _live(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= self._clock():
+            del self._data[key]
+            self._expired += 1
+            return None
+        return value
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._live(key)
+
+    def mget(self, keys: Iterable[str]) -> List[Optional[bytes]]:
+        with self._lock:
+            return [self._live(key) for key in keys]
+
+    def set(self, key: str, value: Any, ex: Optional[int] = None, nx: bool = False) -> Optional[bool]:
+        with self._lock:
+            if nx and self._live(key) is not None:
+                return None
+            raw = value if isinstance(value, bytes) else str(value).encode("utf-8")
+            self._data[key] = (None if ex is None else self._clock() + ex, raw)
+            return True
+
+    def info(self, section: Optional[str] = None) -> Dict[str, Any]:
+        return {"evicted_keys": 0, "expired_keys": self._expired}
+
+    def register_script(self, script: str) -> Callable[..., Any]:
+        """
+        Return a callable running the LOCAL_SCRIPTS equivalent of ``script`` atomically.
+        """
+        run = LOCAL_SCRIPTS[script]
+
+        def call(keys: Iterable[str] = (), args: Iterable[Any] = ()) -> Any:
+            with self._lock:
+                return run(self, list(keys), list(args))
+        return call
+
+def _local_gcra(redis: LocalRedis, keys: List[str], args: List[Any]) -> bytes:
+    now = redis._clock()
+    retry_after, updates = 0.0, []
+    for index, key in enumerate(keys):
+        raw = redis._live(key)
+        wait, new_tat = ratelimit._gcra(
+            None if raw is None else float(raw), now, float(args[2 * index]), float(args[2 * index + 1])
+        )
+        retry_after = max(retry_after, wait)
+        updates.append((key, new_tat))
+    if not retry_after:
+        for key, new_tat in updates:
+            redis._data[key] = (new_tat, repr(new_tat).encode("utf-8"))
+    return repr(retry_after).encode("utf-8")
+
+LOCAL_SCRIPTS[ratelimit.GCRA_SCRIPT] = _local_gcra
+
+class LocalKeyServer:
+    """
+    Local stand-in for an identity provider: serves a JWKS over HTTP and issues RS256 tokens.
+
+    Usable as a context manager; ``url`` is the JWKS endpoint to set as AUTH_JWKS_URL.
+    """
+
+    def __init__(self, issuer: str = "http://localhost/local-idp"):
+        self.issuer = issuer
+        self.fetches = 0
+        self._keys: "OrderedDict[str, object]" = OrderedDict()
+        self.rotate()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.fetches += 1
+                body = json.dumps(server.jwks()).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/.well-known/jwks.json"
+
+    @property
+    def kid(self) -> str:
+        """
+        Id of the current signing key.
+        """
+        return next(reversed(self._keys))
+
+    def rotate(self, keep_previous: bool = True) -> str:
+        """
+        Add a new signing key, optionally dropping the others; returns its id.
+        """
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        if not keep_previous:
+            self._keys.clear()
+        kid = uuid.uuid4().hex
+        self._keys[kid] = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        return kid
+
+    def jwks(self) -> dict:
+        keys = []
+        for kid, private_key in self._keys.items():
+            jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+            keys.append({**jwk, "kid": kid, "use": "sig", "alg": "RS256"})
+        return {"keys": keys}
+
+    def issue(self, subject: str, ttl: float = 300, kid: Optional[str] = None, **claims) -> str:
+        """
+        Sign a token for ``subject`` expiring in ``ttl`` seconds.
+        """
+        kid = kid or self.kid
+        now = int(time.time())
+        payload = {"sub": subject, "iss": self.issuer, "iat": now, "exp": now + int(ttl), **claims}
+        return jwt.encode(payload, self._keys[kid], algorithm="RS256", headers={"kid": kid})
+
+    def start(self) -> "LocalKeyServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "LocalKeyServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
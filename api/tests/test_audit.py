@@ -0,0 +1,166 @@
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, func, select
+
+from api import audit, database, models
+from api.main import app
+
+def auth_headers(**extra):
+    return {"Authorization": "Bearer audit-tester", **extra}
+
+@pytest.fixture
+def unreachable_engine(tmp_path):
+    """
+    Provide an engine whose database cannot be opened, so every write fails.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'missing' / 'audit.db'}")
+    yield engine
+    engine.dispose()
+
+def audit_rows(product_id, after_id=0):
+    with database.SessionLocal() as db:
+        return db.scalars(
+            select(models.AuditEvent)
+            .where(models.AuditEvent.product_id == product_id, models.AuditEvent.id > after_id)
+            .order_by(models.AuditEvent.id)
+        ).all()
+
+def test_events_written_in_one_batch_by_size(tmp_path):
+    """
+    Test the background thread writes buffered events in one multi-row INSERT once flush_size are waiting.
+    """
+    recorder = audit.AuditRecorder(database.engine, flush_size=3, flush_interval=60, spool_dir=str(tmp_path))
+    inserts = []
+
+    def count_inserts(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO audit_events"):
+            inserts.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", count_inserts)
+    try:
+        recorder.start()
+        for product_id in (910001, 910002, 910003):
+            recorder.record("insert", product_id, "batcher", after={"id": product_id})
+        deadline = time.monotonic() + 5
+        while recorder.pending or not inserts:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        recorder.stop()
+    finally:
+        event.remove(database.engine, "before_cursor_execute", count_inserts)
+    assert len(inserts) == 1
+    assert [row.after for row in audit_rows(910002)] == [{"id": 910002}]
+
+def test_full_buffer_and_failed_flush_spool_then_replay(tmp_path, unreachable_engine):
+    """
+    Test events go to the spool when the buffer is full or the database is down, and are replayed later.
+    """
+    recorder = audit.AuditRecorder(unreachable_engine, flush_size=100, max_buffer=2, spool_dir=str(tmp_path))
+    for product_id in (920001, 920002, 920003):
+        recorder.record("delete", product_id, "spooler", before={"id": product_id})
+    # The third event found the buffer full and took the buffer with it to disk
+    assert recorder.pending == 0
+    recorder.record("delete", 920004, "spooler")
+    assert recorder.flush() == 0
+    [name] = os.listdir(tmp_path)
+    assert name.startswith(f"audit-{os.getpid()}-") and name.endswith(".ndjson")
+    assert audit_rows(920001) == []
+
+    recorder.engine = database.engine
+    recorder.flush()
+    assert os.listdir(tmp_path) == []
+    assert [row.before for row in audit_rows(920003)] == [{"id": 920003}]
+    assert len(audit_rows(920004)) == 1
+
+def test_stop_spools_for_the_next_process(tmp_path, unreachable_engine):
+    """
+    Test events still buffered at shutdown survive an unreachable database and are replayed by a new recorder.
+    """
+    recorder = audit.AuditRecorder(unreachable_engine, flush_interval=60, spool_dir=str(tmp_path))
+    recorder.start()
+    recorder.record("update", 930001, "stopper", before={"version": 1}, after={"version": 2})
+    recorder.stop()
+    assert len(os.listdir(tmp_path)) == 1
+
+    successor = audit.AuditRecorder(database.engine, spool_dir=str(tmp_path))
+    assert successor.replay_spool() == 1
+    [row] = audit_rows(930001)
+    assert (row.action, row.actor, row.before, row.after) == ("update", "stopper", {"version": 1}, {"version": 2})
+
+def test_spool_files_of_live_processes_left_alone(tmp_path, unreachable_engine):
+    """
+    Test a recorder leaves spool files alone while their writer holds them, whatever their names,
+    and replays them once it has stopped.
+    """
+    writer = audit.AuditRecorder(unreachable_engine, spool_dir=str(tmp_path))
+    writer.record("delete", 940001, "other-container")
+    writer.flush()
+    # Another container's process may have this process's pid
+    [name] = os.listdir(tmp_path)
+    os.rename(tmp_path / name, tmp_path / f"audit-{os.getpid()}-elsewhere.ndjson")
+    (tmp_path / "notes.txt").write_text("not a spool file")
+
+    recorder = audit.AuditRecorder(database.engine, spool_dir=str(tmp_path))
+    assert recorder.replay_spool() == 0
+    assert len(os.listdir(tmp_path)) == 2
+
+    writer.stop()
+    assert recorder.replay_spool() == 1
+    assert os.listdir(tmp_path) == ["notes.txt"]
+    assert len(audit_rows(940001)) == 1
+
+def test_product_writes_audited_with_snapshots():
+    """
+    Test create, update and delete record before/after snapshots, the actor and the request id.
+    """
+    with TestClient(app) as client:
+        created = client.post("/products/", json={"name": "Audited", "description": "v1"}, headers=auth_headers()).json()
+        product_id = created["id"]
+        updated = client.put(
+            f"/products/{product_id}", json={"description": "v2"}, headers=auth_headers(**{"X-Request-ID": "audit-put"})
+        ).json()
+        client.delete(f"/products/{product_id}", headers=auth_headers())
+    # Shutdown flushed the buffer
+
+    insert, update, delete = audit_rows(product_id)
+    assert (insert.action, insert.before, insert.after) == ("insert", None, created)
+    assert (update.before, update.after) == (created, updated)
+    assert update.request_id == "audit-put"
+    assert (delete.action, delete.before, delete.after) == ("delete", updated, None)
+    assert {insert.actor, update.actor, delete.actor} == {"demo-user"}
+
+def test_bulk_writes_and_imports_audited():
+    """
+    Test bulk create, update and delete and an upsert import record one event per product with snapshots.
+    """
+    # SQLite reuses the IDs of deleted products; skip events of earlier tests
+    with database.SessionLocal() as db:
+        last_id = db.scalar(select(func.max(models.AuditEvent.id))) or 0
+    with TestClient(app) as client:
+        created = client.post(
+            "/products/bulk", json=[{"name": "Audited bulk 1"}, {"name": "Audited bulk 2"}], headers=auth_headers()
+        ).json()["results"]
+        first, second = (item["id"] for item in created)
+        updated = client.patch(
+            "/products/bulk", json=[{"id": first, "description": "patched"}], headers=auth_headers()
+        ).json()["results"][0]["product"]
+        body = '{"name": "Audited bulk 2", "description": "imported"}\n{"name": "Audited import"}\n'
+        client.post(
+            "/products/import", params={"format": "ndjson", "on_conflict": "upsert"}, content=body, headers=auth_headers()
+        )
+        imported = {p["name"]: p for p in client.post(
+            "/products/batch", json={"names": ["Audited bulk 2", "Audited import"]}, headers=auth_headers()
+        ).json()["items"]}
+        client.request("DELETE", "/products/bulk", json={"ids": [first]}, headers=auth_headers())
+
+    insert, update, delete = audit_rows(first, last_id)
+    assert (insert.action, insert.before, insert.after) == ("insert", None, created[0]["product"])
+    assert (update.action, update.before, update.after) == ("update", created[0]["product"], updated)
+    assert (delete.action, delete.before, delete.after) == ("delete", updated, None)
+    insert, upsert = audit_rows(second, last_id)
+    assert (upsert.action, upsert.before, upsert.after) == ("update", created[1]["product"], imported["Audited bulk 2"])
+    [new] = audit_rows(imported["Audited import"]["id"], last_id)
+    assert (new.action, new.before, new.after) == ("insert", None, imported["Audited import"])
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import auth
+from api.main import app
+from api.tests.helpers import LocalKeyServer
+
+@pytest.fixture(scope="module")
+def key_server():
+    with LocalKeyServer() as server:
+        yield server
+
+def _validator(server: LocalKeyServer, **kwargs) -> auth.TokenValidator:
+    return auth.TokenValidator(auth.JWKSCache(server.url, min_refresh_interval=0), issuer=server.issuer, **kwargs)
+
+def test_verified_tokens_are_cached(key_server):
+    """
+    Test a repeated token is served from the cache without another key fetch or signature check.
+    """
+    validator = _validator(key_server)
+    token = key_server.issue("alice")
+    fetches = key_server.fetches
+    verified = auth.AUTH_TOKENS.value("verified")
+    cached = auth.AUTH_TOKENS.value("cached")
+
+    async def run():
+        first = await validator.validate(token)
+        second = await validator.validate(token)
+        validator.jwks.stop()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first["sub"] == second["sub"] == "alice"
+    assert key_server.fetches == fetches + 1
+    assert auth.AUTH_TOKENS.value("verified") == verified + 1
+    assert auth.AUTH_TOKENS.value("cached") == cached + 1
+    assert len(validator.cache) == 1
+
+def test_invalid_tokens_are_rejected(key_server):
+    """
+    Test expired, wrong-issuer, tampered and unknown-key tokens are rejected.
+    """
+    validator = _validator(key_server)
+    other = LocalKeyServer()
+    tampered = key_server.issue("alice")[:-4] + "AAAA"
+    tokens = [
+        key_server.issue("alice", ttl=-120),
+        key_server.issue("alice", iss="https://elsewhere"),
+        tampered,
+        other.issue("alice"),
+        "not-a-jwt",
+    ]
+
+    async def run():
+        for token in tokens:
+            with pytest.raises(auth.InvalidTokenError):
+                await validator.validate(token)
+        validator.jwks.stop()
+
+    asyncio.run(run())
+    assert len(validator.cache) == 0
+
+def test_key_rotation_refreshes_and_revokes(key_server):
+    """
+    Test a new key id triggers a refresh, and tokens signed by a removed key leave the cache.
+    """
+    validator = _validator(key_server)
+    old_token = key_server.issue("alice")
+
+    async def run():
+        await validator.validate(old_token)
+        key_server.rotate(keep_previous=False)
+        await validator.validate(key_server.issue("bob"))
+        validator.jwks.stop()
+
+    asyncio.run(run())
+    assert validator.cache.get(auth.TokenCache.key(old_token)) is None
+    assert len(validator.cache) == 1
+
+def test_token_cache_expiry_and_lru():
+    """
+    Test cached claims expire at exp and the least recently used entry is evicted first.
+    """
+    cache = auth.TokenCache(max_entries=2)
+    cache.set("a", {"exp": 100}, "k1")
+    cache.set("b", {"exp": 200}, "k1")
+    assert cache.get("a", now=50) == {"exp": 100}
+    cache.set("c", {"exp": 300}, "k2")
+    assert cache.get("b", now=50) is None
+    assert cache.get("a", now=100) is None
+    cache.discard_keys(["k2"])
+    assert len(cache) == 0
+
+def test_endpoints_authenticate_with_jwks(key_server, monkeypatch):
+    """
+    Test endpoints accept tokens signed by the key server, record the subject and reject bad tokens.
+    """
+    monkeypatch.setattr(auth, "validator", _validator(key_server))
+    with TestClient(app) as client:
+        token = key_server.issue("carol")
+        response = client.post(
+            "/products/", json={"name": "Signed product"}, headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 201
+        assert response.json()["created_by"] == "carol"
+        client.delete(f"/products/{response.json()['id']}", headers={"Authorization": f"Bearer {token}"})
+
+        response = client.get("/products/", headers={"Authorization": "Bearer not-a-jwt"})
+        assert response.status_code == 401
+        assert "invalid_token" in response.headers["WWW-Authenticate"]
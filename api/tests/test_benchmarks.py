@@ -0,0 +1,39 @@
+import asyncio
+
+from api.benchmarks import load
+
+def _results(**scenarios) -> dict:
+    return {"meta": {}, "scenarios": {
+        name: {"requests": 100, "errors": 0, **metrics} for name, metrics in scenarios.items()
+    }}
+
+def test_compare_flags_regressions_past_threshold():
+    """
+    Test latency increases and throughput drops beyond the threshold are reported, others pass.
+    """
+    baseline = _results(get_product={"p95_ms": 10.0, "throughput_rps": 400.0}, search={"p95_ms": 50.0, "throughput_rps": 40.0})
+    current = _results(get_product={"p95_ms": 11.0, "throughput_rps": 250.0}, search={"p95_ms": 80.0, "throughput_rps": 60.0})
+    problems = load.compare(current, baseline, {"p95_ms": 0.25, "throughput_rps": 0.25})
+    assert len(problems) == 2
+    assert problems[0].startswith("get_product: throughput_rps")
+    assert problems[1].startswith("search: p95_ms")
+    assert load.compare(current, baseline, {"p95_ms": 1.0, "throughput_rps": 0.5}) == []
+
+def test_compare_fails_on_errors_and_skips_new_scenarios():
+    """
+    Test failed requests always fail the comparison and scenarios missing from the baseline are skipped.
+    """
+    current = _results(health={"p95_ms": 1.0})
+    current["scenarios"]["health"]["errors"] = 3
+    assert load.compare(current, _results(), load.DEFAULT_THRESHOLDS) == ["health: 3 of 100 requests failed"]
+
+def test_load_suite_drives_every_scenario():
+    """
+    Test a small in-process run exercises every scenario without errors.
+    """
+    results = asyncio.run(load.run_suite(rows=20, requests=2, concurrency=2))
+    assert set(results["scenarios"]) == {scenario.name for scenario in load.SCENARIOS}
+    for name, result in results["scenarios"].items():
+        assert result["requests"] == 2, name
+        assert result["errors"] == 0, name
+        assert result["p50_ms"] <= result["p99_ms"]
@@ -0,0 +1,97 @@
+import pytest
+
+from api.cache import InMemoryCache, ProductCache, RedisCache
+from api.tests.helpers import LocalRedis
+
+class FakeClock:
+    """
+    Manually advanced clock for TTL tests.
+    """
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture(params=["memory", "redis"])
+def backend_and_clock(request):
+    """
+    Provide each cache backend with a controllable clock.
+    """
+    clock = FakeClock()
+    if request.param == "memory":
+        return InMemoryCache(max_entries=100, clock=clock), clock
+    return RedisCache(LocalRedis(clock=clock)), clock
+
+def test_backend_ttl_expiry(backend_and_clock):
+    """
+    Test entries expire after their TTL.
+    """
+    backend, clock = backend_and_clock
+    backend.set("k", {"v": 1}, ttl=10)
+    assert backend.get("k") == {"v": 1}
+    clock.now = 11
+    assert backend.get("k") is None
+
+def test_backend_add_keeps_existing(backend_and_clock):
+    """
+    Test add only stores a value when the key is absent.
+    """
+    backend, _ = backend_and_clock
+    assert backend.add("k", "first", ttl=10) == "first"
+    assert backend.add("k", "second", ttl=10) == "first"
+
+def test_backend_get_many(backend_and_clock):
+    """
+    Test get_many returns values in key order, with None for absent keys.
+    """
+    backend, _ = backend_and_clock
+    backend.set("a", 1, ttl=10)
+    backend.set("c", {"v": 3}, ttl=10)
+    assert backend.get_many(["c", "b", "a"]) == [{"v": 3}, None, 1]
+    assert backend.get_many([]) == []
+
+def test_in_memory_lru_eviction():
+    """
+    Test the least recently used entry is evicted and counted.
+    """
+    backend = InMemoryCache(max_entries=2)
+    backend.set("a", 1, ttl=60)
+    backend.set("b", 2, ttl=60)
+    backend.get("a")
+    backend.set("c", 3, ttl=60)
+    assert backend.get("b") is None
+    assert backend.get("a") == 1
+    assert backend.stats()["evictions"] == 1
+
+def test_product_cache_invalidation(backend_and_clock):
+    """
+    Test writes invalidate the product and list pages, and counters are tracked.
+    """
+    backend, _ = backend_and_clock
+    product_cache = ProductCache(backend, ttl=60)
+
+    key, value = product_cache.get_product(1)
+    assert value is None
+    product_cache.store(key, {"id": 1, "name": "Old"})
+    page_key, _ = product_cache.get_page("after", None, 10)
+    product_cache.store(page_key, [{"id": 1, "name": "Old"}])
+    assert product_cache.get_product(1)[1] == {"id": 1, "name": "Old"}
+
+    product_cache.invalidate_product(1)
+    assert product_cache.get_product(1)[1] is None
+    assert product_cache.get_page("after", None, 10)[1] is None
+
+    stats = product_cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
+
+def test_product_cache_ignores_stale_store_after_write():
+    """
+    Test a value loaded before a concurrent write is never served afterwards.
+    """
+    product_cache = ProductCache(InMemoryCache(), ttl=60)
+    key, _ = product_cache.get_product(1)
+    product_cache.invalidate_product(1)  # write commits while the reader is loading
+    product_cache.store(key, {"id": 1, "name": "Stale"})
+    assert product_cache.get_product(1)[1] is None
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import zlib
+
+import brotli
+import pytest
+import zstandard
+from fastapi.testclient import TestClient
+from starlette.responses import StreamingResponse
+
+from api import compression
+from api.main import app
+
+DECODERS = {
+    "gzip": lambda: zlib.decompressobj(16 + zlib.MAX_WBITS).decompress,
+    "br": lambda: brotli.Decompressor().process,
+    "zstd": lambda: zstandard.ZstdDecompressor().decompressobj().decompress,
+}
+
+def auth_headers(**extra):
+    return {"Authorization": "Bearer testtoken", **extra}
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br, zstd", "zstd"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br, zstd;q=0", "br"),
+    ("*", "zstd"),
+    ("*;q=0.1, gzip", "gzip"),
+    ("identity", None),
+    ("", None),
+    ("gzip;q=0", None),
+])
+def test_negotiate(header, expected):
+    """
+    Test the highest q-value wins, ties follow server preference, and q=0 excludes.
+    """
+    assert compression.negotiate(header, ("zstd", "br", "gzip")) == expected
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_large_responses_compressed(encoding):
+    """
+    Test list pages above the threshold are compressed and decode to the same JSON.
+    """
+    with TestClient(app) as client:
+        client.post("/products/bulk", json=[{"name": f"Compress {encoding} {i}", "description": "x" * 50} for i in range(30)], headers=auth_headers())
+        plain = client.get("/products/?limit=100", headers=auth_headers(**{"Accept-Encoding": "identity"}))
+        assert "content-encoding" not in plain.headers
+        with client.stream("GET", "/products/?limit=100", headers=auth_headers(**{"Accept-Encoding": encoding})) as response:
+            raw = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(raw) < len(plain.content)
+    assert json.loads(DECODERS[encoding]()(raw)) == plain.json()
+
+def test_small_responses_not_compressed():
+    """
+    Test responses below the size threshold are sent as is.
+    """
+    with TestClient(app) as client:
+        response = client.get("/health", headers={"Accept-Encoding": "gzip, br, zstd"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_streaming_compressed_incrementally(encoding):
+    """
+    Test each streamed chunk is compressed and decodable as soon as it is sent.
+    """
+    chunks = [json.dumps({"line": i, "pad": "y" * 200}).encode() + b"\n" for i in range(5)]
+
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    inner = StreamingResponse(stream(), media_type="application/x-ndjson")
+    middleware = compression.CompressionMiddleware(inner, min_size=1024)
+    scope = {"type": "http", "method": "GET", "headers": [(b"accept-encoding", encoding.encode())]}
+    sent = []
+
+    async def receive():
+        # No disconnect; StreamingResponse cancels this wait once the body is sent
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    headers = dict(sent[0]["headers"])
+    assert headers[b"content-encoding"] == encoding.encode()
+    assert b"content-length" not in headers
+    decode = DECODERS[encoding]()
+    bodies = [m for m in sent[1:] if m.get("more_body")]
+    # Every chunk decodes to exactly what was produced, without waiting for the end of the stream
+    assert [decode(m["body"]) for m in bodies] == chunks
+    assert sent[-1]["more_body"] is False
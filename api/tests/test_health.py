@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import OperationalError
+
+from api import database, health, migrations, models
+from api.main import app
+
+class FakeClock:
+    """
+    Manually advanced clock for the readiness cache.
+    """
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class CountingPing:
+    """
+    Database ping stand-in counting calls, optionally failing or slow.
+    """
+    def __init__(self, error=None, delay=0.0):
+        self.calls = 0
+        self.error = error
+        self.delay = delay
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+
+def test_ready_after_startup_with_phase_timings():
+    """
+    Test /ready answers 200 once startup has run, and each startup phase is timed.
+    """
+    with TestClient(app) as client:
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json() == {"status": "ready"}
+        scraped = client.get("/metrics").text
+    assert set(health.STARTUP_PHASES) >= {"import", "app_build", "pool_warm", "total"}
+    assert 'app_startup_phase_seconds{phase="pool_warm"}' in scraped
+
+def test_probe_cached_and_shared_by_concurrent_callers():
+    """
+    Test concurrent checks share one probe and results are reused until they expire.
+    """
+    clock = FakeClock()
+    ping = CountingPing(delay=0.01)
+    probe = health.ReadinessProbe(ping, cache_seconds=2, clock=clock)
+    probe.started = True
+
+    async def scenario():
+        results = await asyncio.gather(*(probe.check() for _ in range(10)))
+        assert results == [(True, "ok")] * 10
+        assert ping.calls == 1
+        clock.now += 1.9
+        await probe.check()
+        assert ping.calls == 1
+        clock.now += 0.1
+        await probe.check()
+        assert ping.calls == 2
+
+    asyncio.run(scenario())
+
+def test_probe_not_ready_when_starting_failing_or_slow():
+    """
+    Test the probe reports why it is not ready: startup unfinished, a failed ping, or a timeout.
+    """
+    async def scenario():
+        probe = health.ReadinessProbe(CountingPing())
+        assert await probe.check() == (False, "starting")
+        failing = health.ReadinessProbe(CountingPing(error=OperationalError("SELECT 1", {}, Exception("down"))))
+        failing.started = True
+        assert await failing.check() == (False, "OperationalError")
+        slow = health.ReadinessProbe(CountingPing(delay=1), timeout=0.01)
+        slow.started = True
+        assert await slow.check() == (False, "TimeoutError")
+
+    asyncio.run(scenario())
+
+def test_ready_503_when_database_unreachable(monkeypatch):
+    """
+    Test /ready fails with 503 and Retry-After while /health stays 200.
+    """
+    with TestClient(app) as client:
+        probe = health.ReadinessProbe(CountingPing(error=OperationalError("SELECT 1", {}, Exception("down"))))
+        probe.started = True
+        monkeypatch.setattr(health, "readiness", probe)
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json() == {"status": "unavailable", "detail": "OperationalError"}
+        assert "retry-after" in response.headers
+        assert client.get("/health").status_code == 200
+
+def test_warm_pool_leaves_idle_connections(tmp_path):
+    """
+    Test warmup opens connections up to the pool size and returns them idle.
+    """
+    url = f"sqlite:///{tmp_path / 'warm.db'}"
+    engine = create_engine(url, **database.pool_options(url))
+    try:
+        assert health.warm_pool(engine, connections=3) == 3
+        assert engine.pool.checkedin() == 3
+        assert health.warm_pool(engine, connections=engine.pool.size() + 5) == engine.pool.size()
+    finally:
+        engine.dispose()
+
+def test_startup_checks_schema_off_the_event_loop(monkeypatch):
+    """
+    Test the startup schema check runs outside the event loop.
+    """
+    calls = []
+
+    def check_schema(engine):
+        try:
+            asyncio.get_running_loop()
+            calls.append("event loop")
+        except RuntimeError:
+            calls.append("thread")
+
+    monkeypatch.setattr(migrations, "check_schema", check_schema)
+    with TestClient(app):
+        pass
+    assert calls == ["thread"]
+
+def test_migrate_creates_and_upgrades_schema(tmp_path):
+    """
+    Test startup refuses an old schema, and migrations create missing tables, add columns and indexes
+    older databases lack, and are idempotent.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    try:
+        with engine.begin() as connection:
+            # products as created before the version column existed
+            connection.execute(text(
+                "CREATE TABLE products (id INTEGER PRIMARY KEY, name VARCHAR(128) NOT NULL UNIQUE, description TEXT, "
+                "created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL, created_by VARCHAR(64) NOT NULL, "
+                "updated_by VARCHAR(64))"
+            ))
+            connection.execute(text(
+                "INSERT INTO products (name, created_at, updated_at, created_by) VALUES ('old', '2024-01-01', '2024-01-01', 'x')"
+            ))
+        with pytest.raises(migrations.SchemaOutdatedError, match="products.version"):
+            migrations.check_schema(engine)
+        applied = migrations.migrate(engine)
+        assert "add column products.version" in applied
+        assert "create table audit_events" in applied
+        assert "create table products" not in applied
+        assert {"create index ix_products_updated_at_id", "create index ix_products_created_by_id"} <= set(applied)
+        indexes = {index["name"] for index in inspect(engine).get_indexes("products")}
+        assert {"ix_products_updated_at_id", "ix_products_created_by_id"} <= indexes
+        assert set(inspect(engine).get_table_names()) == set(models.Base.metadata.tables)
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT version FROM products")).scalar() == 1
+        assert migrations.migrate(engine) == []
+        migrations.check_schema(engine)
+    finally:
+        engine.dispose()
@@ -0,0 +1,79 @@
+import json
+import logging
+import queue
+
+from fastapi.testclient import TestClient
+
+from api import log
+from api.main import app
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.addFilter(log.ContextFilter(sample_rate=1.0))
+
+    def emit(self, record):
+        self.records.append(record)
+
+def test_json_formatter_includes_extra_fields():
+    """
+    Test records format as one JSON object with level, message and extra fields.
+    """
+    record = logging.LogRecord("cloud-infra-api", logging.INFO, __file__, 1, "Product %s", (7,), None)
+    record.request_id = "abc"
+    record.status = 200
+    entry = json.loads(log.JsonFormatter().format(record))
+    assert entry["level"] == "INFO"
+    assert entry["message"] == "Product 7"
+    assert entry["request_id"] == "abc"
+    assert entry["status"] == 200
+
+def test_queue_handler_drops_when_full():
+    """
+    Test a full log queue drops records and counts them instead of blocking.
+    """
+    handler = log.DroppingQueueHandler(queue.Queue(maxsize=1))
+    before = log.LOG_RECORDS_DROPPED.value()
+    for _ in range(3):
+        handler.handle(logging.LogRecord("test", logging.INFO, __file__, 1, "line", (), None))
+    assert handler.queue.qsize() == 1
+    assert log.LOG_RECORDS_DROPPED.value() == before + 2
+
+def test_sampling_keeps_warnings_and_whole_requests():
+    """
+    Test sampled-out requests lose INFO records but keep warnings, and the decision is per request id.
+    """
+    request_ids = [f"req-{i}" for i in range(1000)]
+    kept = [rid for rid in request_ids if log.is_sampled(rid, 0.1)]
+    assert 50 < len(kept) < 150
+    assert kept == [rid for rid in request_ids if log.is_sampled(rid, 0.1)]
+
+    dropped = next(rid for rid in request_ids if rid not in kept)
+    token = log._request_context.set(log.RequestContext(dropped, {}, sampled=False))
+    try:
+        context_filter = log.ContextFilter(sample_rate=0.1)
+        assert not context_filter.filter(logging.LogRecord("t", logging.INFO, __file__, 1, "x", (), None))
+        assert context_filter.filter(logging.LogRecord("t", logging.WARNING, __file__, 1, "x", (), None))
+    finally:
+        log._request_context.reset(token)
+
+def test_access_record_carries_request_context():
+    """
+    Test each request gets an echoed request id and an access record with route, status, latency and user.
+    """
+    handler = ListHandler()
+    log.access_logger.addHandler(handler)
+    try:
+        with TestClient(app) as client:
+            response = client.get("/products/999999", headers={"Authorization": "Bearer token", "X-Request-ID": "trace-1"})
+    finally:
+        log.access_logger.removeHandler(handler)
+    assert response.status_code == 404
+    assert response.headers["X-Request-ID"] == "trace-1"
+    record = next(r for r in handler.records if r.status == 404)
+    assert record.request_id == "trace-1"
+    assert record.route == "/products/{product_id}"
+    assert record.status == 404
+    assert record.user == "demo-user"
+    assert record.latency_ms > 0
@@ -0,0 +1,57 @@
+from sqlalchemy.pool import NullPool
+
+from api import database
+from api.metrics import Counter, Gauge, Histogram, Registry
+
+def test_histogram_renders_cumulative_buckets():
+    """
+    Test histogram buckets are cumulative and include +Inf, sum and count.
+    """
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.1, "/a")
+    histogram.observe(5.0, "/a")
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+    assert 'latency_seconds_sum{route="/a"} 5.15' in lines
+
+def test_registry_renders_counters_with_escaped_labels():
+    """
+    Test counters render with HELP/TYPE headers and escaped label values.
+    """
+    registry = Registry()
+    counter = registry.register(Counter("requests_total", "Requests.", ("path",)))
+    counter.inc('/a"b')
+    counter.inc('/a"b', amount=2)
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{path="/a\\"b"} 3' in text
+
+def test_gauge_renders_labelled_callback_values():
+    """
+    Test labelled gauges render one sample per label set from the callback.
+    """
+    gauge = Gauge("pool_checked_out", "Checked out.", ("engine",), lambda: {("sync",): 3, ("async",): 1})
+    lines = gauge.render()
+    assert 'pool_checked_out{engine="async"} 1' in lines
+    assert 'pool_checked_out{engine="sync"} 3' in lines
+
+def test_pool_options_modes(monkeypatch):
+    """
+    Test pool options for the queue pool and external pooler modes.
+    """
+    monkeypatch.setattr(database, "POOL_SIZE", 3)
+    options = database.pool_options("postgresql://u:p@db/app")
+    assert options["poolclass"] is database.TimedQueuePool
+    assert options["pool_size"] == 3
+
+    monkeypatch.setattr(database, "EXTERNAL_POOLER", True)
+    options = database.pool_options("postgresql+asyncpg://u:p@db/app", is_async=True)
+    assert options["poolclass"] is NullPool
+    assert options["connect_args"]["statement_cache_size"] == 0
+    name_func = options["connect_args"]["prepared_statement_name_func"]
+    assert name_func() != name_func()
+    assert "pool_size" not in options
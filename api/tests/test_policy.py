@@ -0,0 +1,78 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from api import policy
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "policy")
+REGO = os.path.join(os.path.dirname(__file__), "..", "..", "iac", "terraform", "policies.rego")
+PLANS = ("platform", "edge_cases")
+
+def expected(name):
+    with open(os.path.join(FIXTURES, f"{name}.deny.json")) as f:
+        return [tuple(item) for item in json.load(f)]
+
+def check(name, **kwargs):
+    with open(os.path.join(FIXTURES, f"{name}.json"), "rb") as stream:
+        return policy.check_plan(stream, **kwargs)
+
+@pytest.mark.parametrize("name", PLANS)
+def test_fixture_plans_match_expected_deny_messages(name):
+    """
+    Test each fixture plan produces exactly its recorded deny messages, in plan order.
+    """
+    _, violations = check(name, workers=1)
+    assert [(v.address, v.message) for v in violations] == expected(name)
+
+@pytest.mark.parametrize("name", PLANS)
+def test_streaming_fallback_and_process_pool_agree(monkeypatch, name):
+    """
+    Test the whole-document parser and sharded pool evaluation give the same result as streaming in process.
+    """
+    _, streamed = check(name, workers=1)
+    _, pooled = check(name, workers=2, shard_size=1)
+    monkeypatch.setattr(policy, "ijson", None)
+    _, loaded = check(name, workers=1)
+    assert streamed == pooled == loaded
+
+def test_rules_dispatched_by_resource_type():
+    """
+    Test type-specific rules only apply to their type and the tag rule applies to all.
+    """
+    assert [rule.name for rule in policy.rules_for("aws_db_instance")] == ["rds_encryption", "rds_public_access", "project_tag"]
+    assert [rule.name for rule in policy.rules_for("aws_vpc")] == ["project_tag"]
+    assert policy.evaluate_resource("aws_vpc", {"storage_encrypted": False, "identifier": "x", "tags": {"Project": "p"}}) == []
+
+@pytest.mark.skipif(shutil.which("opa") is None, reason="opa is not installed")
+@pytest.mark.parametrize("name", PLANS)
+def test_fixture_plans_match_opa(name):
+    """
+    Test the Python rules agree with policies.rego evaluated by OPA, resource by resource.
+    """
+    with open(os.path.join(FIXTURES, f"{name}.json")) as f:
+        changes = json.load(f)["resource_changes"]
+    for change in changes:
+        after = change["change"]["after"]
+        if change["mode"] != "managed" or after is None:
+            continue
+        result = subprocess.run(
+            ["opa", "eval", "--format", "json", "--stdin-input", "-d", REGO, "data.terraform.security.deny"],
+            input=json.dumps({"resource_type": change["type"], "resource": after}),
+            capture_output=True, text=True, check=True
+        )
+        opa_messages = sorted(json.loads(result.stdout)["result"][0]["expressions"][0]["value"])
+        assert policy.evaluate_resource(change["type"], after) == opa_messages, change["address"]
+
+def test_cli_exit_status_and_output(capsys):
+    """
+    Test the CLI prints one line per violation and exits 1 only when something is denied.
+    """
+    assert policy.main([os.path.join(FIXTURES, "platform.json")]) == 1
+    out = capsys.readouterr()
+    assert out.out == (
+        "DENY aws_instance.api_server: API server 'dev-api-server' must have AuditLogEnabled tag for compliance.\n"
+    )
+    assert "Checked 8 resources: 1 violations." in out.err
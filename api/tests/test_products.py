@@ -1,23 +1,22 @@
+import asyncio
+import csv
+import io
+import json
 import os
+from datetime import datetime, timedelta
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 from api.main import app
-from api.database import SessionLocal, engine
-from api import models
+from api import database
+from api.database import ASYNC_DATABASE_URL, SessionLocal, engine
+from api import async_crud, audit, cache, changes, crud, export, importer, metrics, models, pagination, schemas, serialization
 
 # Use a test token for authentication (replace with real JWT in production)
 TEST_TOKEN = "test-token"
 
-@pytest.fixture(scope="session", autouse=True)
-def setup_database():
-    """
-    Create tables before tests and drop after.
-    """
-    models.Base.metadata.create_all(bind=engine)
-    yield
-    models.Base.metadata.drop_all(bind=engine)
-
 @pytest.fixture(scope="function")
 def db_session():
     """
@@ -37,6 +36,21 @@ def client():
     """
     return TestClient(app)
 
+@pytest.fixture
+def query_counter():
+    """
+    Count SQL statements sent by the engine serving requests.
+    """
+    request_engine = database.async_engine.sync_engine if database.USE_ASYNC_DB else engine
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(request_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(request_engine, "before_cursor_execute", before_cursor_execute)
+
 def auth_headers():
     """
     Return headers with test token for authentication.
@@ -97,6 +111,116 @@ def test_list_products(client, db_session):
     assert isinstance(products, list)
     assert len(products) >= 2
 
+def test_list_products_cursor_pagination(client, db_session):
+    """
+    Test keyset pagination walks every product exactly once.
+    """
+    for i in range(5):
+        client.post("/products/", json={"name": f"Cursor{i}", "description": "Paged"}, headers=auth_headers())
+
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        response = client.get("/products/", params={"after": cursor, "limit": 2}, headers=auth_headers())
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) <= 2
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+
+    assert seen == sorted(seen)
+    assert len(seen) == len(set(seen))
+    legacy = client.get("/products/", params={"limit": 1000}, headers=auth_headers()).json()
+    assert seen == [p["id"] for p in legacy]
+
+def test_list_products_invalid_cursor(client, db_session):
+    """
+    Test a malformed cursor is rejected.
+    """
+    response = client.get("/products/", params={"after": "not-a-cursor"}, headers=auth_headers())
+    assert response.status_code == 400
+
+def test_list_products_filter_and_sort(client, db_session):
+    """
+    Test filtering by creator and update time, and keyset paging sorted by updated_at descending.
+    """
+    base = datetime(2030, 1, 1)
+    db_session.add_all([
+        models.Product(name=f"Filtered{i}", created_by="filter-owner", updated_at=base + timedelta(minutes=i % 3))
+        for i in range(6)
+    ])
+    db_session.commit()
+    params = {"created_by": "filter-owner", "sort": "-updated_at", "limit": 2}
+
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        page = client.get("/products/", params={**params, "after": cursor}, headers=auth_headers()).json()
+        seen.extend((item["updated_at"], item["id"]) for item in page["items"])
+        cursor = page["next_cursor"]
+    assert len(seen) == 6
+    assert seen == sorted(seen, reverse=True)
+
+    legacy = client.get("/products/", params=params, headers=auth_headers()).json()
+    assert [(p["updated_at"], p["id"]) for p in legacy] == seen[:2]
+
+    changed = client.get(
+        "/products/",
+        params={"created_by": "filter-owner", "updated_after": "2030-01-01T00:01:00Z"},
+        headers=auth_headers()
+    ).json()
+    assert len(changed) == 2
+    assert all(p["updated_at"].startswith("2030-01-01T00:02") for p in changed)
+
+def test_list_products_cursor_sort_mismatch(client, db_session):
+    """
+    Test an id cursor is rejected for an updated_at sort.
+    """
+    id_cursor = pagination.encode_cursor({"id": 1})
+    response = client.get("/products/", params={"after": id_cursor, "sort": "updated_at"}, headers=auth_headers())
+    assert response.status_code == 400
+
+def test_search_products_ranked_and_paginated(client, db_session):
+    """
+    Test search ranks name prefix matches first and pages through every match once.
+    """
+    for name, description in [
+        ("Kubernetes Cluster", "Managed control plane"),
+        ("Kube Proxy", "Node networking"),
+        ("Load Balancer", "Fronts the kubernetes ingress"),
+        ("Object Storage", "Buckets"),
+        ("100%_Uptime", "Literal wildcard characters"),
+    ]:
+        client.post("/products/", json={"name": name, "description": description}, headers=auth_headers())
+
+    response = client.get("/products/search", params={"q": "kube", "limit": 2}, headers=auth_headers())
+    assert response.status_code == 200
+    page = response.json()
+    assert {item["name"] for item in page["items"]} == {"Kubernetes Cluster", "Kube Proxy"}
+    assert page["next_cursor"] is not None
+
+    seen = [item["name"] for item in page["items"]]
+    cursor = page["next_cursor"]
+    while cursor is not None:
+        page = client.get(
+            "/products/search", params={"q": "kube", "limit": 2, "after": cursor}, headers=auth_headers()
+        ).json()
+        seen.extend(item["name"] for item in page["items"])
+        cursor = page["next_cursor"]
+    assert seen[2:] == ["Load Balancer"]
+
+    wildcard = client.get("/products/search", params={"q": "100%_"}, headers=auth_headers()).json()
+    assert [item["name"] for item in wildcard["items"]] == ["100%_Uptime"]
+    literal = client.get("/products/search", params={"q": "%"}, headers=auth_headers()).json()
+    assert [item["name"] for item in literal["items"]] == ["100%_Uptime"]
+
+def test_search_products_invalid_cursor(client, db_session):
+    """
+    Test a malformed search cursor is rejected.
+    """
+    response = client.get("/products/search", params={"q": "x", "after": "not-a-cursor"}, headers=auth_headers())
+    assert response.status_code == 400
+
 def test_get_product_by_id(client, db_session):
     """
     Test retrieving a product by ID.
@@ -120,6 +244,51 @@ def test_get_product_not_found(client, db_session):
     assert response.status_code == 404
     assert "not found" in response.json()["detail"]
 
+def test_get_products_batch(client, db_session, query_counter):
+    """
+    Test batch lookups keep request order, deduplicate, report missing keys and use one query.
+    """
+    created = client.post(
+        "/products/bulk", json=[{"name": f"Batch {i}"} for i in range(3)], headers=auth_headers()
+    ).json()["results"]
+    first, second, third = (r["id"] for r in created)
+
+    query_counter.clear()
+    response = client.get(f"/products/batch?ids={third},999999,{first},{third}", headers=auth_headers())
+    assert response.status_code == 200
+    assert [p["id"] for p in response.json()["items"]] == [third, first]
+    assert response.json()["missing"] == [999999]
+    assert len(query_counter) == 1
+
+    response = client.post(
+        "/products/batch", json={"names": ["Batch 1", "No such product", "Batch 0"]}, headers=auth_headers()
+    )
+    assert [p["id"] for p in response.json()["items"]] == [second, first]
+    assert response.json()["missing"] == ["No such product"]
+
+    assert client.post("/products/batch", json={"ids": [first], "names": ["Batch 0"]}, headers=auth_headers()).status_code == 400
+    assert client.get("/products/batch?ids=1,x", headers=auth_headers()).status_code == 400
+    assert client.get("/products/batch", headers=auth_headers()).status_code == 400
+
+def test_get_products_batch_uses_cache(client, db_session, monkeypatch):
+    """
+    Test batch lookups by ID fill the product cache and only load cache misses.
+    """
+    monkeypatch.setattr(cache, "product_cache", cache.ProductCache(cache.InMemoryCache(), ttl=60))
+    created = client.post(
+        "/products/bulk", json=[{"name": f"Cached batch {i}"} for i in range(2)], headers=auth_headers()
+    ).json()["results"]
+    first, second = (r["id"] for r in created)
+
+    client.get(f"/products/{first}", headers=auth_headers())
+    client.get(f"/products/batch?ids={first},{second}", headers=auth_headers())
+    stats = cache.product_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    client.put(f"/products/{second}", json={"description": "v2"}, headers=auth_headers())
+    items = client.get(f"/products/batch?ids={first},{second}", headers=auth_headers()).json()["items"]
+    assert items[1]["description"] == "v2"
+    assert cache.product_cache.stats()["hits"] == 2
+
 def test_update_product(client, db_session):
     """
     Test updating a product.
@@ -145,6 +314,52 @@ def test_update_product_not_found(client, db_session):
     assert response.status_code == 404
     assert "not found" in response.json()["detail"]
 
+def test_update_product_if_match(client, db_session):
+    """
+    Test If-Match updates apply at the current version and return 412 once the product has changed.
+    """
+    product_id = client.post("/products/", json={"name": "IfMatch"}, headers=auth_headers()).json()["id"]
+    etag = client.get(f"/products/{product_id}", headers=auth_headers()).headers["ETag"]
+
+    first = client.put(
+        f"/products/{product_id}", json={"description": "First"}, headers={**auth_headers(), "If-Match": etag}
+    )
+    assert first.status_code == 200
+    assert first.json()["version"] == 2
+    assert first.headers["ETag"] != etag
+
+    stale = client.put(
+        f"/products/{product_id}", json={"description": "Lost"}, headers={**auth_headers(), "If-Match": etag}
+    )
+    assert stale.status_code == 412
+    assert stale.headers["ETag"] == first.headers["ETag"]
+    assert client.get(f"/products/{product_id}", headers=auth_headers()).json()["description"] == "First"
+
+    wildcard = client.put(
+        f"/products/{product_id}", json={"description": "Any"}, headers={**auth_headers(), "If-Match": "*"}
+    )
+    assert wildcard.status_code == 200
+
+def test_update_product_version_conflict(client, db_session):
+    """
+    Test body version updates return 409 on a stale version, and concurrent writers cannot both win.
+    """
+    product_id = client.post("/products/", json={"name": "Versioned"}, headers=auth_headers()).json()["id"]
+    results = [
+        client.put(f"/products/{product_id}", json={"description": f"Writer {i}", "version": 1}, headers=auth_headers())
+        for i in range(2)
+    ]
+    assert [r.status_code for r in results] == [200, 409]
+    assert "current version is 2" in results[1].json()["detail"]
+
+    response = client.patch("/products/bulk", json=[
+        {"id": product_id, "description": "Stale", "version": 1},
+        {"id": product_id, "description": "Fresh", "version": 2},
+    ], headers=auth_headers())
+    assert [r["status"] for r in response.json()["results"]] == ["conflict", "updated"]
+    product = client.get(f"/products/{product_id}", headers=auth_headers()).json()
+    assert (product["description"], product["version"]) == ("Fresh", 3)
+
 def test_delete_product(client, db_session):
     """
     Test deleting a product.
@@ -177,4 +392,398 @@ def test_auth_required(client):
     payload = {"name": "NoAuth", "description": "Should fail"}
     response = client.post("/products/", json=payload)
     assert response.status_code == 401
-    assert "Not authenticated" in response.json()["detail"]
\ No newline at end of file
+    assert "Not authenticated" in response.json()["detail"]
+def test_bulk_create_products(client, db_session):
+    """
+    Test bulk creation reports conflicts per item without aborting the batch.
+    """
+    client.post("/products/", json={"name": "BulkExisting", "description": "Pre-existing"}, headers=auth_headers())
+    payload = [
+        {"name": "Bulk1", "description": "One"},
+        {"name": "BulkExisting", "description": "Conflicts with a stored row"},
+        {"name": "Bulk2", "description": "Two"},
+        {"name": "Bulk1", "description": "Conflicts within the batch"},
+    ]
+    response = client.post("/products/bulk", json=payload, headers=auth_headers())
+    assert response.status_code == 200
+    data = response.json()
+    assert data["succeeded"] == 2
+    assert data["failed"] == 2
+    assert [r["status"] for r in data["results"]] == ["created", "conflict", "created", "conflict"]
+    assert data["results"][0]["product"]["name"] == "Bulk1"
+    assert data["results"][0]["product"]["created_by"] == "demo-user"
+
+def test_bulk_update_products(client, db_session):
+    """
+    Test bulk update applies partial updates and reports missing IDs and conflicts.
+    """
+    created = client.post(
+        "/products/bulk",
+        json=[{"name": "BulkUpd1", "description": "Old1"}, {"name": "BulkUpd2", "description": "Old2"}],
+        headers=auth_headers()
+    ).json()["results"]
+    id1, id2 = created[0]["id"], created[1]["id"]
+    payload = [
+        {"id": id1, "description": "New1"},
+        {"id": id2, "name": "BulkUpd1"},
+        {"id": 999999, "name": "Missing"},
+    ]
+    response = client.patch("/products/bulk", json=payload, headers=auth_headers())
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == ["updated", "conflict", "not_found"]
+    assert results[0]["product"]["name"] == "BulkUpd1"
+    assert results[0]["product"]["description"] == "New1"
+
+@pytest.mark.parametrize("chunk_size", [10, 1], ids=["same-chunk", "cross-chunk"])
+def test_bulk_update_repeated_ids(db_session, chunk_size):
+    """
+    Test a repeated ID applies only at its first occurrence, whichever chunk the repeat lands in.
+    """
+    first, second = (
+        crud.create_product(db_session, schemas.ProductCreate(name=f"BulkRepeat{chunk_size}-{n}"), "tester")
+        for n in range(2)
+    )
+    updates = [
+        schemas.ProductBulkUpdateItem(id=first.id, description="First"),
+        schemas.ProductBulkUpdateItem(id=second.id, description="Other"),
+        schemas.ProductBulkUpdateItem(id=first.id, description="Repeat"),
+    ]
+    results = crud.bulk_update_products(db_session, updates, "tester", chunk_size=chunk_size)
+    assert [r["status"] for r in results] == ["updated", "updated", "conflict"]
+    assert results[2]["detail"] == "Product ID appears earlier in this batch."
+    assert crud.get_product(db_session, first.id).description == "First"
+
+def test_bulk_delete_products(client, db_session):
+    """
+    Test bulk deletion reports deleted and missing IDs.
+    """
+    created = client.post(
+        "/products/bulk",
+        json=[{"name": "BulkDel1"}, {"name": "BulkDel2"}],
+        headers=auth_headers()
+    ).json()["results"]
+    ids = [r["id"] for r in created]
+    response = client.request("DELETE", "/products/bulk", json={"ids": ids + [999999]}, headers=auth_headers())
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json()["results"]] == ["deleted", "deleted", "not_found"]
+    assert client.get(f"/products/{ids[0]}", headers=auth_headers()).status_code == 404
+
+def test_async_crud_round_trip():
+    """
+    Test the async crud functions against an AsyncSession.
+    """
+    async def scenario():
+        async_engine = create_async_engine(ASYNC_DATABASE_URL)
+        session_factory = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+        try:
+            async with session_factory() as db:
+                created = await async_crud.create_product(
+                    db, schemas.ProductCreate(name="AsyncProduct", description="Async"), user="async-user"
+                )
+                fetched = await async_crud.get_product(db, created.id)
+                assert fetched.name == "AsyncProduct"
+                updated = await async_crud.update_product(
+                    db, created.id, schemas.ProductUpdate(description="Changed"), user="async-user"
+                )
+                assert updated.description == "Changed"
+                await async_crud.delete_product(db, created.id, user="async-user")
+                assert await async_crud.get_product(db, created.id) is None
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(scenario())
+
+def test_product_cache_invalidated_on_write(client, db_session, monkeypatch):
+    """
+    Test cached reads are never stale after update or delete.
+    """
+    monkeypatch.setattr(cache, "product_cache", cache.ProductCache(cache.InMemoryCache(), ttl=60))
+    product_id = client.post("/products/", json={"name": "Cached", "description": "v1"}, headers=auth_headers()).json()["id"]
+
+    assert client.get(f"/products/{product_id}", headers=auth_headers()).json()["description"] == "v1"
+    assert client.get(f"/products/{product_id}", headers=auth_headers()).json()["description"] == "v1"
+    client.put(f"/products/{product_id}", json={"description": "v2"}, headers=auth_headers())
+    assert client.get(f"/products/{product_id}", headers=auth_headers()).json()["description"] == "v2"
+
+    client.delete(f"/products/{product_id}", headers=auth_headers())
+    assert client.get(f"/products/{product_id}", headers=auth_headers()).status_code == 404
+
+    stats = client.get("/cache/stats").json()
+    assert stats["hits"] >= 1
+    assert stats["misses"] >= 2
+
+def test_fast_serializers_match_schema(db_session):
+    """
+    Test the fast product and change serializers produce exactly the schemas' JSON output.
+    """
+    db_session.add_all([
+        models.Product(name="Serialized", description=None, created_by="admin",
+                       created_at=datetime(2030, 1, 1), updated_at=datetime(2030, 1, 1, 0, 0, 0, 5)),
+        models.Product(name="SerializedToo", description="Text", created_by="admin"),
+    ])
+    db_session.commit()
+    products = db_session.query(models.Product).filter(models.Product.name.like("Serialized%")).order_by(models.Product.id).all()
+    expected = [schemas.Product.model_validate(p, from_attributes=True).model_dump(mode="json") for p in products]
+
+    assert [serialization.product_to_dict(p) for p in products] == expected
+    rows = db_session.execute(
+        select(*crud.PRODUCT_COLUMNS).where(models.Product.name.like("Serialized%")).order_by(models.Product.id)
+    ).all()
+    assert serialization.products_to_dicts(rows) == expected
+
+    change = models.ProductChange(seq=1, product_id=products[0].id, op="update", changed_at=datetime(2030, 1, 1, 0, 0, 0, 5))
+    for product in (products[0], None):
+        assert changes.serialize_change(change, product) == schemas.ProductChange(
+            seq=1, op="update", product_id=products[0].id, changed_at=change.changed_at, changed_by=None,
+            product=None if product is None else schemas.Product.model_validate(product, from_attributes=True),
+        ).model_dump(mode="json")
+
+def test_get_product_conditional(client, db_session):
+    """
+    Test If-None-Match returns 304 until the product changes.
+    """
+    product_id = client.post("/products/", json={"name": "ETagged", "description": "v1"}, headers=auth_headers()).json()["id"]
+    first = client.get(f"/products/{product_id}", headers=auth_headers())
+    etag = first.headers["ETag"]
+
+    cached = client.get(f"/products/{product_id}", headers={**auth_headers(), "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.content == b""
+
+    client.put(f"/products/{product_id}", json={"description": "v2"}, headers=auth_headers())
+    changed = client.get(f"/products/{product_id}", headers={**auth_headers(), "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["description"] == "v2"
+
+def test_list_products_conditional(client, db_session):
+    """
+    Test list pages return 304 until a product on the page changes.
+    """
+    client.post("/products/", json={"name": "ETagList", "description": "v1"}, headers=auth_headers())
+    params = {"after": "", "limit": 1000}
+    etag = client.get("/products/", params=params, headers=auth_headers()).headers["ETag"]
+
+    cached = client.get("/products/", params=params, headers={**auth_headers(), "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    client.post("/products/", json={"name": "ETagList2", "description": "v1"}, headers=auth_headers())
+    changed = client.get("/products/", params=params, headers={**auth_headers(), "If-None-Match": etag})
+    assert changed.status_code == 200
+
+def test_update_and_delete_query_count(client, db_session, query_counter):
+    """
+    Test update and delete each issue a single product statement, plus the
+    change log insert when a row was affected (and, for audited updates,
+    the locking read of the before snapshot). Audit events are written
+    later, in batches, never by the request.
+    """
+    product_id = client.post("/products/", json={"name": "CountMe", "description": "Old"}, headers=auth_headers()).json()["id"]
+    # The audit trail's before snapshot is read (and locked) first
+    before_reads = 1 if audit.recorder.enabled else 0
+
+    query_counter.clear()
+    assert client.put(f"/products/{product_id}", json={"description": "New"}, headers=auth_headers()).status_code == 200
+    assert len(query_counter) == 2 + before_reads
+    assert query_counter[-1].startswith("INSERT INTO product_changes")
+
+    query_counter.clear()
+    assert client.put("/products/999999", json={"description": "New"}, headers=auth_headers()).status_code == 404
+    assert len(query_counter) == 1
+
+    query_counter.clear()
+    assert client.delete(f"/products/{product_id}", headers=auth_headers()).status_code == 200
+    assert len(query_counter) == 2
+
+    query_counter.clear()
+    assert client.delete(f"/products/{product_id}", headers=auth_headers()).status_code == 404
+    assert len(query_counter) == 1
+
+def _changes_head(client):
+    """
+    Return the change feed token after every change recorded so far.
+    """
+    token = ""
+    while True:
+        feed = client.get("/products/changes", params={"since": token, "limit": 1000}, headers=auth_headers()).json()
+        token = feed["next"]
+        if not feed["has_more"]:
+            return token
+
+def test_product_change_feed(client, db_session):
+    """
+    Test writes are recorded in order with tombstones, and the feed resumes from its token.
+    """
+    head = _changes_head(client)
+    product_id = client.post("/products/", json={"name": "Changing", "description": "v1"}, headers=auth_headers()).json()["id"]
+    client.put(f"/products/{product_id}", json={"description": "v2"}, headers=auth_headers())
+    kept_id = client.post("/products/bulk", json=[{"name": "ChangingBulk"}], headers=auth_headers()).json()["results"][0]["id"]
+    client.delete(f"/products/{product_id}", headers=auth_headers())
+
+    feed = client.get("/products/changes", params={"since": head, "limit": 3}, headers=auth_headers()).json()
+    assert [(c["op"], c["product_id"]) for c in feed["changes"]] == [
+        ("insert", product_id), ("update", product_id), ("insert", kept_id)
+    ]
+    assert feed["has_more"] is True
+    # Entries carry the current state; the product has since been deleted
+    assert feed["changes"][0]["product"] is None
+    assert feed["changes"][2]["product"]["name"] == "ChangingBulk"
+
+    rest = client.get("/products/changes", params={"since": feed["next"]}, headers=auth_headers()).json()
+    assert [(c["op"], c["product_id"], c["product"]) for c in rest["changes"]] == [("delete", product_id, None)]
+    assert rest["has_more"] is False
+
+    empty = client.get("/products/changes", params={"since": rest["next"]}, headers=auth_headers()).json()
+    assert empty["changes"] == [] and empty["next"] == rest["next"]
+
+def test_product_change_feed_records_imports(client, db_session):
+    """
+    Test imported rows appear in the feed as inserts and updates.
+    """
+    client.post("/products/", json={"name": "ImportChangeExisting"}, headers=auth_headers())
+    head = _changes_head(client)
+    body = '{"name": "ImportChangeExisting", "description": "new"}\n{"name": "ImportChangeNew"}\n'
+    client.post(
+        "/products/import", params={"format": "ndjson", "on_conflict": "upsert"},
+        content=body.encode("utf-8"), headers=auth_headers()
+    )
+    feed = client.get("/products/changes", params={"since": head}, headers=auth_headers()).json()
+    assert [(c["op"], c["product"]["name"]) for c in feed["changes"]] == [
+        ("update", "ImportChangeExisting"), ("insert", "ImportChangeNew")
+    ]
+
+def test_product_change_stream(client, db_session, monkeypatch):
+    """
+    Test the event stream replays changes with a resumable id, and long-polling times out empty.
+    """
+    monkeypatch.setattr(changes, "POLL_INTERVAL", 0.01)
+    head = _changes_head(client)
+    product_id = client.post("/products/", json={"name": "Streamed"}, headers=auth_headers()).json()["id"]
+
+    response = client.get("/products/changes/stream", params={"since": head, "duration": 0}, headers=auth_headers())
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    blocks = [block for block in response.text.split("\n\n") if block]
+    assert blocks[0].startswith("event: change\ndata: ")
+    assert json.loads(blocks[0].split("data: ", 1)[1])["product_id"] == product_id
+    resume = blocks[1][len("id: "):]
+
+    waited = client.get("/products/changes", params={"since": resume, "wait": 0.05}, headers=auth_headers()).json()
+    assert waited["changes"] == [] and waited["next"] == resume
+    response = client.get(
+        "/products/changes/stream", params={"duration": 0},
+        headers={**auth_headers(), "Last-Event-ID": resume}
+    )
+    assert response.text == ""
+
+def test_product_change_feed_invalid_token(client, db_session):
+    """
+    Test a malformed change feed token is rejected.
+    """
+    response = client.get("/products/changes", params={"since": pagination.encode_cursor({"id": 1})}, headers=auth_headers())
+    assert response.status_code == 400
+
+def test_export_products(client, db_session, monkeypatch):
+    """
+    Test the catalog export streams every product as NDJSON and CSV.
+    """
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+    for i in range(3):
+        client.post("/products/", json={"name": f"Export{i}", "description": "Line, with comma"}, headers=auth_headers())
+    expected = client.get("/products/", params={"limit": 100000}, headers=auth_headers()).json()
+
+    response = client.get("/products/export", params={"format": "ndjson"}, headers=auth_headers())
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["id"] for r in rows] == [p["id"] for p in expected]
+    assert rows[-1]["description"] == "Line, with comma"
+
+    response = client.get("/products/export", params={"format": "csv"}, headers=auth_headers())
+    assert response.status_code == 200
+    records = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(r["id"]) for r in records] == [p["id"] for p in expected]
+    assert records[-1]["description"] == "Line, with comma"
+
+def test_import_products_ndjson(client, db_session, monkeypatch):
+    """
+    Test NDJSON import reports invalid lines, in-file duplicates and skipped conflicts.
+    """
+    monkeypatch.setattr(importer, "IMPORT_CHUNK_SIZE", 2)
+    client.post("/products/", json={"name": "ImportExisting", "description": "Keep me"}, headers=auth_headers())
+    body = "\n".join([
+        json.dumps({"name": "Import1", "description": "One"}),
+        json.dumps({"name": ""}),
+        "{not json",
+        json.dumps({"name": "ImportExisting", "description": "Replaced?"}),
+        json.dumps({"name": "Import1", "description": "Duplicate"}),
+        json.dumps({"name": "Import2"}),
+    ])
+    response = client.post("/products/import", params={"format": "ndjson"}, content=body, headers=auth_headers())
+    assert response.status_code == 200
+    summary = response.json()
+    assert summary["received"] == 6
+    assert summary["inserted"] == 2
+    assert summary["skipped"] == 1
+    assert summary["invalid"] == 3
+    assert [e["line"] for e in summary["errors"]] == [2, 3, 5]
+
+    products = {p["name"]: p for p in client.get("/products/", params={"limit": 100000}, headers=auth_headers()).json()}
+    assert products["Import1"]["description"] == "One"
+    assert products["ImportExisting"]["description"] == "Keep me"
+
+def test_import_products_csv_upsert_round_trip(client, db_session):
+    """
+    Test a CSV export can be re-imported with upsert, including multi-line fields.
+    """
+    client.post("/products/", json={"name": "CsvImport", "description": "Line one\nLine \"two\""}, headers=auth_headers())
+    exported = client.get("/products/export", params={"format": "csv"}, headers=auth_headers()).text
+    total = len(list(csv.DictReader(io.StringIO(exported))))
+    header = exported.splitlines()[0].split(",")
+    new_row = io.StringIO()
+    csv.writer(new_row).writerow(["CsvImportNew" if c == "name" else "Fresh" if c == "description" else "" for c in header])
+    body = exported + new_row.getvalue()
+
+    response = client.post(
+        "/products/import", params={"format": "csv", "on_conflict": "upsert"}, content=body, headers=auth_headers()
+    )
+    assert response.status_code == 200
+    summary = response.json()
+    assert summary["invalid"] == 0
+    assert summary["updated"] == total
+    assert summary["inserted"] == 1
+    products = {p["name"]: p for p in client.get("/products/", params={"limit": 100000}, headers=auth_headers()).json()}
+    assert products["CsvImport"]["description"] == "Line one\nLine \"two\""
+    assert products["CsvImportNew"]["description"] == "Fresh"
+
+def test_import_products_fail_on_conflict(client, db_session):
+    """
+    Test fail mode rejects the whole import when a name already exists.
+    """
+    client.post("/products/", json={"name": "ImportFailExisting"}, headers=auth_headers())
+    body = "\n".join([json.dumps({"name": "ImportFailNew"}), json.dumps({"name": "ImportFailExisting"})])
+    response = client.post(
+        "/products/import", params={"on_conflict": "fail"}, content=body, headers=auth_headers()
+    )
+    assert response.status_code == 409
+    names = {p["name"] for p in client.get("/products/", params={"limit": 100000}, headers=auth_headers()).json()}
+    assert "ImportFailNew" not in names
+
+def test_metrics_endpoint(client, db_session):
+    """
+    Test request and database metrics are recorded per route template.
+    """
+    product_id = client.post("/products/", json={"name": "Metered"}, headers=auth_headers()).json()["id"]
+    before = metrics.REQUESTS.value("GET", "/products/{product_id}", "200")
+    client.get(f"/products/{product_id}", headers=auth_headers())
+    assert metrics.REQUESTS.value("GET", "/products/{product_id}", "200") == before + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/products/{product_id}",le="+Inf"}' in response.text
+    assert 'http_request_db_queries_count{route="/products/{product_id}"}' in response.text
+    assert "db_query_duration_seconds_count" in response.text
+    assert "db_pool_checked_out{engine=\"sync\"}" in response.text
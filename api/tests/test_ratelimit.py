@@ -0,0 +1,138 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from api import ratelimit
+from api.main import app
+from api.metrics import DecayingAverage
+from api.tests.helpers import LocalRedis
+
+class FakeClock:
+    """
+    Manually advanced clock for bucket refill tests.
+    """
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture(params=["memory", "redis"])
+def backend_and_clock(request):
+    """
+    Provide each rate limit backend with a controllable clock.
+    """
+    clock = FakeClock()
+    if request.param == "memory":
+        return ratelimit.InMemoryRateLimiter(clock=clock), clock
+    return ratelimit.RedisRateLimiter(LocalRedis(clock=clock)), clock
+
+def test_bucket_allows_burst_then_refills(backend_and_clock):
+    """
+    Test a bucket admits its burst, then one request per refill interval.
+    """
+    backend, clock = backend_and_clock
+    assert [backend.take("k", rate=1.0, burst=3) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert backend.take("k", rate=1.0, burst=3) == pytest.approx(1.0)
+    clock.now += 0.5
+    assert backend.take("k", rate=1.0, burst=3) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert backend.take("k", rate=1.0, burst=3) == 0.0
+    assert backend.take("other", rate=1.0, burst=3) == 0.0
+
+def test_route_limit_applies_per_client(backend_and_clock):
+    """
+    Test route limits are stricter than the client-wide limit and buckets are per client.
+    """
+    backend, _ = backend_and_clock
+    limiter = ratelimit.RateLimiter(backend, default=(600, 100), routes={"GET /products/export": (6, 2)})
+    assert [limiter.check("a", "GET /products/export") for _ in range(2)] == [0.0, 0.0]
+    assert limiter.check("a", "GET /products/export") == pytest.approx(10.0)
+    assert limiter.check("a", "GET /products/") == 0.0
+    assert limiter.check("b", "GET /products/export") == 0.0
+
+def test_route_limit_denial_consumes_no_tokens(backend_and_clock):
+    """
+    Test a request denied by the client-wide bucket leaves the route bucket untouched.
+    """
+    backend, clock = backend_and_clock
+    limiter = ratelimit.RateLimiter(backend, default=(60, 2), routes={"GET /products/export": (6, 2)})
+    assert [limiter.check("a", "GET /products/") for _ in range(2)] == [0.0, 0.0]
+    assert limiter.check("a", "GET /products/export") > 0
+    clock.now += 2
+    assert [limiter.check("a", "GET /products/export") for _ in range(2)] == [0.0, 0.0]
+    assert limiter.check("a", "GET /products/export") > 0
+
+def test_middleware_returns_429_with_retry_after(monkeypatch, issue_token):
+    """
+    Test exceeding a route limit returns 429 with Retry-After, while exempt paths stay available.
+    """
+    limiter = ratelimit.RateLimiter(
+        ratelimit.InMemoryRateLimiter(), default=(600, 100), routes={"GET /products/{product_id}": (1, 2)}
+    )
+    monkeypatch.setattr(ratelimit, "rate_limiter", limiter)
+    headers = {"Authorization": f"Bearer {issue_token('limited-client')}"}
+    other = {"Authorization": f"Bearer {issue_token('other-client')}"}
+    with TestClient(app) as client:
+        # A token is limited under the client's address until its first request has verified it
+        assert client.get("/products/", headers=headers).status_code == 200
+        assert client.get("/products/", headers=other).status_code == 200
+        statuses = [client.get("/products/999999", headers=headers).status_code for _ in range(3)]
+        assert statuses == [404, 404, 429]
+        response = client.get("/products/999999", headers=headers)
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        assert client.get("/products/999999", headers=other).status_code == 404
+        assert all(client.get("/health").status_code == 200 for _ in range(5))
+    assert ratelimit.RATE_LIMITED.value("/products/{product_id}") >= 2
+
+def test_unverified_tokens_share_the_address_bucket(monkeypatch):
+    """
+    Test a new made-up bearer token per request does not escape the client's limit.
+    """
+    limiter = ratelimit.RateLimiter(
+        ratelimit.InMemoryRateLimiter(), default=(600, 100), routes={"GET /products/{product_id}": (1, 2)}
+    )
+    monkeypatch.setattr(ratelimit, "rate_limiter", limiter)
+    with TestClient(app) as client:
+        statuses = [
+            client.get("/products/999999", headers={"Authorization": f"Bearer made-up-{i}"}).status_code
+            for i in range(3)
+        ]
+    assert statuses == [404, 404, 429]
+
+def test_middleware_sheds_load_on_pool_wait(monkeypatch):
+    """
+    Test requests are shed with 503 and Retry-After while pool waits are over the threshold.
+    """
+    waits = {"value": 2.0}
+    monkeypatch.setattr(ratelimit, "load_shedder", ratelimit.LoadShedder(max_pool_wait=0.5, pool_wait=lambda: waits["value"]))
+    headers = {"Authorization": "Bearer token"}
+    with TestClient(app) as client:
+        response = client.get("/products/", headers=headers)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(ratelimit.SHED_RETRY_AFTER)
+        assert client.get("/health").status_code == 200
+        waits["value"] = 0.1
+        assert client.get("/products/", headers=headers).status_code == 200
+
+def test_load_shedder_in_flight_limit():
+    """
+    Test the in-flight threshold.
+    """
+    shedder = ratelimit.LoadShedder(max_in_flight=2, max_pool_wait=0, pool_wait=lambda: 0.0)
+    shedder.in_flight = 1
+    assert shedder.reject_reason() is None
+    shedder.in_flight = 2
+    assert shedder.reject_reason() == "in_flight"
+
+def test_decaying_average_decays_without_samples():
+    """
+    Test the recent pool wait average rises with samples and halves every half-life without them.
+    """
+    clock = FakeClock()
+    average = DecayingAverage(half_life=5.0, clock=clock)
+    for _ in range(50):
+        average.update(1.0)
+    assert average.value() == pytest.approx(1.0, rel=0.01)
+    clock.now += 5.0
+    assert average.value() == pytest.approx(0.5, rel=0.01)
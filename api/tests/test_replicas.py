@@ -0,0 +1,136 @@
+import os
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.engine import make_url
+
+from api import cache, database, models, replicas
+from api.main import app
+
+# Only present on the replica, so a 200 for it shows the read was served there
+REPLICA_ONLY_ID = 987654
+
+class FakeClock:
+    """
+    Manually advanced clock for retry and stickiness windows.
+    """
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def replica(tmp_path):
+    """
+    Provide a replica backed by a second SQLite file holding one replica-only product.
+    """
+    engine, async_engine = database.build_replica_engines(f"sqlite:///{tmp_path / 'replica.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    with database.SessionLocal(bind=engine) as db:
+        db.add(models.Product(id=REPLICA_ONLY_ID, name="replica-only", created_by="replica-seed"))
+        db.commit()
+    yield replicas.Replica("replica0", engine, async_engine)
+    engine.dispose()
+
+def test_candidates_round_robin_skips_failed_replicas():
+    """
+    Test healthy replicas take turns and a failed one is skipped until its retry time.
+    """
+    clock = FakeClock()
+    a, b, c = (replicas.Replica(name, engine=None) for name in ("a", "b", "c"))
+    router = replicas.ReplicaRouter([a, b, c], cache.InMemoryCache(clock=clock), retry_seconds=30, clock=clock)
+    assert [router.candidates()[0].name for _ in range(4)] == ["a", "b", "c", "a"]
+    router.mark_down(b, "OperationalError")
+    assert sorted(router.candidates()[0].name for _ in range(2)) == ["a", "c"]
+    assert all("b" not in [r.name for r in router.candidates()] for _ in range(3))
+    clock.now += 30
+    assert sorted(r.name for r in router.candidates()) == ["a", "b", "c"]
+    assert replicas.REPLICA_FAILURES.value("b", "OperationalError") >= 1
+
+def test_client_is_sticky_to_primary_after_write():
+    """
+    Test a write sends the client's reads to the primary for sticky_seconds only.
+    """
+    clock = FakeClock()
+    router = replicas.ReplicaRouter(
+        [replicas.Replica("a", engine=None)], cache.InMemoryCache(clock=clock), sticky_seconds=5, clock=clock
+    )
+    router.record_write("token:writer")
+    assert router.is_sticky("token:writer")
+    assert not router.is_sticky("token:reader")
+    clock.now += 5
+    assert not router.is_sticky("token:writer")
+
+def test_reads_routed_to_replica_with_read_your_writes(monkeypatch, replica, issue_token):
+    """
+    Test read-only endpoints use the replica, except for a client that just wrote.
+    """
+    monkeypatch.setattr(replicas, "router", replicas.ReplicaRouter([replica], cache.InMemoryCache()))
+    # Clients are told apart by verified tokens; unverified ones all share the test client's address
+    writer = {"Authorization": f"Bearer {issue_token('replica-writer')}"}
+    reader = {"Authorization": f"Bearer {issue_token('replica-reader')}"}
+    with TestClient(app) as client:
+        assert client.get(f"/products/{REPLICA_ONLY_ID}", headers=writer).status_code == 200
+        assert client.get("/products/?created_by=replica-seed", headers=reader).json()[0]["id"] == REPLICA_ONLY_ID
+
+        created = client.post(
+            "/products/", json={"name": "replica-write", "description": "d"}, headers=writer
+        ).json()
+        # The writer now reads from the primary, which has its write but not the replica's row
+        assert client.get(f"/products/{created['id']}", headers=writer).status_code == 200
+        assert client.get(f"/products/{REPLICA_ONLY_ID}", headers=writer).status_code == 404
+        # Other clients keep reading from the replica
+        assert client.get(f"/products/{REPLICA_ONLY_ID}", headers=reader).status_code == 200
+    assert replicas.READ_SESSIONS.value("primary", "sticky") >= 2
+
+def test_unreachable_replica_falls_back_to_primary(monkeypatch, tmp_path, replica):
+    """
+    Test a replica that cannot connect is taken out of rotation and reads fall back.
+    """
+    engine, async_engine = database.build_replica_engines(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    broken = replicas.Replica("broken", engine, async_engine)
+    router = replicas.ReplicaRouter([broken, replica], cache.InMemoryCache())
+    monkeypatch.setattr(replicas, "router", router)
+    headers = {"Authorization": "Bearer replica-fallback"}
+    with TestClient(app) as client:
+        # The broken replica's turn comes first; its successor serves instead
+        assert client.get(f"/products/{REPLICA_ONLY_ID}", headers=headers).status_code == 200
+        assert broken.down_until > 0
+        assert [r.name for r in router.candidates()] == ["replica0"]
+        replica.down_until = float("inf")
+        assert client.get(f"/products/{REPLICA_ONLY_ID}", headers=headers).status_code == 404
+    assert replicas.READ_SESSIONS.value("primary", "unavailable") >= 1
+
+def test_replica_urls_from_terraform_template():
+    """
+    Test the DATABASE_REPLICA_URLS value rendered by iac/terraform/main.tf parses and builds engines.
+    """
+    main_tf = os.path.join(os.path.dirname(__file__), "..", "..", "iac", "terraform", "main.tf")
+    with open(main_tf) as f:
+        url_format = re.search(r'db_url_format\s*=\s*"([^"]+)"', f.read()).group(1)
+    # formatlist over the replica addresses and ports, joined with commas
+    addresses = [f"dev-cloud-infra-db-replica-{index}.abc123.us-east-1.rds.amazonaws.com" for index in range(2)]
+    value = ",".join(url_format % ("admin", "p%40ss%2Fword", address, 5432, "cloud_infra_db") for address in addresses)
+
+    urls = database.parse_replica_urls(value)
+    assert [make_url(url).host for url in urls] == addresses
+    assert make_url(urls[0]).password == "p@ss/word"
+    for url in urls:
+        engine, async_engine = database.build_replica_engines(url)
+        engine.dispose()
+    with pytest.raises(ValueError, match="not a SQLAlchemy URL"):
+        database.parse_replica_urls(f"{addresses[0]}:5432")
+
+def test_unauthenticated_reads_take_no_session(monkeypatch):
+    """
+    Test a read rejected by authentication never opens a replica or primary session.
+    """
+    opened = []
+    monkeypatch.setattr(replicas.router, "read_session", lambda key: opened.append(key))
+    monkeypatch.setattr(replicas.router, "read_session_async", lambda key: opened.append(key))
+    with TestClient(app) as client:
+        assert client.get("/products/1").status_code == 401
+        assert client.get("/products/1", headers={"Authorization": "Bearer "}).status_code == 401
+    assert opened == []
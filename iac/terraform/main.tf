@@ -27,6 +27,12 @@ locals {
     Owner       = var.owner
     ManagedBy   = "Terraform"
   }
+
+  # SQLAlchemy URLs the API connects with (DATABASE_URL, DATABASE_REPLICA_URLS);
+  # RDS endpoints are bare host:port, which the API cannot parse
+  db_url_format   = "postgresql+psycopg2://%s:%s@%s:%d/%s"
+  db_url          = format(local.db_url_format, urlencode(var.db_username), urlencode(var.db_password), aws_db_instance.postgres.address, aws_db_instance.postgres.port, var.db_name)
+  db_replica_urls = join(",", formatlist(local.db_url_format, urlencode(var.db_username), urlencode(var.db_password), aws_db_instance.replica[*].address, aws_db_instance.replica[*].port, var.db_name))
 }
 
 # VPC for isolation
@@ -92,6 +98,22 @@ resource "aws_db_instance" "postgres" {
   subnet_group_name       = aws_db_subnet_group.db_subnet_group.name
 }
 
+# Optional read replicas; the API routes read-only endpoints to them (DATABASE_REPLICA_URLS)
+resource "aws_db_instance" "replica" {
+  count                   = var.db_replica_count
+  identifier              = "${var.environment}-cloud-infra-db-replica-${count.index}"
+  replicate_source_db     = aws_db_instance.postgres.identifier
+  instance_class          = coalesce(var.db_replica_instance_class, var.db_instance_class)
+  storage_encrypted       = true
+  vpc_security_group_ids  = [aws_security_group.api_sg.id]
+  publicly_accessible     = false
+  multi_az                = false
+  backup_retention_period = 0
+  skip_final_snapshot     = true
+  deletion_protection     = false
+  tags                    = merge(local.common_tags, { Name = "${var.environment}-cloud-infra-db-replica-${count.index}" })
+}
+
 resource "aws_db_subnet_group" "db_subnet_group" {
   name       = "${var.environment}-db-subnet-group"
   subnet_ids = [aws_subnet.public.id]
@@ -112,7 +134,9 @@ resource "aws_instance" "api_server" {
   # User data to run Docker container (simplified)
   user_data = <<-EOF
     #!/bin/bash
-    docker run -d -p 8000:8000 --env DATABASE_URL=${aws_db_instance.postgres.endpoint} cloud-infra-api:latest
+    # Schema migrations run once, before the workers start
+    docker run --rm --env DATABASE_URL='${local.db_url}' cloud-infra-api:latest python -m api.migrations
+    docker run -d -p 8000:8000 --env DATABASE_URL='${local.db_url}' --env UVICORN_WORKERS=${var.api_workers} --env DB_POOL_SIZE=${var.db_pool_size} --env DB_MAX_OVERFLOW=${var.db_max_overflow} --env DATABASE_REPLICA_URLS='${local.db_replica_urls}' --env DB_REPLICA_STICKY_SECONDS=${var.db_replica_sticky_seconds} cloud-infra-api:latest
   EOF
 }
 
@@ -8,6 +8,11 @@ output "db_endpoint" {
   value       = aws_db_instance.postgres.endpoint
 }
 
+output "db_replica_endpoints" {
+  description = "RDS read replica endpoints"
+  value       = aws_db_instance.replica[*].endpoint
+}
+
 output "cloudwatch_log_group" {
   description = "CloudWatch log group for API logs"
   value       = aws_cloudwatch_log_group.api_logs.name
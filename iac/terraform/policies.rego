@@ -1,5 +1,9 @@
 package terraform.security
 
+# api/policy.py evaluates these rules in process for terraform plans and must
+# produce the same messages; keep both in step (api/tests/test_policy.py checks
+# them against OPA when it is installed)
+
 # Enforce encryption for RDS instances
 deny[msg] {
   input.resource_type == "aws_db_instance"
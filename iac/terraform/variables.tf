@@ -89,4 +89,40 @@ variable "api_instance_type" {
 variable "ssh_key_name" {
   description = "SSH key name for EC2 access"
   type        = string
-}
\ No newline at end of file
+}
+
+variable "api_workers" {
+  description = "Uvicorn worker processes per API instance"
+  type        = number
+  default     = 4
+}
+
+variable "db_pool_size" {
+  description = "Persistent DB connections per API worker; workers x (pool size + overflow) must fit the DB's max_connections"
+  type        = number
+  default     = 10
+}
+
+variable "db_max_overflow" {
+  description = "Extra DB connections per API worker under burst load"
+  type        = number
+  default     = 20
+}
+
+variable "db_replica_count" {
+  description = "RDS read replicas serving the API's read-only endpoints; 0 sends all reads to the primary"
+  type        = number
+  default     = 0
+}
+
+variable "db_replica_instance_class" {
+  description = "RDS instance class for read replicas; defaults to db_instance_class"
+  type        = string
+  default     = null
+}
+
+variable "db_replica_sticky_seconds" {
+  description = "Seconds a client's reads go to the primary after it writes; keep above the expected replica lag"
+  type        = number
+  default     = 10
+}